@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-cell cost of formatting a query result as postgres_query does,
+with the old row-by-row loop and with column formatters chosen from the
+cursor description.
+
+The results are synthetic, 1000 rows x 50 columns of scalars (integers,
+floats, numerics, text and timestamps, with some NULLs) and of the same with
+JSON columns, so no database is needed. JSON is rendered as JSON rather than
+as a Python repr, which costs more per cell than the old `str`:
+
+    python benchmarks/bench_format_rows.py
+"""
+
+import gc
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from deepagents.formatting import column_formatters, format_table
+
+ROWS = 1000
+COLUMNS = 50
+# (type OID, value generator) of the repeating column types.
+SCALAR_COLUMNS = [
+    (23, lambda r, i: i),
+    (20, lambda r, i: r.randint(0, 10**12)),
+    (701, lambda r, i: r.random() * 1000),
+    (1700, lambda r, i: Decimal(r.randint(0, 10**6)) / 100),
+    (25, lambda r, i: f"customer-{r.randint(0, 10**6)}@example.com"),
+    (1043, lambda r, i: r.choice(["new", "paid", "shipped"])),
+    (1114, lambda r, i: datetime(2024, 1, 1) + timedelta(seconds=r.randint(0, 10**7))),
+    (25, lambda r, i: None if r.random() < 0.2 else "x" * r.randint(0, 150)),
+]
+JSON_COLUMNS = SCALAR_COLUMNS + [(3802, lambda r, i: {"id": i, "tags": ["a", "b"], "active": True})]
+
+
+def legacy_format_rows(column_names, rows):
+    """The row-by-row loop postgres_query used before column formatters."""
+    result_lines = []
+    if column_names:
+        header = "\t".join(column_names)
+        result_lines.append(header)
+        result_lines.append("-" * len(header))
+    for row in rows:
+        formatted_row = []
+        for val in row:
+            if val is None:
+                formatted_row.append("NULL")
+            elif isinstance(val, (int, float)):
+                formatted_row.append(str(val))
+            else:
+                str_val = str(val)
+                if len(str_val) > 100:
+                    str_val = str_val[:97] + "..."
+                formatted_row.append(str_val)
+        result_lines.append("\t".join(formatted_row))
+    return result_lines
+
+
+def _result(column_types):
+    rng = random.Random(0)
+    types = [column_types[c % len(column_types)] for c in range(COLUMNS)]
+    description = [(f"c{c}", oid) for c, (oid, _) in enumerate(types)]
+    rows = [tuple(make(rng, i) for _, make in types) for i in range(ROWS)]
+    return [name for name, _ in description], description, rows
+
+
+def _best(fns, repeat=30):
+    """Best time of each of `fns`, run interleaved so load changes hit them alike."""
+    best = [float("inf")] * len(fns)
+    # Collections triggered by the many new strings would dominate the noise.
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for i, fn in enumerate(fns):
+                start = time.perf_counter()
+                fn()
+                best[i] = min(best[i], time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+
+def main():
+    cells = ROWS * COLUMNS
+    for label, column_types in (("scalars", SCALAR_COLUMNS), ("scalars and JSON", JSON_COLUMNS)):
+        column_names, description, rows = _result(column_types)
+        legacy, compiled, floor = _best([
+            lambda: legacy_format_rows(column_names, rows),
+            lambda: format_table(column_names, rows, column_formatters(description)),
+            # The floor: converting every cell with `str` and nothing else.
+            lambda: [list(map(str, row)) for row in rows],
+        ])
+        print(f"{ROWS} rows x {COLUMNS} columns of {label} ({cells} cells)")
+        for name, seconds in (("row loop", legacy), ("column formatters", compiled), ("str() alone", floor)):
+            overhead = f"  (+{(seconds - floor) / cells * 1e9:.0f}ns/cell over str())" if seconds is not floor else ""
+            print(f"  {name + ':':<19}{seconds * 1000:7.1f}ms  {seconds / cells * 1e9:6.0f}ns/cell{overhead}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+# Priorities; lower values are admitted first.
+INTERACTIVE = 0  # the main agent, answering a user
+BACKGROUND = 1   # sub-agents and batch work
+
+# How long a call may wait for a slot before it is rejected, by priority.
+DEFAULT_DEADLINES = {INTERACTIVE: 30.0, BACKGROUND: 300.0}
+MAX_QUEUE = 256
+# Seconds between server load probes, and the share of the server's
+# max_connections in use at which it counts as overloaded.
+PROBE_INTERVAL = 5.0
+OVERLOAD_CONNECTION_RATIO = 0.85
+
+# Open connections against the server's limit, excluding the probe itself.
+LOAD_QUERY = """
+    SELECT count(*) FILTER (WHERE state = 'active' AND pid <> pg_backend_pid()),
+           count(*),
+           current_setting('max_connections')::int
+    FROM pg_stat_activity
+    WHERE backend_type = 'client backend'
+"""
+
+
+class AdmissionRejected(Exception):
+    """Raised when a database call is not admitted: the queue is full or its deadline cannot be met."""
+
+
+class ServerLoad:
+    """A snapshot of the server's connections from `pg_stat_activity`."""
+
+    def __init__(self, active: int, connections: int, max_connections: int):
+        self.active = active
+        self.connections = connections
+        self.max_connections = max_connections
+
+    @property
+    def overloaded(self) -> bool:
+        return self.connections >= OVERLOAD_CONNECTION_RATIO * self.max_connections
+
+
+class _Waiter:
+    __slots__ = ("priority", "enqueued_at", "ready", "admitted", "abandoned")
+
+    def __init__(self, priority: int):
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.ready = threading.Event()
+        self.admitted = False
+        self.abandoned = False
+
+
+class AdmissionController:
+    """Limits concurrent database calls per database, admitting queued calls by priority.
+
+    Up to `limit` calls run at once. Further calls wait in a bounded priority
+    queue (FIFO within a priority). A call is rejected straight away when
+    the queue is full or when its expected wait, estimated from recent call
+    durations, exceeds its deadline, and rejected later if the deadline
+    passes while it waits.
+
+    With a `probe`, the limit adapts to server load: it is halved whenever
+    the probe reports the server overloaded and grows back by one per
+    healthy probe.
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        max_queue: int = MAX_QUEUE,
+        probe: Optional[Callable[[], ServerLoad]] = None,
+        probe_interval: float = PROBE_INTERVAL,
+    ):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.max_queue = max_queue
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+        self._last_probe = 0.0
+        self._queue: list[tuple[int, int, _Waiter]] = []
+        self._sequence = itertools.count()
+        self._queued = 0
+        self._in_flight = 0
+        # Exponentially weighted average of how long admitted calls hold their slot.
+        self._service_time = 0.05
+        self._waits: dict[int, deque] = {}
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_deadline = 0
+        self.timed_out = 0
+        self.last_load: Optional[ServerLoad] = None
+
+    @contextmanager
+    def slot(self, priority: int = INTERACTIVE, deadline: Optional[float] = None) -> Iterator[None]:
+        """Hold one of the limited slots for the duration of a database call.
+
+        `deadline` is the most seconds the caller is willing to wait for it;
+        it defaults to the priority's entry in DEFAULT_DEADLINES.
+        """
+        self.acquire(priority, deadline)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def acquire(self, priority: int = INTERACTIVE, deadline: Optional[float] = None) -> None:
+        if deadline is None:
+            deadline = DEFAULT_DEADLINES.get(priority, DEFAULT_DEADLINES[BACKGROUND])
+        self._maybe_probe()
+        with self._lock:
+            if self._in_flight < self.limit and not self._queued:
+                self._in_flight += 1
+                self._record(priority, 0.0)
+                return
+            if self._queued >= self.max_queue:
+                self.rejected_queue_full += 1
+                raise AdmissionRejected(f"database busy: {self._queued} calls already queued")
+            expected = self._expected_wait(priority)
+            if expected > deadline:
+                self.rejected_deadline += 1
+                raise AdmissionRejected(
+                    f"database busy: expected wait {expected:.1f}s exceeds the {deadline:.1f}s deadline"
+                )
+            waiter = _Waiter(priority)
+            heapq.heappush(self._queue, (priority, next(self._sequence), waiter))
+            self._queued += 1
+
+        waiter.ready.wait(deadline)
+        with self._lock:
+            if not waiter.admitted:
+                waiter.abandoned = True
+                self._queued -= 1
+                self.timed_out += 1
+                raise AdmissionRejected(f"database busy: no connection within the {deadline:.1f}s deadline")
+
+    def release(self, held: float = 0.0) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._service_time = 0.9 * self._service_time + 0.1 * held
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._in_flight < self.limit and self._queue:
+            _, _, waiter = heapq.heappop(self._queue)
+            if waiter.abandoned:
+                continue
+            waiter.admitted = True
+            self._queued -= 1
+            self._in_flight += 1
+            self._record(waiter.priority, time.monotonic() - waiter.enqueued_at)
+            waiter.ready.set()
+
+    def _expected_wait(self, priority: int) -> float:
+        ahead = sum(1 for p, _, w in self._queue if p <= priority and not w.abandoned)
+        return (ahead + 1) / max(self.limit, 1) * self._service_time
+
+    def _record(self, priority: int, waited: float) -> None:
+        self.admitted += 1
+        self._waits.setdefault(priority, deque(maxlen=1024)).append(waited)
+
+    def _maybe_probe(self) -> None:
+        """Adjust the limit from a fresh server load probe, at most once per interval."""
+        if self.probe is None or time.monotonic() - self._last_probe < self.probe_interval:
+            return
+        if not self._probe_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_probe = time.monotonic()
+            try:
+                load = self.probe()
+            except Exception:
+                return
+            with self._lock:
+                self.last_load = load
+                if load.overloaded:
+                    self.limit = max(1, self.limit // 2)
+                else:
+                    self.limit = min(self.max_limit, self.limit + 1)
+                self._dispatch()
+        finally:
+            self._probe_lock.release()
+
+    def metrics(self) -> dict:
+        """Counters, the current limit and queue, and queue-time percentiles per priority."""
+        with self._lock:
+            waits = {}
+            for priority, samples in self._waits.items():
+                ordered = sorted(samples)
+                waits[priority] = {
+                    "p50": ordered[len(ordered) // 2],
+                    "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                    "max": ordered[-1],
+                }
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "queued": self._queued,
+                "admitted": self.admitted,
+                "rejected_queue_full": self.rejected_queue_full,
+                "rejected_deadline": self.rejected_deadline,
+                "timed_out": self.timed_out,
+                "queue_time": waits,
+            }
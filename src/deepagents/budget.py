@@ -0,0 +1,152 @@
+import json
+import threading
+from typing import Any, NamedTuple, Optional, Sequence
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# Used when neither the model nor tiktoken can count tokens.
+CHARS_PER_TOKEN = 4
+# Per-call records kept by a BudgetTracker.
+MAX_TRACKED_CALLS = 10_000
+
+
+class PromptBudget(NamedTuple):
+    """Tokens of one model call, split by where they come from."""
+
+    system: int
+    tools: int
+    history: int
+    # False when the model's tokenizer was unavailable and tokens were estimated.
+    exact: bool = True
+
+    @property
+    def fixed(self) -> int:
+        """The overhead attached to every call: system prompt plus tool schemas."""
+        return self.system + self.tools
+
+    @property
+    def total(self) -> int:
+        return self.system + self.tools + self.history
+
+
+class TokenCounter:
+    """Counts prompt tokens with a chat model's own tokenizer.
+
+    Uses the model's `get_num_tokens_from_messages`, which for OpenAI models
+    is tiktoken with the chat format's per-message and tool-schema overhead
+    and for Anthropic models the token counting API. Counts of the fixed
+    parts (system prompt and tool schemas) are cached. When the model cannot
+    count, tokens are estimated from the text and `exact` becomes False.
+    """
+
+    def __init__(self, model: Any = None):
+        self.model = model
+        self.exact = True
+        self._lock = threading.Lock()
+        self._cache: dict[str, tuple[int, int]] = {}
+
+    def count(self, messages: Sequence[BaseMessage], tools: Optional[Sequence[Any]] = None) -> int:
+        counter = getattr(self.model, "get_num_tokens_from_messages", None)
+        if counter is not None and self.exact:
+            try:
+                return counter(list(messages), tools=list(tools)) if tools else counter(list(messages))
+            except Exception:
+                # No tokenizer available here (offline, no API key, base class).
+                pass
+        self.exact = False
+        return _estimate(messages, tools)
+
+    def fixed(self, system_prompt: str, tools: Sequence[Any]) -> tuple[int, int]:
+        """Tokens of the system prompt, and of the tool schemas on top of it."""
+        schemas = [_schema(tool) for tool in tools]
+        key = json.dumps([system_prompt, schemas], sort_keys=True, default=str)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        system = self.count([SystemMessage(system_prompt)])
+        with_tools = self.count([SystemMessage(system_prompt)], schemas) if schemas else system
+        counts = (system, max(with_tools - system, 0))
+        with self._lock:
+            self._cache[key] = counts
+        return counts
+
+    def measure(
+        self, system_prompt: str, tools: Sequence[Any], messages: Sequence[BaseMessage] = ()
+    ) -> PromptBudget:
+        """Split the tokens of a call with this system prompt, tools and history."""
+        system, tool_tokens = self.fixed(system_prompt, tools)
+        history = 0
+        if messages:
+            history = max(self.count([SystemMessage(system_prompt), *messages]) - system, 0)
+        return PromptBudget(system, tool_tokens, history, self.exact)
+
+
+def _schema(tool: Any) -> dict:
+    return tool if isinstance(tool, dict) else convert_to_openai_tool(tool)
+
+
+_encoding = None
+
+
+def _estimate(messages: Sequence[BaseMessage], tools: Optional[Sequence[Any]] = None) -> int:
+    global _encoding
+    text = "".join(m.content if isinstance(m.content, str) else json.dumps(m.content) for m in messages)
+    if tools:
+        text += json.dumps([_schema(tool) for tool in tools])
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class StepBudget(NamedTuple):
+    agent: str
+    budget: PromptBudget
+
+
+class BudgetTracker(BaseCallbackHandler):
+    """Records the prompt tokens of every model call in a run.
+
+    Pass it as a callback, e.g. `agent.invoke(inputs, config={"callbacks": [tracker]})`.
+    Calls made by sub-agents are recorded under "subagent".
+    """
+
+    def __init__(self, model: Any = None):
+        self.counter = TokenCounter(model)
+        self.steps: list[StepBudget] = []
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, metadata=None, **kwargs):
+        metadata = metadata or {}
+        tools = (kwargs.get("invocation_params") or {}).get("tools") or []
+        for prompt in messages:
+            system = "\n\n".join(m.content for m in prompt if isinstance(m, SystemMessage) and isinstance(m.content, str))
+            history = [m for m in prompt if not isinstance(m, SystemMessage)]
+            budget = self.counter.measure(system, tools, history)
+            # Sub-agents run inside the main graph's tools node.
+            agent = "subagent" if "|" in metadata.get("langgraph_checkpoint_ns", "") else "main"
+            with self._lock:
+                self.steps.append(StepBudget(agent, budget))
+                del self.steps[:-MAX_TRACKED_CALLS]
+
+    def totals(self) -> dict[str, dict[str, int]]:
+        """Summed tokens per agent over the recorded calls."""
+        with self._lock:
+            steps = list(self.steps)
+        totals: dict[str, dict[str, int]] = {}
+        for agent, budget in steps:
+            entry = totals.setdefault(agent, {"calls": 0, "system": 0, "tools": 0, "history": 0})
+            entry["calls"] += 1
+            entry["system"] += budget.system
+            entry["tools"] += budget.tools
+            entry["history"] += budget.history
+        return totals
@@ -0,0 +1,231 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable, NamedTuple, Optional
+
+from deepagents.db import get_pool
+
+
+def quote_ident(*names: str) -> str:
+    """`names` as one dotted, double-quoted SQL identifier, as `psycopg2.sql.Identifier` renders it.
+
+    `sql.Identifier` needs a live connection to render; SQL generated from
+    the cached catalog is quoted the same way without one.
+    """
+    return ".".join('"' + name.replace('"', '""') + '"' for name in names)
+
+
+class ColumnInfo(NamedTuple):
+    name: str
+    data_type: str
+    nullable: bool
+    comment: Optional[str]
+    is_primary_key: bool
+
+
+class TableInfo(NamedTuple):
+    oid: int
+    schema: str
+    name: str
+    comment: Optional[str]
+    columns: list[ColumnInfo]
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{self.schema}.{self.name}"
+
+
+class ForeignKey(NamedTuple):
+    name: str
+    table_oid: int
+    columns: list[str]
+    referenced_table_oid: int
+    referenced_columns: list[str]
+
+
+class Catalog(NamedTuple):
+    """A snapshot of the user-visible relations of a database."""
+
+    tables: list[TableInfo]
+    loaded_at: float
+    foreign_keys: list[ForeignKey] = []
+    # Key columns of every index, in index order, by table OID.
+    indexes: dict[int, list[list[str]]] = {}
+
+
+# One round trip for every table, column and comment outside the system schemas.
+CATALOG_QUERY = """
+    SELECT
+        c.oid,
+        n.nspname,
+        c.relname,
+        td.description,
+        a.attname,
+        format_type(a.atttypid, a.atttypmod),
+        NOT a.attnotnull,
+        cd.description,
+        COALESCE(a.attnum = ANY(pk.indkey), false)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_description td
+        ON td.objoid = c.oid AND td.classoid = 'pg_class'::regclass AND td.objsubid = 0
+    LEFT JOIN pg_attribute a
+        ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+    LEFT JOIN pg_description cd
+        ON cd.objoid = c.oid AND cd.classoid = 'pg_class'::regclass AND cd.objsubid = a.attnum
+    LEFT JOIN pg_index pk
+        ON pk.indrelid = c.oid AND pk.indisprimary
+    WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f')
+      AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+      AND n.nspname NOT LIKE 'pg\\_toast%'
+      AND n.nspname NOT LIKE 'pg\\_temp\\_%'
+    ORDER BY n.nspname, c.relname, a.attnum
+"""
+
+
+FOREIGN_KEYS_QUERY = """
+    SELECT
+        con.conname,
+        con.conrelid,
+        ARRAY(
+            SELECT a.attname
+            FROM unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+            JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+            ORDER BY k.ord
+        ),
+        con.confrelid,
+        ARRAY(
+            SELECT a.attname
+            FROM unnest(con.confkey) WITH ORDINALITY AS k(attnum, ord)
+            JOIN pg_attribute a ON a.attrelid = con.confrelid AND a.attnum = k.attnum
+            ORDER BY k.ord
+        )
+    FROM pg_constraint con
+    JOIN pg_namespace n ON n.oid = con.connamespace
+    WHERE con.contype = 'f'
+      AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+    ORDER BY con.conrelid, con.conname
+"""
+
+# Expression columns have no attribute name and come back as NULL, which
+# ends the usable prefix of that index.
+INDEXES_QUERY = """
+    SELECT
+        i.indrelid,
+        ARRAY(
+            SELECT a.attname
+            FROM unnest(i.indkey::int2[]) WITH ORDINALITY AS k(attnum, ord)
+            LEFT JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+            WHERE k.ord <= i.indnkeyatts
+            ORDER BY k.ord
+        )
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE i.indisvalid
+      AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+      AND n.nspname NOT LIKE 'pg\\_toast%'
+"""
+
+
+def load_catalog(conn) -> Catalog:
+    """Read the tables, foreign keys and indexes of the database behind `conn`."""
+    cursor = conn.cursor()
+    cursor.execute(CATALOG_QUERY)
+    tables = []
+    current = None
+    for (oid, schema, name, table_comment, column_name, data_type,
+         nullable, column_comment, is_primary_key) in cursor:
+        if current is None or current.oid != oid:
+            current = TableInfo(oid, schema, name, table_comment, [])
+            tables.append(current)
+        if column_name is not None:
+            current.columns.append(
+                ColumnInfo(column_name, data_type, nullable, column_comment, is_primary_key)
+            )
+
+    cursor.execute(FOREIGN_KEYS_QUERY)
+    foreign_keys = [ForeignKey(*row) for row in cursor]
+
+    cursor.execute(INDEXES_QUERY)
+    indexes: dict[int, list[list[str]]] = {}
+    for table_oid, columns in cursor:
+        prefix = []
+        for column in columns:
+            if column is None:
+                break
+            prefix.append(column)
+        if prefix:
+            indexes.setdefault(table_oid, []).append(prefix)
+
+    cursor.close()
+    return Catalog(tables, time.time(), foreign_keys, indexes)
+
+
+def catalog_fingerprint(catalog: Catalog) -> str:
+    """A hash of the tables, columns, comments, keys and indexes in `catalog`, which changes with the schema."""
+    schema = catalog._replace(loaded_at=0)
+    return hashlib.sha256(json.dumps(schema, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+_catalogs: dict[str, Catalog] = {}
+# Guards the caches and `_load_locks`. Loads and rebuilds run under the
+# connection string's own lock, so a slow database never blocks the others.
+_catalogs_lock = threading.Lock()
+_load_locks: dict[str, threading.Lock] = {}
+
+
+def _load_lock(db_connection: str) -> threading.Lock:
+    with _catalogs_lock:
+        return _load_locks.setdefault(db_connection, threading.Lock())
+
+
+def get_catalog(db_connection: str, max_age: float = 600.0) -> Catalog:
+    """Return the cached catalog for `db_connection`, reloading it once it is older than `max_age` seconds."""
+    catalog = _catalogs.get(db_connection)
+    if catalog is not None and time.time() - catalog.loaded_at < max_age:
+        return catalog
+    with _load_lock(db_connection):
+        catalog = _catalogs.get(db_connection)
+        if catalog is not None and time.time() - catalog.loaded_at < max_age:
+            return catalog
+        conn = get_pool(db_connection).acquire()
+        try:
+            catalog = load_catalog(conn)
+        finally:
+            conn.close()
+        with _catalogs_lock:
+            _catalogs[db_connection] = catalog
+        return catalog
+
+
+_derived: dict[tuple[str, Callable], tuple[float, Any]] = {}
+
+
+def get_derived(db_connection: str, factory: Callable[[Catalog], Any]) -> Any:
+    """Return `factory(catalog)` for the cached catalog, rebuilding it only when the catalog is reloaded."""
+    catalog = get_catalog(db_connection)
+    key = (db_connection, factory)
+    cached = _derived.get(key)
+    if cached is not None and cached[0] == catalog.loaded_at:
+        return cached[1]
+    with _load_lock(db_connection):
+        cached = _derived.get(key)
+        if cached is None or cached[0] != catalog.loaded_at:
+            cached = (catalog.loaded_at, factory(catalog))
+            with _catalogs_lock:
+                _derived[key] = cached
+        return cached[1]
+
+
+def invalidate_catalog(db_connection: Optional[str] = None) -> None:
+    """Drop the cached catalog for one connection string, or for all of them."""
+    with _catalogs_lock:
+        if db_connection is None:
+            _catalogs.clear()
+            _derived.clear()
+        else:
+            _catalogs.pop(db_connection, None)
+            for key in [key for key in _derived if key[0] == db_connection]:
+                del _derived[key]
@@ -0,0 +1,379 @@
+import io
+import struct
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from decimal import Decimal
+from typing import Any, Callable, NamedTuple, Optional
+from zoneinfo import ZoneInfo
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; columns are plain lists without it.
+    np = None
+
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+
+_PG_EPOCH_DATE = date(2000, 1, 1)
+_PG_EPOCH_DATETIME = datetime(2000, 1, 1)
+# Days and microseconds between the Unix epoch and the Postgres epoch.
+_PG_EPOCH_DAYS = 10957
+_PG_EPOCH_MICROS = 946684800000000
+
+# Binary infinity and -infinity of date and timestamp columns. They decode to
+# the values psycopg2 gives them on the row path: date.max, datetime.min, ...
+_DATE_INFINITIES = {2**31 - 1: date.max, -2**31: date.min}
+_TIMESTAMP_INFINITIES = {2**63 - 1: datetime.max, -2**63: datetime.min}
+# Those values as str() prints them, mapped to the way Postgres prints them.
+INFINITY_TEXTS = {
+    str(date.max): "infinity",
+    str(datetime.max): "infinity",
+    str(datetime.max.replace(tzinfo=timezone.utc)): "infinity",
+    str(date.min): "-infinity",
+    str(datetime.min): "-infinity",
+    str(datetime.min.replace(tzinfo=timezone.utc)): "-infinity",
+}
+# TimeZone settings whose timestamptz values render with "+00:00".
+_UTC_NAMES = {"UTC", "ETC/UTC", "UCT", "ETC/UCT", "GMT", "ETC/GMT", "ZULU", "ETC/ZULU"}
+
+# Type OIDs with a fixed binary width: (struct code, width, numpy dtype).
+FIXED_WIDTH_TYPES = {
+    16: ("?", 1, "?"),         # bool
+    20: ("q", 8, ">i8"),       # int8
+    21: ("h", 2, ">i2"),       # int2
+    23: ("i", 4, ">i4"),       # int4
+    26: ("I", 4, ">u4"),       # oid
+    700: ("f", 4, ">f4"),      # float4
+    701: ("d", 8, ">f8"),      # float8
+    1082: ("i", 4, ">i4"),     # date
+    1114: ("q", 8, ">i8"),     # timestamp
+    1184: ("q", 8, ">i8"),     # timestamptz
+}
+TEXT_TYPES = {18, 19, 25, 1042, 1043}  # char, name, text, bpchar, varchar
+NUMERIC_OID = 1700
+FLOAT4_OID = 700
+TIMESTAMPTZ_OID = 1184
+DATE_OIDS = {1082}
+TIMESTAMP_OIDS = {1114, 1184}
+
+
+class UnsupportedColumnType(Exception):
+    """Raised when a result column has no binary decoder; use the row path instead."""
+
+
+class ColumnarResult(NamedTuple):
+    column_names: list[str]
+    type_oids: list[int]
+    # One entry per column: a NumPy array when NumPy is installed, else a list.
+    columns: list[Any]
+    # Per column, a boolean NumPy array (or list) that is True for NULLs, or
+    # None when the column has no NULLs.
+    null_masks: list[Optional[Any]]
+    row_count: int
+    # The session TimeZone, in which timestamptz values are rendered.
+    time_zone: tzinfo = timezone.utc
+
+
+def _decode_numeric(data: bytes) -> Decimal:
+    ndigits, weight, sign, dscale = struct.unpack_from(">hhHH", data)
+    if sign == 0xC000:
+        return Decimal("NaN")
+    if sign == 0xD000:
+        return Decimal("Infinity")
+    if sign == 0xF000:
+        return Decimal("-Infinity")
+    digits = struct.unpack_from(f">{ndigits}h", data, 8)
+    value = 0
+    for digit in digits:
+        value = value * 10000 + digit
+    # `weight` is the base-10000 exponent of the first digit; build the exact
+    # decimal string with `dscale` fractional digits, as Postgres prints it.
+    exponent = (weight - ndigits + 1) * 4
+    if exponent >= 0:
+        integer_part, fraction = str(value * 10 ** exponent), ""
+    else:
+        text = str(value).rjust(1 - exponent, "0")
+        integer_part, fraction = text[:exponent], text[exponent:]
+    fraction = fraction[:dscale].ljust(dscale, "0")
+    text = f"{integer_part}.{fraction}" if fraction else integer_part
+    return Decimal("-" + text if sign == 0x4000 else text)
+
+
+def _decode_date(days: int) -> date:
+    infinite = _DATE_INFINITIES.get(days)
+    return infinite if infinite is not None else _PG_EPOCH_DATE + timedelta(days=days)
+
+
+def _decode_timestamp(micros: int, tz: Optional[tzinfo] = None) -> datetime:
+    value = _TIMESTAMP_INFINITIES.get(micros) or _PG_EPOCH_DATETIME + timedelta(microseconds=micros)
+    return value.replace(tzinfo=tz)
+
+
+def _without_infinities(values, infinities: dict, epoch, unit: timedelta):
+    """An int64 NumPy array of `unit`s since `epoch`, with infinities replaced by their stand-ins."""
+    values = values.astype("int64")
+    for sentinel, stand_in in infinities.items():
+        values[values == sentinel] = (stand_in - epoch) // unit
+    return values
+
+
+def name_infinities(strings: list[str]) -> list[str]:
+    """`strings` of rendered dates or timestamps, with psycopg2's stand-ins for infinities named as Postgres does."""
+    if INFINITY_TEXTS.keys().isdisjoint(strings):
+        return strings
+    return [INFINITY_TEXTS.get(text, text) for text in strings]
+
+
+def truncate(text: str, max_width: int) -> str:
+    """`text` cut to `max_width` characters, ending in "...", when it is longer."""
+    return text if len(text) <= max_width else text[:max_width - 3] + "..."
+
+
+def session_time_zone(cursor) -> tzinfo:
+    """The session's TimeZone setting, as psycopg2 applies it to timestamptz values."""
+    cursor.execute("SELECT current_setting('TimeZone'), EXTRACT(TIMEZONE FROM now())::int")
+    name, offset = cursor.fetchone()
+    if name.upper() in _UTC_NAMES:
+        return timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (KeyError, ValueError):
+        # POSIX-style settings such as '<-03>+03' are fixed offsets.
+        return timezone(timedelta(seconds=offset))
+
+
+def _shortest_float4(value: float) -> float:
+    """The shortest decimal that round-trips through float4, as Postgres prints it."""
+    for precision in range(1, 10):
+        candidate = float(f"{value:.{precision}g}")
+        try:
+            if struct.unpack(">f", struct.pack(">f", candidate))[0] == value:
+                return candidate
+        except OverflowError:
+            # Rounded past the largest float4, e.g. 3.4028235e+38 to 3e+38 is fine but 4e+38 is not.
+            continue
+    return value
+
+
+def _field_decoder(type_oid: int) -> Callable[[bytes], Any]:
+    if type_oid in TEXT_TYPES:
+        return lambda data: data.decode("utf-8")
+    if type_oid == NUMERIC_OID:
+        return _decode_numeric
+    if type_oid in DATE_OIDS:
+        return lambda data: _decode_date(struct.unpack(">i", data)[0])
+    if type_oid == 1114:
+        return lambda data: _decode_timestamp(struct.unpack(">q", data)[0])
+    if type_oid == TIMESTAMPTZ_OID:
+        return lambda data: _decode_timestamp(struct.unpack(">q", data)[0], timezone.utc)
+    if type_oid == FLOAT4_OID:
+        return lambda data: _shortest_float4(struct.unpack(">f", data)[0])
+    if type_oid in FIXED_WIDTH_TYPES:
+        code = ">" + FIXED_WIDTH_TYPES[type_oid][0]
+        return lambda data: struct.unpack(code, data)[0]
+    raise UnsupportedColumnType(type_oid)
+
+
+def _to_numpy(values: list, type_oid: int, nulls: list[bool]):
+    """Convert a decoded column to a NumPy array, with NULLs zero-filled."""
+    if type_oid in FIXED_WIDTH_TYPES and type_oid not in DATE_OIDS | TIMESTAMP_OIDS:
+        dtype = np.dtype(FIXED_WIDTH_TYPES[type_oid][2]).newbyteorder("=")
+        return np.array([0 if is_null else v for v, is_null in zip(values, nulls)], dtype=dtype)
+    if type_oid in DATE_OIDS:
+        return np.array([v if v is not None else "NaT" for v in values], dtype="datetime64[D]")
+    if type_oid in TIMESTAMP_OIDS:
+        return np.array(
+            [v.replace(tzinfo=None) if v is not None else "NaT" for v in values], dtype="datetime64[us]"
+        )
+    return np.array(values, dtype=object)
+
+
+def _decode_fixed(payload: memoryview, type_oids: list[int]) -> Optional[list[Any]]:
+    """Decode a stream of NULL-free fixed-width tuples in one step, or return None."""
+    ncols = len(type_oids)
+    widths = [FIXED_WIDTH_TYPES[oid][1] for oid in type_oids]
+    tuple_size = 2 + sum(4 + width for width in widths)
+    if len(payload) % tuple_size:
+        return None
+    row_count = len(payload) // tuple_size
+
+    if np is not None:
+        fields = [("count", ">i2")]
+        for i, oid in enumerate(type_oids):
+            fields.append((f"len{i}", ">i4"))
+            fields.append((f"val{i}", FIXED_WIDTH_TYPES[oid][2]))
+        records = np.frombuffer(payload, dtype=np.dtype(fields), count=row_count)
+        # A NULL field shortens its tuple, so every length word matching its
+        # type width proves the stream really is a grid of fixed-size tuples.
+        if not (records["count"] == ncols).all():
+            return None
+        if not all((records[f"len{i}"] == widths[i]).all() for i in range(ncols)):
+            return None
+        columns = []
+        for i, oid in enumerate(type_oids):
+            values = records[f"val{i}"]
+            if oid in DATE_OIDS:
+                days = _without_infinities(values, _DATE_INFINITIES, _PG_EPOCH_DATE, timedelta(days=1))
+                columns.append((days + _PG_EPOCH_DAYS).astype("datetime64[D]"))
+            elif oid in TIMESTAMP_OIDS:
+                micros = _without_infinities(values, _TIMESTAMP_INFINITIES, _PG_EPOCH_DATETIME, timedelta(microseconds=1))
+                columns.append((micros + _PG_EPOCH_MICROS).astype("datetime64[us]"))
+            else:
+                columns.append(values.astype(values.dtype.newbyteorder("=")))
+        return columns
+
+    fmt = ">h" + "".join("i" + FIXED_WIDTH_TYPES[oid][0] for oid in type_oids)
+    unpacked = list(struct.iter_unpack(fmt, payload))
+    for row in unpacked:
+        if row[0] != ncols or any(row[1 + 2 * i] != widths[i] for i in range(ncols)):
+            return None
+    columns = []
+    for i, oid in enumerate(type_oids):
+        values = [row[2 + 2 * i] for row in unpacked]
+        if oid in DATE_OIDS:
+            values = [_decode_date(v) for v in values]
+        elif oid in TIMESTAMP_OIDS:
+            tz = timezone.utc if oid == TIMESTAMPTZ_OID else None
+            values = [_decode_timestamp(v, tz) for v in values]
+        elif oid == FLOAT4_OID:
+            values = [_shortest_float4(v) for v in values]
+        columns.append(values)
+    return columns
+
+
+def decode_copy_binary(data: bytes, type_oids: list[int]) -> tuple[list[Any], list[Optional[Any]], int]:
+    """Decode a binary COPY stream into `(columns, null_masks, row_count)`."""
+    if not data.startswith(COPY_SIGNATURE):
+        raise ValueError("Not a binary COPY stream")
+    offset = len(COPY_SIGNATURE) + 4  # signature, flags
+    (extension_length,) = struct.unpack_from(">i", data, offset)
+    offset += 4 + extension_length
+    view = memoryview(data)
+    # Everything between the header and the int16 -1 trailer is tuples.
+    payload = view[offset:len(data) - 2]
+    ncols = len(type_oids)
+
+    if ncols and all(oid in FIXED_WIDTH_TYPES for oid in type_oids):
+        columns = _decode_fixed(payload, type_oids)
+        if columns is not None:
+            row_count = len(columns[0])
+            return columns, [None] * ncols, row_count
+
+    decoders = [_field_decoder(oid) for oid in type_oids]
+    columns = [[] for _ in range(ncols)]
+    nulls = [[] for _ in range(ncols)]
+    unpack_int16 = struct.Struct(">h").unpack_from
+    unpack_int32 = struct.Struct(">i").unpack_from
+    end = len(data) - 2
+    row_count = 0
+    while offset < end:
+        (count,) = unpack_int16(data, offset)
+        offset += 2
+        if count == -1:
+            break
+        for i in range(count):
+            (length,) = unpack_int32(data, offset)
+            offset += 4
+            if length == -1:
+                columns[i].append(None)
+                nulls[i].append(True)
+            else:
+                columns[i].append(decoders[i](data[offset:offset + length]))
+                nulls[i].append(False)
+                offset += length
+        row_count += 1
+
+    null_masks = []
+    for i in range(ncols):
+        has_nulls = any(nulls[i])
+        if np is not None:
+            columns[i] = _to_numpy(columns[i], type_oids[i], nulls[i])
+            null_masks.append(np.array(nulls[i], dtype=bool) if has_nulls else None)
+        else:
+            null_masks.append(nulls[i] if has_nulls else None)
+    return columns, null_masks, row_count
+
+
+def fetch_columnar(conn, query: str) -> ColumnarResult:
+    """Run a SELECT through binary COPY and return its result column by column.
+
+    This skips building a Python tuple of boxed values per row. When every
+    column has a fixed-width type and there are no NULLs, the whole stream is
+    decoded in one step (a NumPy structured dtype, or `struct.iter_unpack`
+    without NumPy); other results go through a per-field decoder that still
+    fills columns rather than rows.
+
+    Raises UnsupportedColumnType if a column type has no binary decoder.
+    """
+    query = query.strip().rstrip(";")
+    cursor = conn.cursor()
+    # COPY does not describe its output, so take the column names and types
+    # from an empty run of the same query.
+    cursor.execute(f"SELECT * FROM ({query}) AS columnar_query LIMIT 0")
+    column_names = [desc[0] for desc in cursor.description]
+    type_oids = [desc[1] for desc in cursor.description]
+    for oid in type_oids:
+        if oid not in FIXED_WIDTH_TYPES and oid not in TEXT_TYPES and oid != NUMERIC_OID:
+            cursor.close()
+            raise UnsupportedColumnType(oid)
+
+    time_zone = session_time_zone(cursor) if TIMESTAMPTZ_OID in type_oids else timezone.utc
+
+    buffer = io.BytesIO()
+    cursor.copy_expert(f"COPY ({query}) TO STDOUT (FORMAT binary)", buffer)
+    cursor.close()
+    columns, null_masks, row_count = decode_copy_binary(buffer.getvalue(), type_oids)
+    return ColumnarResult(column_names, type_oids, columns, null_masks, row_count, time_zone)
+
+
+def _in_time_zone(value: Optional[datetime], time_zone: tzinfo) -> Optional[datetime]:
+    """A UTC timestamptz value in the session time zone; infinities stay as they are, as on the row path."""
+    if value is None or value.replace(tzinfo=None) in (datetime.max, datetime.min):
+        return value
+    return value.replace(tzinfo=timezone.utc).astimezone(time_zone)
+
+
+def format_columns(result: ColumnarResult, max_width: int = 100) -> list[list[str]]:
+    """Render every column to strings at once; NULLs become "NULL".
+
+    Values render as on the row path: timestamptz in the session time
+    zone and infinite dates and timestamps as `infinity`/`-infinity`.
+    """
+    rendered = []
+    for values, nulls, oid in zip(result.columns, result.null_masks, result.type_oids):
+        if oid == TIMESTAMPTZ_OID and result.time_zone is not timezone.utc:
+            # Offsets vary with the date (DST), so convert value by value.
+            if np is not None and isinstance(values, np.ndarray):
+                values = values.tolist()
+            values = [_in_time_zone(value, result.time_zone) for value in values]
+            if nulls is not None:
+                values = [None if is_null else value for value, is_null in zip(values, nulls)]
+        if np is not None and isinstance(values, np.ndarray):
+            if values.dtype.kind == "M":
+                strings = np.datetime_as_string(values, unit="D" if oid in DATE_OIDS else "us")
+                # Like str(datetime): a space separator, no zero microseconds.
+                strings = np.char.replace(np.char.replace(strings, "T", " "), ".000000", "")
+                if oid == TIMESTAMPTZ_OID:
+                    strings = np.char.add(strings, "+00:00")
+            elif values.dtype.kind == "b":
+                strings = np.where(values, "True", "False")
+            elif values.dtype == np.float32:
+                # NumPy prints the shortest decimal that round-trips through
+                # float4, as Postgres does; widening to float64 first would
+                # print 0.1 as 0.10000000149011612.
+                strings = np.array([str(float(text)) for text in values.astype(str).tolist()], dtype=object)
+            elif values.dtype.kind in "iuf":
+                # Converting through native Python numbers is faster than
+                # NumPy's own string casting and prints floats the same way.
+                strings = np.array(list(map(str, values.tolist())), dtype=object)
+            else:
+                strings = values.astype(str)
+            if nulls is not None:
+                strings = np.where(nulls, "NULL", strings)
+            strings = strings.tolist()
+        else:
+            strings = ["NULL" if v is None else str(v) for v in values]
+        if oid in DATE_OIDS or oid in TIMESTAMP_OIDS:
+            strings = name_infinities(strings)
+        if oid in TEXT_TYPES:
+            strings = [truncate(s, max_width) for s in strings]
+        rendered.append(strings)
+    return rendered
@@ -0,0 +1,480 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, Sequence
+
+import psycopg2
+from psycopg2.errors import InvalidSqlStatementName
+
+from deepagents.admission import INTERACTIVE, LOAD_QUERY, AdmissionController, AdmissionRejected, ServerLoad
+
+# Connections checked out at once per DSN, and how long an idle one is kept
+# before it is closed.
+MAX_CONNECTIONS = 8
+MAX_IDLE_SECONDS = 300.0
+# Across all pools: open connections, pools kept, seconds before an unused
+# pool is shut down, and how long opening a connection may wait for budget.
+MAX_OPEN_CONNECTIONS = 64
+MAX_POOLS = 128
+POOL_IDLE_SECONDS = 600.0
+CONNECT_TIMEOUT = 30.0
+SWEEP_INTERVAL = 30.0
+# Tenants with at least this many calls get their next pool pre-warmed with
+# up to WARM_CONNECTIONS connections; usage of this many tenants is remembered.
+HOT_TENANT_CALLS = 3
+WARM_CONNECTIONS = 2
+MAX_TENANT_HISTORY = 4096
+# Prepared statements kept per connection.
+MAX_PREPARED_STATEMENTS = 64
+
+_PLACEHOLDER = re.compile(r"%s|%%")
+
+
+def _to_positional(sql: str) -> str:
+    """Rewrite psycopg2's `%s` placeholders as Postgres' `$1, $2, ...`."""
+    count = 0
+
+    def replace(match):
+        nonlocal count
+        if match.group() == "%%":
+            return "%"
+        count += 1
+        return f"${count}"
+
+    return _PLACEHOLDER.sub(replace, sql)
+
+
+class PreparedStatementCache:
+    """An LRU of the statements PREPAREd on one server session.
+
+    Statements are keyed by their SQL text and executed by name, so Postgres
+    parses and plans them once per connection instead of once per call. The
+    cache belongs to a single connection: a reconnect starts with an empty one.
+    A `max_size` of 0 disables preparing.
+    """
+
+    def __init__(self, max_size: int = MAX_PREPARED_STATEMENTS):
+        self.max_size = max_size
+        self._names: OrderedDict[str, str] = OrderedDict()
+        self._unpreparable: set[str] = set()
+        self.prepares = 0
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def clear(self) -> None:
+        self._names.clear()
+
+    def execute(self, cursor, sql: str, params: Optional[Sequence[Any]] = None) -> None:
+        """Execute `sql` (with `%s` placeholders) through a prepared statement."""
+        if self.max_size <= 0 or sql in self._unpreparable:
+            cursor.execute(sql, params)
+            return
+        try:
+            name = self._prepare(cursor, sql, params)
+        except psycopg2.ProgrammingError:
+            # Not every statement can be prepared; run it as a plain query from now on.
+            cursor.connection.rollback()
+            self._unpreparable.add(sql)
+            cursor.execute(sql, params)
+            return
+        try:
+            self._execute(cursor, name, params)
+        except InvalidSqlStatementName:
+            # The session lost its statements (e.g. DISCARD ALL behind a pooler).
+            cursor.connection.rollback()
+            self.clear()
+            self._execute(cursor, self._prepare(cursor, sql, params), params)
+
+    def _prepare(self, cursor, sql: str, params) -> str:
+        name = self._names.get(sql)
+        if name is not None:
+            self._names.move_to_end(sql)
+            self.hits += 1
+            return name
+        name = "deepagents_" + hashlib.sha1(sql.encode()).hexdigest()[:16]
+        # Without parameters psycopg2 sends the SQL untouched, so only
+        # parameterized statements need their placeholders rewritten.
+        text = _to_positional(sql) if params is not None else sql
+        cursor.execute(f"PREPARE {name} AS {text}")
+        self._names[sql] = name
+        self.prepares += 1
+        if len(self._names) > self.max_size:
+            _, evicted = self._names.popitem(last=False)
+            cursor.execute(f"DEALLOCATE {evicted}")
+        return name
+
+    @staticmethod
+    def _execute(cursor, name: str, params) -> None:
+        if params:
+            cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cursor.execute(f"EXECUTE {name}")
+
+
+class PreparedCursor:
+    """A cursor that can also run statements through its connection's prepared statement cache."""
+
+    def __init__(self, cursor, statements: PreparedStatementCache, connection=None):
+        self._cursor = cursor
+        self._statements = statements
+        # The pooled connection, so the cache's rollbacks restore its snapshot.
+        self.connection = connection if connection is not None else cursor.connection
+
+    def execute_prepared(self, sql: str, params: Optional[Sequence[Any]] = None) -> None:
+        self._statements.execute(self, sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class PooledConnection:
+    """A pooled psycopg2 connection together with its prepared statements.
+
+    `close()` returns the connection to its pool rather than closing it.
+    While checked out on an exported snapshot, every transaction it starts,
+    including the one after a `rollback()`, reads from that snapshot.
+    """
+
+    def __init__(self, conn, max_statements: int = MAX_PREPARED_STATEMENTS):
+        self.conn = conn
+        self.statements = PreparedStatementCache(max_statements)
+        self.last_used = time.monotonic()
+        self.snapshot: Optional[str] = None
+        self._release: Optional[Callable[[], None]] = None
+
+    def cursor(self, *args, **kwargs) -> PreparedCursor:
+        return PreparedCursor(self.conn.cursor(*args, **kwargs), self.statements, self)
+
+    def begin_snapshot(self, snapshot: str) -> None:
+        """Start a read-only transaction on the exported `snapshot` (see `pg_export_snapshot()`)."""
+        self.snapshot = snapshot
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+            cursor.execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+        finally:
+            cursor.close()
+
+    def rollback(self) -> None:
+        self.conn.rollback()
+        if self.snapshot is not None:
+            self.begin_snapshot(self.snapshot)
+
+    def close(self) -> None:
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+class ConnectionPool:
+    """A small pool of connections to one DSN behind an admission controller.
+
+    At most `max_connections` connections are checked out at once (fewer
+    while the server reports overload); further callers queue by priority
+    and are rejected with AdmissionRejected when their deadline cannot be met.
+    Opening a connection takes a slot from the `manager`'s global budget.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        max_connections: int = MAX_CONNECTIONS,
+        max_idle_seconds: float = MAX_IDLE_SECONDS,
+        max_statements: int = MAX_PREPARED_STATEMENTS,
+        manager: Optional["ConnectionManager"] = None,
+    ):
+        self.dsn = dsn
+        self.max_connections = max_connections
+        self.max_idle_seconds = max_idle_seconds
+        self.max_statements = max_statements
+        self.manager = manager
+        self.admission = AdmissionController(max_connections, probe=self._probe_load)
+        self._lock = threading.Lock()
+        self._idle: list[PooledConnection] = []
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.calls = 0
+        self.last_used = time.monotonic()
+        self.closed = False
+
+    def _connect(self, block: bool = True) -> Optional[PooledConnection]:
+        """Open a new connection within the global budget; without `block`, None if it is spent."""
+        if self.manager is not None and not self.manager.reserve(self, block):
+            return None
+        try:
+            return PooledConnection(psycopg2.connect(self.dsn), self.max_statements)
+        except BaseException:
+            if self.manager is not None:
+                self.manager.unreserve()
+            raise
+
+    def _discard(self, pooled: PooledConnection) -> None:
+        pooled.conn.close()
+        if self.manager is not None:
+            self.manager.unreserve()
+
+    def _take_idle(self) -> Optional[PooledConnection]:
+        now = time.monotonic()
+        stale = []
+        pooled = None
+        with self._lock:
+            while self._idle:
+                candidate = self._idle.pop()
+                if candidate.conn.closed or now - candidate.last_used > self.max_idle_seconds:
+                    stale.append(candidate)
+                    continue
+                pooled = candidate
+                break
+        for candidate in stale:
+            self._discard(candidate)
+        return pooled
+
+    def _checkout(self) -> PooledConnection:
+        return self._take_idle() or self._connect()
+
+    def _checkin(self, pooled: PooledConnection) -> None:
+        pooled.snapshot = None
+        if not pooled.conn.closed:
+            try:
+                # End any open transaction; the session and its prepared statements stay.
+                pooled.conn.rollback()
+            except psycopg2.Error:
+                pooled.conn.close()
+        if pooled.conn.closed or self.closed:
+            # A broken connection is dropped together with its statements; the
+            # next checkout reconnects with an empty cache.
+            self._discard(pooled)
+            return
+        pooled.last_used = time.monotonic()
+        with self._lock:
+            self._idle.append(pooled)
+        if self.manager is not None:
+            # Pools waiting for budget can now reclaim this idle connection.
+            self.manager.notify_returned()
+
+    def acquire(
+        self, priority: int = INTERACTIVE, deadline: Optional[float] = None, snapshot: Optional[str] = None
+    ) -> PooledConnection:
+        """Check out a connection; `close()` it to give it back.
+
+        With `snapshot`, an identifier from `pg_export_snapshot()`, the
+        connection reads from that snapshot until it is given back.
+        """
+        self.admission.acquire(priority, deadline)
+        started = time.monotonic()
+        try:
+            pooled = self._checkout()
+        except BaseException:
+            self.admission.release()
+            raise
+        with self._lock:
+            self.calls += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+        def release():
+            with self._lock:
+                self.in_use -= 1
+                self.last_used = time.monotonic()
+            try:
+                self._checkin(pooled)
+            finally:
+                self.admission.release(time.monotonic() - started)
+
+        pooled._release = release
+        if snapshot is not None:
+            try:
+                pooled.begin_snapshot(snapshot)
+            except BaseException:
+                pooled.close()
+                raise
+        return pooled
+
+    @contextmanager
+    def connection(
+        self, priority: int = INTERACTIVE, deadline: Optional[float] = None, snapshot: Optional[str] = None
+    ) -> Iterator[PooledConnection]:
+        pooled = self.acquire(priority, deadline, snapshot)
+        try:
+            yield pooled
+        finally:
+            pooled.close()
+
+    @contextmanager
+    def dedicated(self) -> Iterator[Any]:
+        """A raw connection kept out of the pool and its admission queue for the block.
+
+        It counts against the global connection budget until the block exits,
+        when it is closed.
+        """
+        pooled = self._connect()
+        try:
+            yield pooled.conn
+        finally:
+            self._discard(pooled)
+
+    def warm(self, n: int) -> None:
+        """Open up to `n` idle connections ahead of demand, as far as the global budget allows."""
+        for _ in range(n - len(self._idle)):
+            pooled = self._connect(block=False)
+            if pooled is None:
+                return
+            self._checkin(pooled)
+
+    def evict_idle(self) -> bool:
+        """Close this pool's least recently used idle connection; False if it has none."""
+        with self._lock:
+            if not self._idle:
+                return False
+            pooled = self._idle.pop(0)
+        self._discard(pooled)
+        return True
+
+    def _probe_load(self) -> ServerLoad:
+        # The probe borrows an idle connection outside admission so it is never
+        # queued behind the calls it regulates; with none idle it opens one
+        # only if the global budget has room.
+        pooled = self._take_idle() or self._connect(block=False)
+        if pooled is None:
+            raise RuntimeError("no connection available to probe server load")
+        try:
+            cursor = pooled.conn.cursor()
+            cursor.execute(LOAD_QUERY)
+            load = ServerLoad(*cursor.fetchone())
+            cursor.close()
+            return load
+        finally:
+            self._checkin(pooled)
+
+    def close(self) -> None:
+        self.closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._discard(pooled)
+
+
+class ConnectionManager:
+    """Per-DSN pools for many tenants under one global connection budget.
+
+    Pools are kept in LRU order. At most `max_pools` are kept, pools unused
+    for `pool_idle_seconds` are shut down, and no more than
+    `max_open_connections` connections are open across all pools: opening
+    one beyond that first closes an idle connection of the least recently
+    used pool, or waits for one to be returned. A tenant whose pool was shut
+    down gets its next pool pre-warmed with as many connections as it
+    recently used at once (up to WARM_CONNECTIONS).
+    """
+
+    def __init__(
+        self,
+        max_open_connections: int = MAX_OPEN_CONNECTIONS,
+        max_pools: int = MAX_POOLS,
+        pool_idle_seconds: float = POOL_IDLE_SECONDS,
+        connect_timeout: float = CONNECT_TIMEOUT,
+    ):
+        self.max_open_connections = max_open_connections
+        self.max_pools = max_pools
+        self.pool_idle_seconds = pool_idle_seconds
+        self.connect_timeout = connect_timeout
+        self.open_connections = 0
+        self._pools: OrderedDict[str, ConnectionPool] = OrderedDict()
+        # Usage of tenants whose pools were shut down: dsn -> (calls, peak in use).
+        self._history: OrderedDict[str, tuple[int, int]] = OrderedDict()
+        self._lock = threading.RLock()
+        self._returned = threading.Condition(self._lock)
+        self._last_sweep = time.monotonic()
+
+    def pool(self, dsn: str) -> ConnectionPool:
+        with self._lock:
+            self._sweep()
+            pool = self._pools.get(dsn)
+            if pool is not None:
+                self._pools.move_to_end(dsn)
+                return pool
+            pool = self._pools[dsn] = ConnectionPool(dsn, manager=self)
+            excess = len(self._pools) - self.max_pools
+            if excess > 0:
+                unused = [p for p in self._pools.values() if p is not pool and p.in_use == 0]
+                for stale in unused[:excess]:
+                    self._shutdown(stale)
+            calls, peak = self._history.pop(dsn, (0, 0))
+        if calls >= HOT_TENANT_CALLS and peak:
+            threading.Thread(
+                target=pool.warm, args=(min(peak, WARM_CONNECTIONS),), name="deepagents-pool-warm", daemon=True
+            ).start()
+        return pool
+
+    def reserve(self, requester: ConnectionPool, block: bool = True) -> bool:
+        """Take one slot of the global connection budget for `requester`."""
+        deadline = time.monotonic() + self.connect_timeout
+        with self._lock:
+            while self.open_connections >= self.max_open_connections:
+                # Reclaim an idle connection from the least recently used pool,
+                # the requester's own last (it may have been returned meanwhile).
+                candidates = [pool for pool in self._pools.values() if pool is not requester] + [requester]
+                if any(pool.evict_idle() for pool in candidates):
+                    continue
+                remaining = deadline - time.monotonic()
+                if not block or remaining <= 0:
+                    if block:
+                        raise AdmissionRejected(
+                            f"too many open database connections ({self.open_connections})"
+                        )
+                    return False
+                self._returned.wait(remaining)
+            self.open_connections += 1
+            return True
+
+    def unreserve(self) -> None:
+        with self._lock:
+            self.open_connections -= 1
+            self._returned.notify()
+
+    def notify_returned(self) -> None:
+        with self._lock:
+            self._returned.notify()
+
+    def _sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        for pool in list(self._pools.values()):
+            if pool.in_use == 0 and now - pool.last_used > self.pool_idle_seconds:
+                self._shutdown(pool)
+
+    def _shutdown(self, pool: ConnectionPool) -> None:
+        del self._pools[pool.dsn]
+        self._history[pool.dsn] = (pool.calls, pool.peak_in_use)
+        while len(self._history) > MAX_TENANT_HISTORY:
+            self._history.popitem(last=False)
+        pool.close()
+
+    def pools(self) -> list[str]:
+        with self._lock:
+            return list(self._pools)
+
+    def close(self) -> None:
+        with self._lock:
+            for pool in list(self._pools.values()):
+                self._shutdown(pool)
+
+
+connection_manager = ConnectionManager()
+
+
+def get_pool(dsn: str) -> ConnectionPool:
+    """Return the process-wide connection pool for `dsn`."""
+    return connection_manager.pool(dsn)
@@ -0,0 +1,345 @@
+import os
+import threading
+import time
+from typing import Any, Callable, NamedTuple, Optional
+
+import psycopg2
+from psycopg2.errors import QueryCanceled
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; only CSV exports are available without it.
+    pa = pc = pa_csv = pq = None
+
+EXPORT_FORMATS = ("csv", "parquet")
+# Rows per Parquet row group. Only one row group is held in memory at a time.
+ROW_GROUP_ROWS = 128 * 1024
+# Bytes of CSV parsed per Arrow record batch.
+CSV_BLOCK_SIZE = 4 * 1024 * 1024
+# Minimum seconds between progress reports.
+PROGRESS_INTERVAL = 1.0
+
+_DESCRIBE_TYPES_QUERY = "SELECT oid, format_type(oid, NULL) FROM pg_type WHERE oid = ANY(%s)"
+
+# How COPY writes infinite dates and timestamps, which Parquet cannot represent.
+INFINITY_TEXTS = ("infinity", "-infinity")
+
+
+class ExportColumn(NamedTuple):
+    name: str
+    pg_type: str
+    # The Parquet column type, or None for CSV exports.
+    arrow_type: Optional[str]
+
+
+class ExportResult(NamedTuple):
+    path: str
+    format: str
+    row_count: int
+    bytes_written: int
+    elapsed: float
+    columns: list[ExportColumn]
+    row_groups: int
+    # Infinite dates and timestamps written to Parquet as NULL, per column.
+    infinities: dict[str, int] = {}
+
+
+def default_export_dir() -> str:
+    """Directory that exports are confined to; override with `DEEPAGENTS_EXPORT_DIR`."""
+    return os.getenv("DEEPAGENTS_EXPORT_DIR") or os.path.join(os.getcwd(), "exports")
+
+
+def resolve_export_path(filename: str, export_format: str, export_dir: Optional[str] = None) -> str:
+    """Resolve `filename` inside the export directory.
+
+    The extension for `export_format` is added when missing. Raises ValueError
+    for paths that would leave the export directory.
+    """
+    root = os.path.realpath(export_dir or default_export_dir())
+    if not filename.lower().endswith(f".{export_format}"):
+        filename = f"{filename}.{export_format}"
+    path = os.path.realpath(os.path.join(root, filename))
+    if os.path.commonpath([root, path]) != root or path == root:
+        raise ValueError(f"Export path must be inside the export directory {root}")
+    return path
+
+
+def _arrow_type(oid: int, description) -> Any:
+    """The Arrow type a CSV field of this Postgres type is parsed as."""
+    if oid == 16:
+        return pa.bool_()
+    if oid == 20:
+        return pa.int64()
+    if oid == 21:
+        return pa.int16()
+    if oid == 23:
+        return pa.int32()
+    if oid == 26:
+        return pa.uint32()
+    if oid == 700:
+        return pa.float32()
+    if oid == 701:
+        return pa.float64()
+    if oid == 1082:
+        return pa.date32()
+    if oid == 1114:
+        return pa.timestamp("us")
+    if oid == 1184:
+        return pa.timestamp("us", tz="UTC")
+    if oid == 1700 and description.precision and 0 < description.precision <= 38:
+        return pa.decimal128(description.precision, description.scale)
+    # Unconstrained numerics keep their exact text, as do all other types.
+    return pa.string()
+
+
+def _describe(conn, query: str) -> tuple[list[Any], dict[int, str]]:
+    """Return the cursor description of `query` and the names of its types."""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT * FROM ({query}) AS export_query LIMIT 0")
+    description = list(cursor.description)
+    cursor.execute(_DESCRIBE_TYPES_QUERY, (list({desc.type_code for desc in description}),))
+    type_names = dict(cursor.fetchall())
+    cursor.close()
+    return description, type_names
+
+
+def _unique_names(names: list[str]) -> list[str]:
+    """Suffix repeated column names (e.g. several `?column?`) so Parquet accepts them."""
+    seen: dict[str, int] = {}
+    unique = []
+    for name in names:
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        unique.append(name if count == 0 else f"{name}_{count + 1}")
+    return unique
+
+
+class _Progress:
+    """Throttled progress reports through `report`, which receives a dict."""
+
+    def __init__(self, report: Optional[Callable[[dict[str, Any]], None]], path: str):
+        self.report = report
+        self.path = path
+        self.started = time.perf_counter()
+        self.last_report = self.started
+        self.bytes = 0
+        self.rows = 0
+
+    def update(self, nbytes: int = 0, rows: int = 0) -> None:
+        self.bytes += nbytes
+        self.rows += rows
+        now = time.perf_counter()
+        if self.report is not None and now - self.last_report >= PROGRESS_INTERVAL:
+            self.last_report = now
+            elapsed = now - self.started
+            self.report({
+                "tool": "postgres_export",
+                "path": self.path,
+                "rows": self.rows,
+                "bytes": self.bytes,
+                "elapsed": round(elapsed, 3),
+                "mb_per_second": round(self.bytes / elapsed / 1e6, 2),
+            })
+
+
+class _CountingFile:
+    """Passes COPY output through to a file while counting bytes for progress."""
+
+    def __init__(self, file, progress: _Progress):
+        self.file = file
+        self.progress = progress
+
+    def write(self, data) -> int:
+        self.progress.update(nbytes=len(data))
+        return self.file.write(data)
+
+
+def export_csv(conn, query: str, path: str, report=None) -> ExportResult:
+    """Stream `COPY (query) TO STDOUT` as CSV with a header line straight into `path`.
+
+    The server's CSV output is written as it arrives, so memory use does not
+    depend on the size of the result and no Python row objects are built.
+    """
+    query = query.strip().rstrip(";")
+    description, type_names = _describe(conn, query)
+    progress = _Progress(report, path)
+    partial = f"{path}.partial"
+    cursor = conn.cursor()
+    try:
+        with open(partial, "wb") as file:
+            cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", _CountingFile(file, progress))
+        row_count = cursor.rowcount
+        os.replace(partial, path)
+    finally:
+        cursor.close()
+        if os.path.exists(partial):
+            os.remove(partial)
+    columns = [ExportColumn(desc.name, type_names.get(desc.type_code, str(desc.type_code)), None) for desc in description]
+    return ExportResult(
+        path, "csv", row_count, os.path.getsize(path), time.perf_counter() - progress.started, columns, 0
+    )
+
+
+def _is_dated(arrow_type) -> bool:
+    return pa.types.is_date(arrow_type) or pa.types.is_timestamp(arrow_type)
+
+
+def _finite(batch, arrow_types, infinities: dict[str, int]):
+    """`batch` with its date and timestamp columns, read as text, parsed; infinities become NULL and are counted."""
+    columns = list(batch.columns)
+    for i, arrow_type in enumerate(arrow_types):
+        if not _is_dated(arrow_type):
+            continue
+        infinite = pc.is_in(columns[i], value_set=pa.array(INFINITY_TEXTS))
+        count = pc.sum(infinite).as_py() or 0
+        if count:
+            name = batch.schema.names[i]
+            infinities[name] = infinities.get(name, 0) + count
+            columns[i] = pc.if_else(infinite, pa.scalar(None, pa.string()), columns[i])
+        columns[i] = pc.cast(columns[i], arrow_type)
+    return pa.RecordBatch.from_arrays(columns, names=batch.schema.names)
+
+
+def _write_row_groups(reader, path, names, arrow_types, schema, progress, row_group_rows) -> tuple[int, dict[str, int]]:
+    """Parse CSV from `reader` into Arrow batches and write them to `path` in row groups.
+
+    Returns the number of row groups and the count of infinite dates and
+    timestamps per column, which are written as NULL.
+    """
+    # Dates and timestamps are read as text first: Arrow cannot parse infinities.
+    read_types = [pa.string() if _is_dated(arrow_type) else arrow_type for arrow_type in arrow_types]
+    dated = any(map(_is_dated, arrow_types))
+    infinities: dict[str, int] = {}
+    batches = pa_csv.open_csv(
+        reader,
+        read_options=pa_csv.ReadOptions(column_names=names, block_size=CSV_BLOCK_SIZE),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=dict(zip(names, read_types)),
+            # COPY writes NULL as an empty unquoted field and '' as "".
+            null_values=[""],
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,
+            true_values=["t"],
+            false_values=["f"],
+        ),
+    )
+    row_groups = 0
+    with pq.ParquetWriter(path, schema) as parquet:
+        pending, pending_rows = [], 0
+        for batch in batches:
+            progress.update(nbytes=batch.nbytes, rows=batch.num_rows)
+            if dated:
+                batch = _finite(batch, arrow_types, infinities)
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if pending_rows >= row_group_rows:
+                # Write whole row groups and carry the remainder (slices are zero-copy).
+                table = pa.Table.from_batches(pending, schema)
+                full = pending_rows - pending_rows % row_group_rows
+                parquet.write_table(table.slice(0, full), row_group_size=row_group_rows)
+                row_groups += full // row_group_rows
+                rest = table.slice(full)
+                pending, pending_rows = rest.to_batches(), rest.num_rows
+        if pending_rows or not row_groups:
+            parquet.write_table(pa.Table.from_batches(pending, schema))
+            row_groups += 1
+    return row_groups, infinities
+
+
+def export_parquet(conn, query: str, path: str, report=None, row_group_rows: int = ROW_GROUP_ROWS) -> ExportResult:
+    """Stream a query result into a Parquet file one row group at a time.
+
+    The server's CSV output is piped from a COPY running in a background
+    thread into Arrow's incremental CSV reader, parsed straight into typed
+    Arrow columns, and flushed as a row group every `row_group_rows` rows.
+    At most one row group plus one parse block is held in memory.
+    """
+    if pa is None:
+        raise ImportError("Parquet export requires pyarrow: pip install deepagents[parquet]")
+    query = query.strip().rstrip(";")
+    description, type_names = _describe(conn, query)
+    names = _unique_names([desc.name for desc in description])
+    arrow_types = [_arrow_type(desc.type_code, desc) for desc in description]
+    schema = pa.schema(list(zip(names, arrow_types)))
+
+    cursor = conn.cursor()
+    # Fix the text forms Arrow has to parse, whatever the server defaults are.
+    # SET LOCAL lasts until the end of this transaction, which the COPY runs in.
+    cursor.execute("SET LOCAL DateStyle TO ISO, YMD")
+    cursor.execute("SET LOCAL TimeZone TO 'UTC'")
+    cursor.execute("SET LOCAL IntervalStyle TO iso_8601")
+
+    read_fd, write_fd = os.pipe()
+    reader, writer = os.fdopen(read_fd, "rb"), os.fdopen(write_fd, "wb")
+    copy_errors: list[BaseException] = []
+
+    def produce():
+        try:
+            cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv)", writer)
+        except BaseException as e:
+            copy_errors.append(e)
+        finally:
+            writer.close()
+
+    progress = _Progress(report, path)
+    partial = f"{path}.partial"
+    producer = threading.Thread(target=produce, name="postgres-export-copy", daemon=True)
+    producer.start()
+    row_groups, infinities = 0, {}
+    try:
+        try:
+            row_groups, infinities = _write_row_groups(reader, partial, names, arrow_types, schema, progress, row_group_rows)
+        except BaseException as error:
+            # Stop the server-side COPY so the producer does not block on a full pipe.
+            conn.cancel()
+            reader.close()
+            producer.join()
+            # A failure inside the query itself truncates the CSV stream; report
+            # that rather than the parse error it causes.
+            for copy_error in copy_errors:
+                if isinstance(copy_error, psycopg2.Error) and not isinstance(copy_error, QueryCanceled):
+                    raise copy_error from error
+            raise
+        finally:
+            reader.close()
+            producer.join()
+            cursor.close()
+        if copy_errors:
+            raise copy_errors[0]
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    columns = [
+        ExportColumn(name, type_names.get(desc.type_code, str(desc.type_code)), str(arrow_type))
+        for name, desc, arrow_type in zip(names, description, arrow_types)
+    ]
+    return ExportResult(
+        path, "parquet", progress.rows, os.path.getsize(path), time.perf_counter() - progress.started, columns, row_groups,
+        infinities,
+    )
+
+
+def format_export(result: ExportResult) -> str:
+    """Describe a finished export without any of its data."""
+    size = result.bytes_written / 1e6
+    elapsed = max(result.elapsed, 1e-6)
+    details = f"{size:,.1f} MB, {result.format}"
+    if result.format == "parquet":
+        details += f", {result.row_groups} row group{'s' if result.row_groups != 1 else ''}"
+    lines = [
+        f"Exported {result.row_count:,} rows to {result.path} ({details}) in {result.elapsed:.2f}s "
+        f"({size / elapsed:,.1f} MB/s, {result.row_count / elapsed:,.0f} rows/s).",
+        "Schema:",
+    ]
+    for column in result.columns:
+        suffix = f" -> {column.arrow_type}" if column.arrow_type else ""
+        lines.append(f"- {column.name}: {column.pg_type}{suffix}")
+    if result.infinities:
+        counts = ", ".join(f"{name} {count:,}" for name, count in result.infinities.items())
+        lines.append(f"Infinite dates/timestamps written as NULL (Parquet has no infinity): {counts}.")
+    return "\n".join(lines)
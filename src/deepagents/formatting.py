@@ -0,0 +1,174 @@
+import json
+from typing import Any, Callable, Optional, Sequence
+
+from deepagents.columnar import DATE_OIDS, NUMERIC_OID, TIMESTAMP_OIDS, name_infinities, truncate
+
+# Values longer than this are cut to it, ending in "...".
+MAX_CELL_WIDTH = 100
+
+# Types whose values print at their natural width.
+NUMBER_OIDS = {20, 21, 23, 26, 700, 701, NUMERIC_OID}  # int8, int2, int4, oid, float4, float8, numeric
+BOOL_OID = 16
+TEMPORAL_OIDS = DATE_OIDS | TIMESTAMP_OIDS | {1083, 1266, 1186}  # ..., time, timetz, interval
+JSON_OIDS = {114, 3802}  # json, jsonb
+BYTEA_OID = 17
+# Array type OID -> element type OID, for the arrays psycopg2 returns as lists.
+ARRAY_OIDS = {
+    1000: 16,     # bool[]
+    1005: 21,     # int2[]
+    1007: 23,     # int4[]
+    1016: 20,     # int8[]
+    1021: 700,    # float4[]
+    1022: 701,    # float8[]
+    1231: 1700,   # numeric[]
+    1009: 25,     # text[]
+    1014: 1042,   # bpchar[]
+    1015: 1043,   # varchar[]
+    1182: 1082,   # date[]
+    1115: 1114,   # timestamp[]
+    1185: 1184,   # timestamptz[]
+    1187: 1186,   # interval[]
+    2951: 2950,   # uuid[]
+    199: 114,     # json[]
+    3807: 3802,   # jsonb[]
+}
+
+# Characters that make Postgres quote an array element.
+_ARRAY_SPECIAL = set('{},"\\ \t\n')
+
+# Renders one non-NULL value, or a whole column of them.
+CellFormatter = Callable[[Any], str]
+Formatter = Callable[[Sequence[Any]], list[str]]
+
+# psycopg2 decodes json columns to Python objects; they are shown as JSON
+# again. Built once: json.dumps with options builds an encoder per call.
+_encode_json = json.JSONEncoder(ensure_ascii=False, default=str).encode
+
+
+def _bytea(value: Any) -> str:
+    return "\\x" + bytes(value).hex()
+
+
+def _array(element: CellFormatter) -> CellFormatter:
+    def format_array(value: Any) -> str:
+        if not isinstance(value, list):
+            return str(value)
+        return "{" + ",".join(_array_element(item, element) for item in value) + "}"
+
+    return format_array
+
+
+def _array_element(item: Any, element: CellFormatter) -> str:
+    if item is None:
+        return "NULL"
+    if isinstance(item, list):
+        return "{" + ",".join(_array_element(inner, element) for inner in item) + "}"
+    text = element(item)
+    if text == "" or text.upper() == "NULL" or not _ARRAY_SPECIAL.isdisjoint(text):
+        return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return text
+
+
+def _element_formatter(type_oid: Optional[int]) -> CellFormatter:
+    if type_oid in JSON_OIDS:
+        return _encode_json
+    if type_oid == BYTEA_OID:
+        return _bytea
+    if type_oid in ARRAY_OIDS:
+        return _array(_element_formatter(ARRAY_OIDS[type_oid]))
+    return str
+
+
+def _natural(values: Sequence[Any]) -> list[str]:
+    strings = list(map(str, values))
+    # These types never render as "None", so only NULLs did; comparing the
+    # strings is cheaper than comparing every value (e.g. Decimals) to None.
+    if "None" in strings:
+        return ["NULL" if text == "None" else text for text in strings]
+    return strings
+
+
+def _dated(values: Sequence[Any]) -> list[str]:
+    # psycopg2 decodes infinite dates and timestamps to date.max, datetime.min, ...
+    return name_infinities(_natural(values))
+
+
+def _cut(strings: list[str], max_width: int) -> list[str]:
+    if max(map(len, strings), default=0) <= max_width:
+        return strings
+    return [truncate(text, max_width) for text in strings]
+
+
+def _rendered(element: CellFormatter, max_width: int) -> Formatter:
+    def format_values(values: Sequence[Any]) -> list[str]:
+        return _cut(list(map(element, values)), max_width)
+
+    return format_values
+
+
+def _nullable(formatter: Formatter) -> Formatter:
+    """`formatter` with NULLs rendered as "NULL" and the other values formatted together."""
+
+    def format_column(values: Sequence[Any]) -> list[str]:
+        if None not in values:
+            return formatter(values)
+        rendered = iter(formatter([value for value in values if value is not None]))
+        return ["NULL" if value is None else next(rendered) for value in values]
+
+    return format_column
+
+
+def column_formatter(type_oid: Optional[int], max_width: int = MAX_CELL_WIDTH) -> Formatter:
+    """The function rendering a column of type `type_oid` to strings, NULLs as "NULL".
+
+    Numbers, booleans, dates and times render as `str` does, at full width
+    (infinite dates and timestamps as `infinity`/`-infinity`); JSON as JSON,
+    bytea as `\\x` hex and arrays as Postgres array literals.
+    Everything else (and any type without an OID) renders with `str`. Those
+    are cut to `max_width` characters.
+    """
+    if type_oid in DATE_OIDS or type_oid in TIMESTAMP_OIDS:
+        return _dated
+    if type_oid in NUMBER_OIDS or type_oid == BOOL_OID or type_oid in TEMPORAL_OIDS:
+        return _natural
+    return _nullable(_rendered(_element_formatter(type_oid), max_width))
+
+
+def _generic(values: Sequence[Any]) -> list[str]:
+    # Used where the column types are unknown, e.g. rows read back from a spill file.
+    return [
+        "NULL" if value is None
+        else str(value) if isinstance(value, (int, float))
+        else truncate(str(value), MAX_CELL_WIDTH)
+        for value in values
+    ]
+
+
+def column_formatters(description: Optional[Sequence], max_width: int = MAX_CELL_WIDTH) -> list[Formatter]:
+    """One formatter per column of a psycopg2 `cursor.description`, chosen once by type OID."""
+    return [column_formatter(column[1], max_width) for column in description or ()]
+
+
+def format_table(
+    column_names: list[str], rows: Sequence[Sequence[Any]], formatters: Optional[list[Formatter]] = None
+) -> list[str]:
+    """Rows as tab-separated lines under a header, formatted column by column.
+
+    Without `formatters` (no cursor description at hand), numbers render
+    with `str` and every other value is cut to the default width.
+    """
+    result_lines = []
+    if column_names:
+        header = "\t".join(column_names)
+        result_lines.append(header)
+        result_lines.append("-" * len(header))
+    if not rows:
+        return result_lines
+    columns = list(zip(*rows))
+    if not columns:
+        return result_lines + [""] * len(rows)
+    if formatters is None or len(formatters) != len(columns):
+        formatters = [_generic] * len(columns)
+    rendered = [formatter(column) for column, formatter in zip(columns, formatters)]
+    result_lines.extend(map("\t".join, zip(*rendered)))
+    return result_lines
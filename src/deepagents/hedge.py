@@ -0,0 +1,208 @@
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional, Sequence, TypeVar
+
+from deepagents.admission import BACKGROUND, INTERACTIVE
+from deepagents.db import PooledConnection, get_pool
+
+T = TypeVar("T")
+
+# Statements whose latency sets the hedge delay, and the fewest needed
+# before any statement is hedged.
+HEDGE_WINDOW = 1000
+MIN_SAMPLES = 20
+# Most seconds spent getting a connection to cancel a losing statement with.
+CANCEL_DEADLINE = 2.0
+
+
+class _Attempt:
+    """One run of the statement against one server."""
+
+    __slots__ = ("dsn", "lock", "conn", "cancelled")
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self.lock = threading.Lock()
+        self.conn: Optional[PooledConnection] = None
+        self.cancelled = False
+
+
+class HedgePolicy:
+    """Hedged reads: re-issue a slow read-only statement on a replica and keep the first result.
+
+    A statement is sent to the call's own database first. If it has not
+    returned after the `percentile` latency of recent statements, the same
+    statement is sent to the next of `replicas`; whichever finishes first
+    wins and the other is cancelled with `pg_cancel_backend`. At most
+    `max_hedge_ratio` of the last `window` statements are hedged, so a
+    slow primary cannot double the load on the replicas.
+
+    Hedging starts once `min_samples` latencies have been seen. A statement
+    that fails before the delay is not retried elsewhere.
+    """
+
+    def __init__(
+        self,
+        replicas: Sequence[str],
+        percentile: float = 95.0,
+        max_hedge_ratio: float = 0.05,
+        min_delay: float = 0.005,
+        window: int = HEDGE_WINDOW,
+        min_samples: int = MIN_SAMPLES,
+    ):
+        if not replicas:
+            raise ValueError("a HedgePolicy needs at least one replica")
+        if not 0 < percentile < 100:
+            raise ValueError(f"percentile must be between 0 and 100, not {percentile}")
+        self.replicas = list(replicas)
+        self.percentile = percentile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=window)
+        # Whether each of the last `window` statements was hedged.
+        self._hedged: deque = deque(maxlen=window)
+        self._next_replica = itertools.count()
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.cancelled = 0
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while too few latencies are known."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(int(len(ordered) * self.percentile / 100), len(ordered) - 1)
+        return max(ordered[index], self.min_delay)
+
+    def _may_hedge(self) -> bool:
+        with self._lock:
+            return sum(self._hedged) + 1 <= self.max_hedge_ratio * max(len(self._hedged), 1)
+
+    def _record(self, hedged: bool, latency: Optional[float] = None) -> None:
+        with self._lock:
+            self.requests += 1
+            self._hedged.append(hedged)
+            if hedged:
+                self.hedges += 1
+            if latency is not None:
+                self._latencies.append(latency)
+
+    def run(
+        self,
+        db_connection: str,
+        fn: Callable[[PooledConnection], T],
+        priority: int = INTERACTIVE,
+        deadline: Optional[float] = None,
+    ) -> T:
+        """Run `fn` on a pooled connection to `db_connection`, hedged on a replica when slow.
+
+        `fn` must only read, since it may run on two servers; it receives the
+        connection and its return value is passed through. Connections go
+        back to their pools when `fn` returns.
+        """
+        outcomes: "queue.Queue[tuple[_Attempt, Optional[T], Optional[BaseException], float]]" = queue.Queue()
+        primary = self._start(db_connection, fn, priority, deadline, outcomes)
+        delay = self.delay()
+        try:
+            attempt, result, error, latency = outcomes.get(timeout=delay)
+        except queue.Empty:
+            pass
+        else:
+            self._record(False, latency if error is None else None)
+            if error is not None:
+                raise error
+            return result
+
+        if not self._may_hedge():
+            attempt, result, error, latency = outcomes.get()
+            self._record(False, latency if error is None else None)
+            if error is not None:
+                raise error
+            return result
+
+        replica = self.replicas[next(self._next_replica) % len(self.replicas)]
+        hedge = self._start(replica, fn, priority, deadline, outcomes)
+        self._record(True)
+        first_error = None
+        for _ in range(2):
+            attempt, result, error, latency = outcomes.get()
+            if error is not None:
+                first_error = first_error or error
+                continue
+            with self._lock:
+                self._latencies.append(latency)
+                if attempt is hedge:
+                    self.hedge_wins += 1
+            loser = primary if attempt is hedge else hedge
+            threading.Thread(target=self._cancel, args=(loser,), daemon=True).start()
+            return result
+        raise first_error
+
+    def _start(self, dsn, fn, priority, deadline, outcomes) -> _Attempt:
+        attempt = _Attempt(dsn)
+        threading.Thread(
+            target=self._attempt,
+            args=(attempt, fn, priority, deadline, outcomes),
+            name="deepagents-hedge",
+            daemon=True,
+        ).start()
+        return attempt
+
+    @staticmethod
+    def _attempt(attempt: _Attempt, fn, priority, deadline, outcomes) -> None:
+        started = time.monotonic()
+        conn = None
+        try:
+            conn = get_pool(attempt.dsn).acquire(priority, deadline)
+            with attempt.lock:
+                if attempt.cancelled:
+                    return
+                attempt.conn = conn
+            result = fn(conn)
+        except BaseException as e:
+            outcomes.put((attempt, None, e, time.monotonic() - started))
+        else:
+            outcomes.put((attempt, result, None, time.monotonic() - started))
+        finally:
+            if conn is not None:
+                # Under the lock, so a cancel is never sent to the connection's next user.
+                with attempt.lock:
+                    attempt.conn = None
+                conn.close()
+
+    def _cancel(self, attempt: _Attempt) -> None:
+        with attempt.lock:
+            attempt.cancelled = True
+            if attempt.conn is None:
+                return
+            pid = attempt.conn.get_backend_pid()
+            try:
+                with get_pool(attempt.dsn).connection(BACKGROUND, CANCEL_DEADLINE) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("SELECT pg_cancel_backend(%s)", (pid,))
+                    cursor.close()
+            except Exception:
+                # No connection to spare, or no permission to signal the
+                # backend: send the protocol-level cancel request instead.
+                attempt.conn.cancel()
+        with self._lock:
+            self.cancelled += 1
+
+    def metrics(self) -> dict:
+        """Counts of statements, hedges, hedges that won and losers cancelled, and the current delay."""
+        delay = self.delay()
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "cancelled": self.cancelled,
+                "delay": delay,
+            }
@@ -0,0 +1,512 @@
+import itertools
+import json
+import math
+import re
+from typing import Iterable, NamedTuple, Optional
+
+from deepagents.catalog import Catalog, quote_ident
+from deepagents.workload import WorkloadEntry, normalize_sql
+
+# Distinct statements explained per report, most expensive first.
+MAX_STATEMENTS = 100
+# Scans returning more than this share of a table are left to sequential scans.
+MAX_SELECTIVITY = 0.2
+# A join key is indexed only when the other side brings at most this share of the scanned rows.
+MAX_JOIN_RATIO = 0.1
+MAX_INDEX_COLUMNS = 3
+# The planner's default cost of fetching one page at random, used to
+# estimate index scans when hypothetical indexes are not available.
+RANDOM_PAGE_COST = 4.0
+
+_EQUALITY = "="
+_RANGE = ("<", ">", "<=", ">=")
+_COMPARISON = re.compile(r"\s(<=|>=|<>|!=|=|<|>)\s")
+# The modification keywords postgres_query rejects; here matched as whole
+# words, so columns such as created_at do not trip them.
+FORBIDDEN_KEYWORDS = ("INSERT", "UPDATE", "DELETE", "DROP", "CREATE", "ALTER", "TRUNCATE", "GRANT", "REVOKE")
+_FORBIDDEN = re.compile(rf"\b(?:{'|'.join(FORBIDDEN_KEYWORDS)})\b", re.IGNORECASE)
+_DOLLAR_QUOTE = re.compile(r"\$([A-Za-z_]\w*)?\$")
+# A column reference as EXPLAIN VERBOSE prints it: identifiers are quoted
+# only when they have to be, so unquoted ones are exact names too.
+_IDENTIFIER = r'(?:"((?:[^"]|"")+)"|([a-z_][\w$]*))'
+_COLUMN = re.compile(rf"^(?:{_IDENTIFIER}\.)?{_IDENTIFIER}$", re.IGNORECASE)
+_CAST = re.compile(r"::[\w\s\"\[\]]+$")
+
+
+class Statement(NamedTuple):
+    """A statement to advise on, and how often agents sent it."""
+
+    sql: str
+    calls: int = 1
+    fingerprint: str = ""
+    # True for `normalize_sql` output, whose constants are `?` placeholders.
+    normalized: bool = False
+
+
+class IndexCandidate(NamedTuple):
+    schema: str
+    table: str
+    columns: tuple[str, ...]
+    # Why the index is suggested: "filter", "join" or both.
+    reason: str
+    statements: list[Statement]
+    # Plan cost of one call of each statement, summed, without and with the index.
+    cost_before: float
+    cost_after: float
+    # Estimated cost saved over all calls of the statements.
+    benefit: float
+
+    @property
+    def calls(self) -> int:
+        return sum(statement.calls for statement in self.statements)
+
+    def ddl(self) -> str:
+        return f"CREATE INDEX ON {_index_target(self.schema, self.table, self.columns)};"
+
+
+def _index_target(schema: str, table: str, columns: tuple[str, ...]) -> str:
+    """`schema.table (columns)` with every name quoted, so case and special characters survive."""
+    return f"{quote_ident(schema, table)} ({', '.join(quote_ident(column) for column in columns)})"
+
+
+class IndexAdvice(NamedTuple):
+    statements: int
+    calls: int
+    # "hypopg" when benefits were measured with hypothetical indexes, "heuristic" otherwise.
+    method: str
+    candidates: list[IndexCandidate]
+    failed: int = 0
+
+
+def statements_from_workload(
+    entries: Iterable[WorkloadEntry], database: Optional[str] = None, max_statements: int = MAX_STATEMENTS
+) -> list[Statement]:
+    """Group captured statements by fingerprint, most total recorded time first.
+
+    Failed statements and those captured against another database are left out.
+    """
+    groups: dict[str, list[WorkloadEntry]] = {}
+    for entry in entries:
+        if entry.error is not None or (database and entry.database not in (None, database)):
+            continue
+        groups.setdefault(entry.fingerprint, []).append(entry)
+    ranked = sorted(groups.values(), key=lambda group: sum(e.latency_ms for e in group), reverse=True)
+    return [
+        Statement(group[-1].sql, len(group), group[-1].fingerprint, not group[-1].raw)
+        for group in ranked[:max_statements]
+    ]
+
+
+def statement_count(sql: str) -> Optional[int]:
+    """How many statements `sql` holds, or None if a quote or comment is left open.
+
+    Semicolons inside string literals, quoted identifiers, dollar quotes and
+    comments do not separate statements.
+    """
+    count, pending, i = 0, False, 0
+    while i < len(sql):
+        char = sql[i]
+        if char == "'" or char == '"':
+            # E'...' strings escape quotes with backslashes as well as doubling.
+            escapes = char == "'" and i > 0 and sql[i - 1] in "eE" and (i < 2 or not (sql[i - 2].isalnum() or sql[i - 2] == "_"))
+            i += 1
+            while i < len(sql):
+                if escapes and sql[i] == "\\":
+                    i += 2
+                elif sql[i] == char:
+                    if sql.startswith(char * 2, i):
+                        i += 2
+                    else:
+                        break
+                else:
+                    i += 1
+            else:
+                return None
+        elif sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = len(sql) if end < 0 else end
+            continue
+        elif sql.startswith("/*", i):
+            depth, i = 1, i + 2
+            while depth and i < len(sql):
+                if sql.startswith("/*", i):
+                    depth, i = depth + 1, i + 2
+                elif sql.startswith("*/", i):
+                    depth, i = depth - 1, i + 2
+                else:
+                    i += 1
+            if depth:
+                return None
+            continue
+        elif char == "$" and (match := _DOLLAR_QUOTE.match(sql, i)) and not (i and (sql[i - 1].isalnum() or sql[i - 1] == "_")):
+            end = sql.find(match.group(0), match.end())
+            if end < 0:
+                return None
+            pending, i = True, end + len(match.group(0))
+            continue
+        elif char == ";":
+            count, pending = count + pending, False
+        elif not char.isspace():
+            pending = True
+        i += 1
+    return count + pending
+
+
+def explainable(sql: str) -> bool:
+    """Whether `sql` is a single SELECT or WITH statement without a forbidden keyword.
+
+    Only such statements are explained, so text from a tool call or the
+    workload log can never smuggle in a second statement.
+    """
+    return (
+        sql.strip().upper().startswith(("SELECT", "WITH"))
+        and not _FORBIDDEN.search(sql)
+        and statement_count(sql) == 1
+    )
+
+
+def _split_top_level(text: str, separator: str) -> list[str]:
+    """Split `text` at `separator` outside parentheses and quotes."""
+    parts, depth, quoted, start, i = [], 0, False, 0, 0
+    while i < len(text):
+        char = text[i]
+        if char == "'":
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and text.startswith(separator, i):
+            parts.append(text[start:i])
+            start = i + len(separator)
+            i = start
+            continue
+        i += 1
+    parts.append(text[start:])
+    return parts
+
+
+def _strip_parens(text: str) -> str:
+    """`text` without parentheses enclosing all of it."""
+    text = text.strip()
+    # "(a) = (b)" starts and ends with parentheses that are not a pair.
+    while text.startswith("(") and text.endswith(")") and _balanced(text[1:-1]):
+        text = text[1:-1].strip()
+    return text
+
+
+def _balanced(text: str) -> bool:
+    """Whether no parenthesis in `text` closes before it opens, and all are closed."""
+    depth, quoted = 0, False
+    for char in text:
+        if char == "'":
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+            if depth < 0:
+                return False
+    return depth == 0
+
+
+def _column(expression: str) -> Optional[tuple[Optional[str], str]]:
+    """`(qualifier, column)` if the expression is a plain (possibly cast) column reference."""
+    expression = _strip_parens(expression)
+    while True:
+        uncast = _strip_parens(_CAST.sub("", expression))
+        if uncast == expression:
+            break
+        expression = uncast
+    match = _COLUMN.match(expression)
+    if match is None or expression.upper() in ("TRUE", "FALSE", "NULL"):
+        return None
+    quoted_qualifier, qualifier, quoted_column, column = match.groups()
+    if quoted_qualifier is not None:
+        qualifier = quoted_qualifier.replace('""', '"')
+    return qualifier, column if quoted_column is None else quoted_column.replace('""', '"')
+
+
+def conditions(expression: str) -> list[tuple[str, str, str]]:
+    """The `(left, operator, right)` comparisons ANDed together in a plan condition.
+
+    Conditions containing OR at the top level give nothing, since a single
+    index cannot serve them.
+    """
+    expression = _strip_parens(expression)
+    if len(_split_top_level(expression, " OR ")) > 1:
+        return []
+    comparisons = []
+    for atom in _split_top_level(expression, " AND "):
+        atom = _strip_parens(atom)
+        for match in _COMPARISON.finditer(atom):
+            left, right = atom[:match.start()], atom[match.end():]
+            if _balanced(left) and _balanced(right):
+                comparisons.append((left.strip(), match.group(1), right.strip()))
+                break
+    return comparisons
+
+
+class _Scan(NamedTuple):
+    table: tuple[str, str]
+    alias: str
+    cost: float
+    rows: float
+    filter: Optional[str]
+
+
+def _walk(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _walk(child)
+
+
+def _key_columns(scan: _Scan, comparisons) -> tuple[list[str], list[str]]:
+    """Columns of `scan` compared with a value (or another table's column): equality first, then ranges."""
+    equality, ranges = [], []
+    for left, op, right in comparisons:
+        for this, other, operator in ((left, right, op), (right, left, _mirror(op))):
+            column = _column(this)
+            if column is None or column[0] not in (None, scan.alias):
+                continue
+            other_column = _column(other)
+            if other_column is not None and other_column[0] in (None, scan.alias):
+                continue  # Compares two columns of the same row.
+            if operator == _EQUALITY and column[1] not in equality:
+                equality.append(column[1])
+            elif operator in _RANGE and column[1] not in ranges:
+                ranges.append(column[1])
+            break
+    return equality, ranges
+
+
+def _mirror(op: str) -> str:
+    return {"<": ">", ">": "<", "<=": ">=", ">=": "<="}.get(op, op)
+
+
+def plan_candidates(
+    plan: dict, table_rows: dict[tuple[str, str], float]
+) -> list[tuple[tuple[str, str], tuple[str, ...], str, float]]:
+    """Indexes that could replace the sequential scans of an `EXPLAIN (FORMAT JSON, VERBOSE)` plan.
+
+    Returns `((schema, table), columns, reason, estimated cost saved per call)`.
+    `table_rows` gives the planner's row count of each `(schema, table)`.
+    Savings are estimated as the scan's cost less an index scan fetching
+    the same rows at random.
+    """
+    scans = {}
+    for node in _walk(plan):
+        if node.get("Node Type") == "Seq Scan" and "Relation Name" in node:
+            table = (node.get("Schema", "public"), node["Relation Name"])
+            scans[node.get("Alias", node["Relation Name"])] = _Scan(
+                table, node.get("Alias", node["Relation Name"]), node["Total Cost"], node["Plan Rows"], node.get("Filter")
+            )
+
+    candidates = []
+    for scan in scans.values():
+        total = max(table_rows.get(scan.table, 0.0), scan.rows, 1.0)
+        if not scan.filter:
+            continue
+        equality, ranges = _key_columns(scan, conditions(scan.filter))
+        columns = tuple((equality + ranges[:1])[:MAX_INDEX_COLUMNS])
+        if not columns or scan.rows / total > MAX_SELECTIVITY:
+            continue
+        index_cost = scan.rows * RANDOM_PAGE_COST + math.log2(total)
+        if scan.cost > index_cost:
+            candidates.append((scan.table, columns, "filter", scan.cost - index_cost))
+
+    for node in _walk(plan):
+        condition = node.get("Hash Cond") or node.get("Merge Cond") or node.get("Join Filter")
+        if not condition:
+            continue
+        for left, op, right in conditions(condition):
+            if op != _EQUALITY:
+                continue
+            sides = [_column(left), _column(right)]
+            if None in sides:
+                continue
+            for (qualifier, column), (other_qualifier, _) in (sides, sides[::-1]):
+                scan, other = scans.get(qualifier), scans.get(other_qualifier)
+                if scan is None or other is None or scan is other:
+                    continue
+                if other.rows > MAX_JOIN_RATIO * scan.rows:
+                    continue
+                total = max(table_rows.get(scan.table, 0.0), scan.rows, 1.0)
+                # A nested loop probing the index once per row of the other side.
+                index_cost = other.rows * (RANDOM_PAGE_COST + math.log2(total))
+                if scan.cost > index_cost:
+                    candidates.append((scan.table, (column,), "join", scan.cost - index_cost))
+    return candidates
+
+
+def _indexed(catalog: Optional[Catalog], table: tuple[str, str], columns: tuple[str, ...]) -> bool:
+    """Whether an existing index starts with these columns, in any order."""
+    if catalog is None:
+        return False
+    schema, name = table
+    for info in catalog.tables:
+        if info.schema == schema and info.name == name:
+            return any(set(prefix[:len(columns)]) == set(columns) for prefix in catalog.indexes.get(info.oid, []))
+    return False
+
+
+def _parameterized(sql: str) -> str:
+    """Normalized SQL with its `?` placeholders numbered as `$1`, `$2`, ..."""
+    numbers = itertools.count(1)
+    return re.sub(r"\?", lambda match: f"${next(numbers)}", sql)
+
+
+def _explain(cursor, statement: Statement) -> dict:
+    if statement.normalized:
+        # The constants are gone, so plan it as a prepared statement would be
+        # without knowing its parameters (PostgreSQL 16 and later).
+        cursor.execute(f"EXPLAIN (FORMAT JSON, VERBOSE, GENERIC_PLAN) {_parameterized(statement.sql)}")
+    else:
+        cursor.execute(f"EXPLAIN (FORMAT JSON, VERBOSE) {statement.sql}")
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def advise_indexes(
+    conn, statements: list[Statement], catalog: Optional[Catalog] = None, limit: int = 10
+) -> IndexAdvice:
+    """Rank indexes that would remove sequential scans from `statements`.
+
+    Every statement is explained (not run). Filters and join keys that
+    make the planner scan a table sequentially give candidate indexes;
+    ones an existing index already starts with are dropped. When the
+    hypopg extension is installed, each candidate is created as a
+    hypothetical index and the statements are explained again, so its
+    benefit is the planner's own cost estimate; otherwise benefits are
+    estimated from the scans' costs and row counts.
+    """
+    statements = [s for s in statements if explainable(s.sql)]
+    cursor = conn.cursor()
+    try:
+        return _advise(conn, cursor, statements, catalog, limit)
+    finally:
+        # Nothing the statements did outlives the advice.
+        cursor.close()
+        conn.rollback()
+
+
+def _read_only(conn, cursor) -> None:
+    """Start a new read-only transaction on `conn`."""
+    conn.rollback()
+    cursor.execute("SET TRANSACTION READ ONLY")
+
+
+def _advise(conn, cursor, statements: list[Statement], catalog: Optional[Catalog], limit: int) -> IndexAdvice:
+    _read_only(conn, cursor)
+    plans: dict[int, dict] = {}
+    failed = 0
+    for i, statement in enumerate(statements):
+        try:
+            plans[i] = _explain(cursor, statement)
+        except Exception:
+            _read_only(conn, cursor)
+            failed += 1
+
+    table_rows = {}
+    tables = {(n.get("Schema", "public"), n["Relation Name"]) for p in plans.values() for n in _walk(p) if "Relation Name" in n}
+    for table in tables:
+        cursor.execute(
+            "SELECT reltuples FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace"
+            " WHERE n.nspname = %s AND c.relname = %s",
+            table,
+        )
+        row = cursor.fetchone()
+        table_rows[table] = float(row[0]) if row and row[0] is not None else 0.0
+
+    found: dict[tuple[tuple[str, str], tuple[str, ...]], dict] = {}
+    for i, plan in plans.items():
+        for table, columns, reason, saving in plan_candidates(plan, table_rows):
+            if _indexed(catalog, table, columns):
+                continue
+            entry = found.setdefault((table, columns), {"reasons": set(), "statements": {}})
+            entry["reasons"].add(reason)
+            entry["statements"][i] = max(entry["statements"].get(i, 0.0), saving)
+    _merge_prefixes(found)
+
+    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'hypopg'")
+    method = "hypopg" if cursor.fetchone() else "heuristic"
+    candidates = []
+    for (table, columns), entry in found.items():
+        indices = list(entry["statements"])
+        before = [plans[i]["Total Cost"] for i in indices]
+        if method == "hypopg":
+            after = _hypothetical_costs(conn, cursor, table, columns, [statements[i] for i in indices])
+            if after is None:
+                continue
+        else:
+            after = [cost - entry["statements"][i] for cost, i in zip(before, indices)]
+        benefit = sum(statements[i].calls * (b - a) for i, b, a in zip(indices, before, after))
+        if benefit > 0:
+            candidates.append(IndexCandidate(
+                *table, columns, " and ".join(sorted(entry["reasons"])), [statements[i] for i in indices],
+                sum(before), sum(after), benefit,
+            ))
+    candidates.sort(key=lambda candidate: candidate.benefit, reverse=True)
+    return IndexAdvice(len(statements), sum(s.calls for s in statements), method, candidates[:limit], failed)
+
+
+def _merge_prefixes(found: dict) -> None:
+    """Fold each candidate into a longer one on the same table that starts with its columns.
+
+    An index on (a, b) serves lookups on a as well, so one index is
+    suggested for both sets of statements.
+    """
+    for table, columns in sorted(found, key=lambda key: len(key[1])):
+        longer = [
+            key for key in found
+            if key[0] == table and len(key[1]) > len(columns) and key[1][:len(columns)] == columns
+        ]
+        if not longer:
+            continue
+        target = found[max(longer, key=lambda key: len(found[key]["statements"]))]
+        merged = found.pop((table, columns))
+        target["reasons"] |= merged["reasons"]
+        for i, saving in merged["statements"].items():
+            target["statements"][i] = max(target["statements"].get(i, 0.0), saving)
+
+
+def _hypothetical_costs(conn, cursor, table, columns, statements) -> Optional[list[float]]:
+    """Plan costs of `statements` with a hypothetical index on `table (columns)`, or None if it cannot be created."""
+    try:
+        cursor.execute("SELECT indexrelid FROM hypopg_create_index(%s)", (f"CREATE INDEX ON {_index_target(*table, columns)}",))
+        index = cursor.fetchone()[0]
+        try:
+            return [_explain(cursor, statement)["Total Cost"] for statement in statements]
+        finally:
+            cursor.execute("SELECT hypopg_drop_index(%s)", (index,))
+    except Exception:
+        _read_only(conn, cursor)
+        return None
+
+
+def format_index_advice(advice: IndexAdvice) -> str:
+    estimate = "hypothetical indexes (hypopg)" if advice.method == "hypopg" else "cost heuristics (install hypopg for planner estimates)"
+    lines = [
+        f"Index advice from {advice.statements} statement{'s' if advice.statements != 1 else ''} "
+        f"({advice.calls} call{'s' if advice.calls != 1 else ''}), estimated with {estimate}."
+    ]
+    if advice.failed:
+        lines.append(f"Statements that could not be explained and were skipped: {advice.failed}.")
+    if not advice.candidates:
+        lines.append("")
+        lines.append("No candidate indexes: no statement scans a large table sequentially for a selective filter or join key.")
+        return "\n".join(lines)
+    for rank, candidate in enumerate(advice.candidates, 1):
+        lines.append("")
+        lines.append(f"{rank}. {candidate.ddl()}")
+        lines.append(
+            f"   Serves the {candidate.reason} of {len(candidate.statements)} "
+            f"statement{'s' if len(candidate.statements) > 1 else ''} ({candidate.calls} "
+            f"call{'s' if candidate.calls > 1 else ''}); plan cost {candidate.cost_before:,.1f} -> {candidate.cost_after:,.1f} "
+            f"(saves about {candidate.benefit:,.0f} over all calls)"
+        )
+        example = max(candidate.statements, key=lambda s: s.calls)
+        lines.append(f"   e.g. {normalize_sql(example.sql)[:200]}")
+    return "\n".join(lines)
@@ -0,0 +1,150 @@
+from collections import Counter, defaultdict, deque
+from typing import NamedTuple, Optional
+
+from deepagents.catalog import Catalog, ForeignKey, TableInfo, get_derived, quote_ident
+
+
+class JoinStep(NamedTuple):
+    """One hop of a join path, from `left` to `right` along a foreign key."""
+
+    left: TableInfo
+    right: TableInfo
+    left_columns: list[str]
+    right_columns: list[str]
+    constraint: str
+    left_indexed: bool
+    right_indexed: bool
+
+    def on_clause(self, aliases: Optional[dict[int, str]] = None) -> str:
+        """The join condition, with each table referred to by its alias in `aliases` (by OID) or its name."""
+        aliases = aliases or {}
+        left = aliases.get(self.left.oid, self.left.name)
+        right = aliases.get(self.right.oid, self.right.name)
+        return " AND ".join(
+            f"{quote_ident(left, left_column)} = {quote_ident(right, right_column)}"
+            for left_column, right_column in zip(self.left_columns, self.right_columns)
+        )
+
+
+def _is_indexed(index_prefixes: list[list[str]], columns: list[str]) -> bool:
+    """Whether some index starts with exactly these columns, in any order."""
+    wanted = set(columns)
+    return any(set(prefix[:len(columns)]) == wanted for prefix in index_prefixes)
+
+
+class JoinGraph:
+    """The foreign-key graph of a database, walkable in both directions."""
+
+    def __init__(self, catalog: Catalog):
+        self.tables = {table.oid: table for table in catalog.tables}
+        self._indexes = catalog.indexes
+        self._edges: dict[int, list[tuple[int, ForeignKey]]] = defaultdict(list)
+        for fk in catalog.foreign_keys:
+            if fk.table_oid == fk.referenced_table_oid:
+                continue  # Self references never shorten a path between two tables.
+            if fk.table_oid not in self.tables or fk.referenced_table_oid not in self.tables:
+                continue
+            self._edges[fk.table_oid].append((fk.referenced_table_oid, fk))
+            self._edges[fk.referenced_table_oid].append((fk.table_oid, fk))
+
+    def resolve(self, name: str) -> list[TableInfo]:
+        """Find tables by `schema.table` or by bare table name.
+
+        A bare name shared by tables in several schemas matches all of
+        them; callers must ask for a qualified name rather than pick one.
+        """
+        if "." in name:
+            schema, _, table_name = name.partition(".")
+            return [t for t in self.tables.values() if t.schema == schema and t.name == table_name]
+        return [t for t in self.tables.values() if t.name == name]
+
+    def _step(self, from_oid: int, to_oid: int, fk: ForeignKey) -> JoinStep:
+        if fk.table_oid == from_oid:
+            left_columns, right_columns = fk.columns, fk.referenced_columns
+        else:
+            left_columns, right_columns = fk.referenced_columns, fk.columns
+        return JoinStep(
+            self.tables[from_oid],
+            self.tables[to_oid],
+            left_columns,
+            right_columns,
+            fk.name,
+            _is_indexed(self._indexes.get(from_oid, []), left_columns),
+            _is_indexed(self._indexes.get(to_oid, []), right_columns),
+        )
+
+    def shortest_paths(
+        self, source: TableInfo, target: TableInfo, max_paths: int = 3, max_hops: int = 6
+    ) -> list[list[JoinStep]]:
+        """Return up to `max_paths` of the shortest join paths from `source` to `target`."""
+        if source.oid == target.oid:
+            return [[]]
+
+        # Breadth-first search that remembers every edge reaching a node at
+        # its shortest distance, so all equally short paths can be rebuilt.
+        distance = {source.oid: 0}
+        parents: dict[int, list[tuple[int, ForeignKey]]] = defaultdict(list)
+        queue = deque([source.oid])
+        while queue:
+            oid = queue.popleft()
+            if oid == target.oid or distance[oid] >= max_hops:
+                continue
+            for neighbour, fk in self._edges.get(oid, ()):
+                if neighbour not in distance:
+                    distance[neighbour] = distance[oid] + 1
+                    queue.append(neighbour)
+                if distance[neighbour] == distance[oid] + 1:
+                    parents[neighbour].append((oid, fk))
+        if target.oid not in distance:
+            return []
+
+        paths = []
+
+        def _walk(oid: int, suffix: list[JoinStep]) -> None:
+            if len(paths) >= max_paths:
+                return
+            if oid == source.oid:
+                paths.append(suffix)
+                return
+            for parent, fk in parents[oid]:
+                _walk(parent, [self._step(parent, oid, fk)] + suffix)
+
+        _walk(target.oid, [])
+        return paths
+
+
+def get_join_graph(db_connection: str) -> JoinGraph:
+    """Return the join graph for `db_connection`, rebuilt whenever the cached catalog is reloaded."""
+    return get_derived(db_connection, JoinGraph)
+
+
+def path_aliases(path: list[JoinStep]) -> dict[int, str]:
+    """An alias for each table of a path, by OID: its name, or `schema_name` where two tables share a name."""
+    tables = {step.left.oid: step.left for step in path}
+    tables.update((step.right.oid, step.right) for step in path)
+    names = Counter(table.name for table in tables.values())
+    return {
+        oid: table.name if names[table.name] == 1 else f"{table.schema}_{table.name}"
+        for oid, table in tables.items()
+    }
+
+
+def format_join_path(path: list[JoinStep]) -> list[str]:
+    """Render a join path as SQL `JOIN ... ON ...` lines with index annotations."""
+    aliases = path_aliases(path)
+
+    def table_sql(table: TableInfo) -> str:
+        return f"{quote_ident(table.schema, table.name)} {quote_ident(aliases[table.oid])}"
+
+    lines = [f"FROM {table_sql(path[0].left)}"]
+    for step in path:
+        lines.append(f"JOIN {table_sql(step.right)} ON {step.on_clause(aliases)}")
+        notes = []
+        for table, columns, indexed in (
+            (step.left, step.left_columns, step.left_indexed),
+            (step.right, step.right_columns, step.right_indexed),
+        ):
+            column_list = ", ".join(f"{aliases[table.oid]}.{c}" for c in columns)
+            notes.append(f"{column_list} {'indexed' if indexed else 'NOT indexed'}")
+        lines.append(f"    -- via {step.constraint}; {'; '.join(notes)}")
+    return lines
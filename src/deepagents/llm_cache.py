@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, Generation
+
+from deepagents.catalog import catalog_fingerprint, get_derived
+
+# Total size of stored responses above which the least recently used are evicted.
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+# Message fields the provider fills in that are never sent back to it. A
+# replayed response carries different ones (token counts, a zero cost), so
+# they are left out of the key for later calls to hit.
+_UNSENT_FIELDS = ("response_metadata", "usage_metadata")
+# Classes a stored response may revive.
+_RESPONSE_CLASSES = [Generation, ChatGeneration, AIMessage]
+
+
+def default_llm_cache_path() -> str:
+    """Location of the response cache; override with `DEEPAGENTS_LLM_CACHE`."""
+    return os.getenv("DEEPAGENTS_LLM_CACHE") or os.path.join(
+        os.path.expanduser("~"), ".cache", "deepagents", "llm_cache.sqlite3"
+    )
+
+
+class ResponseCache(BaseCache):
+    """A local SQLite cache of chat model responses, for deterministic (temperature 0) runs.
+
+    Pass it as a chat model's `cache`, e.g. `get_openai_model(cache=ResponseCache(...))`.
+    LangChain looks a call up by its messages and by the model's identity,
+    parameters and bound tool schemas; the cache keys responses on a hash
+    of these. Once the stored responses exceed `max_bytes`, the least
+    recently used are evicted.
+
+    With `db_connection`, responses are also keyed on the fingerprint of
+    that database's schema, so a schema change (seen when the cached
+    catalog is next reloaded) invalidates every answer recorded against
+    the old one, and those answers are deleted.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_bytes: int = MAX_CACHE_BYTES,
+        db_connection: Optional[str] = None,
+    ):
+        self.path = path or default_llm_cache_path()
+        self.max_bytes = max_bytes
+        self.db_connection = db_connection
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._schema: Optional[str] = None
+        # Caches for other databases may share the file; only their own answers are invalidated.
+        self._source = hashlib.sha256(db_connection.encode()).hexdigest()[:16] if db_connection else ""
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    schema TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    used_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_responses_used_at ON llm_responses (used_at)")
+            self._initialized = True
+        return conn
+
+    def _schema_fingerprint(self, conn: sqlite3.Connection) -> str:
+        if not self.db_connection:
+            return ""
+        schema = get_derived(self.db_connection, catalog_fingerprint)
+        if schema != self._schema:
+            # First call, or the schema changed: answers about any other schema are stale.
+            with conn:
+                conn.execute("DELETE FROM llm_responses WHERE source = ? AND schema != ?", (self._source, schema))
+            self._schema = schema
+        return schema
+
+    def _key(self, prompt: str, llm_string: str, schema: str) -> str:
+        digest = hashlib.sha256()
+        for part in (llm_string, self._source, schema, _sent_messages(prompt)):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        with self._lock:
+            conn = self._connect()
+            try:
+                key = self._key(prompt, llm_string, self._schema_fingerprint(conn))
+                row = conn.execute("SELECT response FROM llm_responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                with conn:
+                    conn.execute("UPDATE llm_responses SET used_at = ? WHERE key = ?", (time.time(), key))
+                self.hits += 1
+            finally:
+                conn.close()
+        return [loads(generation, allowed_objects=_RESPONSE_CLASSES) for generation in json.loads(row[0])]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        response = json.dumps([dumps(generation) for generation in return_val])
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                schema = self._schema_fingerprint(conn)
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (self._key(prompt, llm_string, schema), self._source, schema, response, len(response), now, now),
+                    )
+                    self._evict(conn)
+            finally:
+                conn.close()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in conn.execute("SELECT key, size FROM llm_responses ORDER BY used_at"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM llm_responses WHERE key = ?", stale)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM llm_responses")
+            finally:
+                conn.close()
+
+    def stats(self) -> dict:
+        """Hits and misses since creation, and the stored responses' count and bytes."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+            finally:
+                conn.close()
+        return {"hits": self.hits, "misses": self.misses, "entries": count, "bytes": size}
+
+
+
+def _sent_messages(prompt: str) -> str:
+    """`prompt`, LangChain's serialized messages, without the fields that are not sent to the model."""
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return prompt
+    for message in messages if isinstance(messages, list) else ():
+        kwargs = message.get("kwargs") if isinstance(message, dict) else None
+        if isinstance(kwargs, dict):
+            for field in _UNSENT_FIELDS:
+                kwargs.pop(field, None)
+    return json.dumps(messages, sort_keys=True)
@@ -1,29 +1,55 @@
 from langchain_anthropic import ChatAnthropic
+from langchain_core.caches import BaseCache
 from langchain_openai import ChatOpenAI
+from deepagents.llm_cache import ResponseCache
+from typing import Optional, Union
 import os
 
 
-def get_default_model():
-    """Get the default model. Uses OpenAI if OPENAI_API_KEY is set, otherwise Anthropic."""
+def _response_cache(cache: Union[bool, BaseCache, None], temperature: Optional[float]) -> Optional[BaseCache]:
+    """The cache to give a model, or None; only deterministic sampling is cached."""
+    if not cache:
+        return None
+    if temperature != 0:
+        raise ValueError(f"responses are only cached at temperature 0, not {temperature}")
+    if cache is True:
+        return ResponseCache()
+    return cache
+
+
+def get_default_model(cache: Union[bool, BaseCache, None] = None):
+    """Get the default model. Uses OpenAI if OPENAI_API_KEY is set, otherwise Anthropic.
+
+    With `cache` (True for a `ResponseCache` at the default path, or a cache
+    instance), repeated calls are answered from the cache; the Anthropic
+    model then samples at temperature 0.
+    """
     if os.getenv("OPENAI_API_KEY"):
-        return ChatOpenAI(
-            model="gpt-4o",
-            temperature=0,
-            max_tokens=4000
-        )
+        return get_openai_model(cache=cache)
     else:
-        return ChatAnthropic(model_name="claude-sonnet-4-20250514", max_tokens=64000)
+        return get_anthropic_model(temperature=0 if cache else None, cache=cache)
 
 
-def get_openai_model(model_name="gpt-4o", temperature=0, max_tokens=4000):
+def get_openai_model(model_name="gpt-4o", temperature=0, max_tokens=4000, cache: Union[bool, BaseCache, None] = None):
     """Get an OpenAI model specifically."""
     return ChatOpenAI(
         model=model_name,
         temperature=temperature,
-        max_tokens=max_tokens
+        max_tokens=max_tokens,
+        cache=_response_cache(cache, temperature),
     )
 
 
-def get_anthropic_model(model_name="claude-sonnet-4-20250514", max_tokens=64000):
-    """Get an Anthropic model specifically.""" 
-    return ChatAnthropic(model_name=model_name, max_tokens=max_tokens)
+def get_anthropic_model(
+    model_name="claude-sonnet-4-20250514",
+    max_tokens=64000,
+    temperature: Optional[float] = None,
+    cache: Union[bool, BaseCache, None] = None,
+):
+    """Get an Anthropic model specifically."""
+    return ChatAnthropic(
+        model_name=model_name,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        cache=_response_cache(cache, temperature),
+    )
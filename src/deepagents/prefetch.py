@@ -0,0 +1,155 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Hashable, Optional
+
+from deepagents.admission import BACKGROUND
+from deepagents.db import get_pool
+from deepagents.join_graph import get_join_graph
+from deepagents.schema_index import get_schema_index
+from deepagents.singleflight import flight_key, single_flight
+from deepagents.tools import _postgres_analyze, _postgres_schema
+
+# Tables whose columns and basic statistics are prefetched, and how long a
+# prefetched result waits to be used before it is dropped.
+PREFETCH_TABLES = 5
+PREFETCH_TTL = 120.0
+
+# The most scanned tables first; among unscanned ones, the largest. Each comes
+# as schema.relname, and as its bare name too when that resolves to it.
+HOT_TABLES_QUERY = """
+    SELECT quote_ident(schemaname) || '.' || quote_ident(relname),
+           CASE WHEN pg_table_is_visible(relid) THEN relname END
+    FROM pg_stat_user_tables
+    ORDER BY coalesce(seq_scan, 0) + coalesce(idx_scan, 0) DESC, n_live_tup DESC
+    LIMIT %s
+"""
+
+
+def hot_tables(db_connection: str, n: int = PREFETCH_TABLES, snapshot: Optional[str] = None) -> list[tuple[str, Optional[str]]]:
+    """The `n` most used tables, as (schema.relname, bare name or None) pairs."""
+    with get_pool(db_connection).connection(BACKGROUND, None, snapshot) as conn:
+        cursor = conn.cursor()
+        cursor.execute_prepared(HOT_TABLES_QUERY, (n,))
+        names = [(row[0], row[1]) for row in cursor.fetchall()]
+        cursor.close()
+    return names
+
+
+class Prefetched:
+    """The results prefetched for one run, keyed like `single_flight` calls.
+
+    Each result is served once, to the run's first matching tool call; a
+    result still being computed is waited for. Errors, and results finished
+    more than `ttl` seconds ago, are not served.
+    """
+
+    def __init__(self, ttl: float = PREFETCH_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (every key of the same result, future of (result, finished at)).
+        self._futures: dict[Hashable, tuple[list[Hashable], Future]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.hits = 0
+
+    def add(self, keys: list[Hashable], future: Future) -> None:
+        """Register `future` as the result for each of `keys`; taking one takes them all."""
+        with self._lock:
+            for key in keys:
+                self._futures[key] = (keys, future)
+
+    def take(self, key: Hashable) -> Optional[str]:
+        """The prefetched result for `key`, or None if there is none to serve."""
+        with self._lock:
+            entry = self._futures.pop(key, None)
+            if entry is None:
+                return None
+            for alias in entry[0]:
+                self._futures.pop(alias, None)
+        try:
+            result, finished_at = entry[1].result()
+        except Exception:
+            return None
+        if result.startswith("Error") or time.monotonic() - finished_at > self.ttl:
+            return None
+        with self._lock:
+            self.hits += 1
+        return result
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Wait for the prefetch started by `start_prefetch` to finish."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def _timed(key, load: Callable[[], str]) -> tuple[str, float]:
+    # Joins an identical call already in flight, e.g. from another run.
+    return single_flight.do(key, load), time.monotonic()
+
+
+def prefetch(
+    db_connection: str,
+    snapshot: Optional[str] = None,
+    tables: int = PREFETCH_TABLES,
+    ttl: float = PREFETCH_TTL,
+    prefetched: Optional[Prefetched] = None,
+) -> Prefetched:
+    """Warm the caches behind the schema tools for a run that is starting.
+
+    Loads the catalog (and the schema search index and join graph built
+    from it), and concurrently computes the table list and, for the `tables`
+    most used tables, their columns and basic analysis. Row counts come from
+    planner estimates rather than counting every row. The results are
+    returned in `prefetched` for the run's first matching postgres_schema
+    and postgres_analyze calls. Everything runs at background admission
+    priority and failures are ignored: the tools then query the database
+    as usual.
+    """
+    prefetched = prefetched or Prefetched(ttl)
+    schema_key = lambda table: flight_key(db_connection, "postgres_schema", table, snapshot)
+    analyze_key = lambda table: flight_key(db_connection, "postgres_analyze", table, "basic", False, snapshot)
+
+    def warm_catalog():
+        get_schema_index(db_connection)
+        get_join_graph(db_connection)
+
+    def warm(keys, load):
+        prefetched.add(keys, executor.submit(_timed, keys[0], load))
+
+    with ThreadPoolExecutor(max_workers=2 * tables + 2, thread_name_prefix="deepagents-prefetch") as executor:
+        executor.submit(warm_catalog)
+        warm([schema_key(None)], lambda: _postgres_schema(db_connection, None, BACKGROUND, None, snapshot))
+        try:
+            names = hot_tables(db_connection, tables, snapshot) if tables > 0 else []
+        except Exception:
+            names = []
+        for qualified, bare in names:
+            aliases = [qualified] + ([bare] if bare else [])
+            warm(
+                [schema_key(name) for name in aliases],
+                lambda table=qualified: _postgres_schema(db_connection, table, BACKGROUND, None, snapshot),
+            )
+            warm(
+                [analyze_key(name) for name in aliases],
+                lambda table=qualified: _postgres_analyze(
+                    db_connection, table, "basic", False, BACKGROUND, None, snapshot, estimate_rows=True
+                ),
+            )
+    return prefetched
+
+
+def start_prefetch(db_connection: str, snapshot: Optional[str] = None, **kwargs) -> Prefetched:
+    """Run `prefetch` in a background thread, so it overlaps the run's first model call.
+
+    Pass the returned `Prefetched` to the run as `configurable["prefetched"]`.
+    """
+    prefetched = Prefetched(kwargs.get("ttl", PREFETCH_TTL))
+    prefetched._thread = threading.Thread(
+        target=prefetch,
+        args=(db_connection, snapshot),
+        kwargs={**kwargs, "prefetched": prefetched},
+        name="deepagents-prefetch",
+        daemon=True,
+    )
+    prefetched._thread.start()
+    return prefetched
@@ -0,0 +1,181 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Any, NamedTuple, Optional
+
+
+class StoredProfile(NamedTuple):
+    profile: dict[str, Any]
+    signature: dict[str, Any]
+    created_at: float
+
+
+def default_profile_store_path() -> Optional[str]:
+    """Location of the profile store, from `DEEPAGENTS_PROFILE_STORE`; unset or empty disables it.
+
+    Detailed profiles hold sample values of the data, so nothing is
+    written to disk unless asked for.
+    """
+    return os.getenv("DEEPAGENTS_PROFILE_STORE") or None
+
+
+# Identifies the cluster, database and role independently of the connection
+# string, so profiles are shared by every DSN or replica alias that reaches
+# the database as the same role. Detailed profiles hold sample values, and
+# which rows and columns a role may read depends on its grants and row-level
+# security, so roles never share profiles. pg_control_system() is not
+# visible to every role; the fallback is the server address and database OID.
+DATABASE_IDENTITY_QUERY = """
+    SELECT
+        current_database(),
+        (SELECT oid FROM pg_database WHERE datname = current_database()),
+        COALESCE(host(inet_server_addr()), 'local'),
+        COALESCE(inet_server_port(), 0),
+        (SELECT oid FROM pg_roles WHERE rolname = current_user)
+"""
+SYSTEM_IDENTIFIER_QUERY = "SELECT system_identifier FROM pg_control_system()"
+
+# Postgres' own change tracking for a table. Any write bumps
+# n_mod_since_analyze and any ANALYZE moves last_(auto)analyze, so a profile
+# stays valid exactly as long as these are unchanged. A hot standby applies
+# the primary's writes without counting them, so there they prove nothing.
+STALENESS_QUERY = """
+    SELECT n_mod_since_analyze, n_live_tup, last_analyze, last_autoanalyze, pg_is_in_recovery()
+    FROM pg_stat_user_tables
+    WHERE relid = %s
+"""
+
+
+_identities: dict[str, str] = {}
+
+
+def database_identity(conn, db_connection: str) -> str:
+    """Return the identity of the database and role behind `conn`, cached per connection string."""
+    identity = _identities.get(db_connection)
+    if identity is not None:
+        return identity
+    cursor = conn.cursor()
+    cursor.execute(DATABASE_IDENTITY_QUERY)
+    datname, datoid, host, port, role_oid = cursor.fetchone()
+    try:
+        cursor.execute(SYSTEM_IDENTIFIER_QUERY)
+        cluster = str(cursor.fetchone()[0])
+    except Exception:
+        conn.rollback()
+        cluster = f"{host}:{port}"
+    cursor.close()
+    identity = _identities[db_connection] = f"{cluster}/{datoid}/{datname}/role:{role_oid}"
+    return identity
+
+
+def staleness_signature(cursor, table_oid: int) -> dict[str, Any]:
+    # Pooled cursors run this fixed statement prepared; plain cursors just execute it.
+    execute = getattr(cursor, "execute_prepared", cursor.execute)
+    execute(STALENESS_QUERY, (table_oid,))
+    row = cursor.fetchone()
+    if row is None or row[4]:
+        # Views, foreign tables and the like have no statistics to go on, and
+        # a standby's do not move with replayed writes: never use the store.
+        return {}
+    n_mod_since_analyze, n_live_tup, last_analyze, last_autoanalyze, _ = row
+    return {
+        "n_mod_since_analyze": n_mod_since_analyze,
+        "n_live_tup": n_live_tup,
+        "last_analyze": last_analyze.isoformat() if last_analyze else None,
+        "last_autoanalyze": last_autoanalyze.isoformat() if last_autoanalyze else None,
+    }
+
+
+class ProfileStore:
+    """A local SQLite cache of table profiles computed by `postgres_analyze`.
+
+    Entries are keyed by database identity (which includes the role), table
+    OID and analysis type, and
+    carry the staleness signature that was current when they were computed.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS table_profiles (
+                    database_identity TEXT NOT NULL,
+                    table_oid INTEGER NOT NULL,
+                    analysis_type TEXT NOT NULL,
+                    signature TEXT NOT NULL,
+                    profile TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (database_identity, table_oid, analysis_type)
+                )
+                """
+            )
+            self._initialized = True
+        return conn
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def get(self, database_identity: str, table_oid: int, analysis_type: str) -> Optional[StoredProfile]:
+        if not self.enabled:
+            return None
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT profile, signature, created_at FROM table_profiles "
+                "WHERE database_identity = ? AND table_oid = ? AND analysis_type = ?",
+                (database_identity, table_oid, analysis_type),
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return StoredProfile(json.loads(row[0]), json.loads(row[1]), row[2])
+
+    def put(
+        self,
+        database_identity: str,
+        table_oid: int,
+        analysis_type: str,
+        profile: dict[str, Any],
+        signature: dict[str, Any],
+    ) -> None:
+        if not self.enabled:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO table_profiles VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        database_identity,
+                        table_oid,
+                        analysis_type,
+                        json.dumps(signature, sort_keys=True),
+                        json.dumps(profile, default=str),
+                        time.time(),
+                    ),
+                )
+        finally:
+            conn.close()
+
+    def get_fresh(
+        self, database_identity: str, table_oid: int, analysis_type: str, signature: dict[str, Any]
+    ) -> Optional[StoredProfile]:
+        """Return the stored profile only if the table has not changed since it was computed."""
+        stored = self.get(database_identity, table_oid, analysis_type)
+        if stored is None or not signature or stored.signature != signature:
+            return None
+        return stored
+
+
+profile_store = ProfileStore(default_profile_store_path())
@@ -0,0 +1,260 @@
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Union
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Seconds between samples, and the deepest Python stack recorded per sample.
+PROFILE_INTERVAL = 0.01
+MAX_STACK_DEPTH = 256
+PROFILE_FORMATS = ("speedscope", "collapsed")
+_EXTENSIONS = {"speedscope": ".speedscope.json", "collapsed": ".collapsed.txt"}
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+def default_profile_dir() -> str:
+    """Directory that run profiles are written to; override with `DEEPAGENTS_PROFILE_DIR`."""
+    return os.getenv("DEEPAGENTS_PROFILE_DIR") or os.path.join(os.getcwd(), "profiles")
+
+
+def profile_options(value: Union[bool, str, dict, None]) -> Optional[dict]:
+    """Normalize a `profile` setting to options, or None when profiling is off.
+
+    Accepts True, a format name ("speedscope" or "collapsed"), or a dict
+    with any of `format`, `dir`, `interval` and `path`.
+    """
+    if not value:
+        return None
+    if value is True:
+        value = {}
+    elif isinstance(value, str):
+        value = {"format": value}
+    options = {"format": "speedscope", "dir": None, "interval": PROFILE_INTERVAL, "path": None, **value}
+    if options["format"] not in PROFILE_FORMATS:
+        raise ValueError(f"profile format must be one of {', '.join(PROFILE_FORMATS)}, not {options['format']!r}")
+    return options
+
+
+def request_profile_options(value: Union[bool, str, dict, None], configured: Optional[dict]) -> Optional[dict]:
+    """Options for one run whose config sets `profile`, or None when it switches profiling off.
+
+    A request can only switch profiling on or off and choose the format
+    (True, False, a format name, or a dict with just `format`); where
+    profiles are written and how often stacks are sampled stay as the
+    agent was configured (`configured`, from `profile_options`).
+    """
+    if isinstance(value, dict):
+        unknown = sorted(set(value) - {"format"})
+        if unknown:
+            raise ValueError(f"a run's profile can only set its format, not {', '.join(unknown)}")
+        value = value.get("format", True)
+    if not value:
+        return None
+    options = dict(configured or profile_options(True))
+    if isinstance(value, str):
+        options["format"] = profile_options(value)["format"]
+    return options
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class RunProfiler(BaseCallbackHandler):
+    """A sampling profiler for one agent run, attributing time to graph nodes and tools.
+
+    Pass it as a callback and wrap the run in `start()`/`stop()`. A
+    background thread samples the Python stacks of the threads working on
+    the run every `interval` seconds; each sample is prefixed with the
+    nodes and tools (including sub-agents') active in that thread, so
+    flame graphs group time by node and tool. Threads not working on the
+    run, such as other requests, are never sampled. Samples measure wall-clock
+    time, so a thread waiting on the model, the database or another thread
+    is sampled too.
+
+    Attribution follows threads: in async runs, concurrent tool calls
+    share the event loop thread and are attributed to the latest started.
+    """
+
+    raise_error = False
+    # Called in the thread doing the work, also in async runs, so samples are attributed to it.
+    run_inline = True
+
+    def __init__(self, name: str = "run", interval: float = PROFILE_INTERVAL):
+        self.name = name
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.duration = 0.0
+        self._lock = threading.Lock()
+        # run id -> (thread id, labels); threads -> stack of run ids active in them.
+        self._runs: dict[Any, tuple[int, tuple[str, ...]]] = {}
+        self._threads: dict[int, list[Any]] = {}
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._root = object()
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._enter(self._root, None, self.name)
+        self._sampler = threading.Thread(target=self._sample, name="deepagents-profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self._exit(self._root)
+        self.duration = time.perf_counter() - self._started
+
+    def _enter(self, run_id, parent_run_id, label: Optional[str]) -> None:
+        thread_id = threading.get_ident()
+        with self._lock:
+            parent = self._runs.get(parent_run_id) or self._runs.get(self._root)
+            labels = parent[1] if parent else ()
+            if label:
+                labels = labels + (label,)
+            self._runs[run_id] = (thread_id, labels)
+            self._threads.setdefault(thread_id, []).append(run_id)
+
+    def _exit(self, run_id) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+            if run is None:
+                return
+            stack = self._threads.get(run[0], [])
+            if run_id in stack:
+                stack.remove(run_id)
+            if not stack:
+                self._threads.pop(run[0], None)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        name = kwargs.get("name")
+        self._enter(run_id, parent_run_id, f"node:{node}" if node and node == name else None)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name")
+        self._enter(run_id, parent_run_id, f"tool:{name}")
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._exit(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._exit(run_id)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._exit(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._exit(run_id)
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            with self._lock:
+                active = {
+                    thread_id: self._runs[stack[-1]][1]
+                    for thread_id, stack in self._threads.items()
+                    if stack and thread_id != own
+                }
+            frames = sys._current_frames()
+            for thread_id, labels in active.items():
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                self.samples[labels + tuple(reversed(stack))] += elapsed
+
+    def by_label(self) -> dict[str, float]:
+        """Seconds sampled under each node and tool label, including time in nested ones."""
+        totals: Counter = Counter()
+        for stack, seconds in self.samples.items():
+            for label in {frame for frame in stack if frame.startswith(("node:", "tool:"))}:
+                totals[label] += seconds
+        return dict(totals.most_common())
+
+    def speedscope(self) -> dict:
+        """The samples as a speedscope "sampled" profile."""
+        frames: dict[str, int] = {}
+        samples, weights = [], []
+        for stack, seconds in self.samples.items():
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(seconds)
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": self.name,
+            "exporter": "deepagents",
+            "shared": {"frames": [{"name": frame} for frame in frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+    def collapsed(self) -> str:
+        """The samples in the collapsed-stack format of flamegraph.pl and inferno, weighted in microseconds."""
+        lines = []
+        for stack, seconds in sorted(self.samples.items()):
+            lines.append(f"{';'.join(frame.replace(';', ':') for frame in stack)} {max(round(seconds * 1e6), 1)}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, profile_format: str = "speedscope") -> str:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            if profile_format == "collapsed":
+                f.write(self.collapsed())
+            else:
+                json.dump(self.speedscope(), f)
+        return path
+
+
+def profile_path(options: dict, run_id: Any = None) -> str:
+    """Where the profile of a run is written: `options["path"]`, or a file named after the run in the profile directory."""
+    if options.get("path"):
+        return options["path"]
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{run_id or uuid.uuid4().hex[:12]}"
+    return os.path.join(options.get("dir") or default_profile_dir(), name + _EXTENSIONS[options["format"]])
+
+
+def with_callback(config: Optional[dict], handler: BaseCallbackHandler) -> dict:
+    """`config` with `handler` added to its callbacks."""
+    config = dict(config or {})
+    callbacks = config.get("callbacks")
+    if callbacks is None:
+        config["callbacks"] = [handler]
+    elif isinstance(callbacks, list):
+        config["callbacks"] = [*callbacks, handler]
+    else:
+        # A callback manager; add the handler to a copy so the caller's is unchanged.
+        manager = callbacks.copy()
+        manager.add_handler(handler, inherit=True)
+        config["callbacks"] = manager
+    return config
+
+
+@contextmanager
+def profiled(config: Optional[dict], options: dict, name: str = "run") -> Iterator[dict]:
+    """Profile the run started with the config this yields, and write its profile on exit."""
+    profiler = RunProfiler(name, options["interval"])
+    profiler.start()
+    try:
+        yield with_callback(config, profiler)
+    finally:
+        profiler.stop()
+        profiler.write(profile_path(options, (config or {}).get("run_id")), options["format"])
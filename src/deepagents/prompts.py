@@ -151,6 +151,15 @@ The assistant did not use the todo list because this is a single information loo
 </reasoning>
 </example>
 
+## Creating and Updating the List
+
+Create the list once by passing `todos`, the whole list. Every todo gets a stable id (#1, #2, ...), reported back to you.
+After that, change the list with `ops` instead of resending it:
+- `{"op": "add", "content": "...", "status": "pending"}` adds a todo (status defaults to pending)
+- `{"op": "update", "id": "2", "status": "completed"}` changes the status (or `content`) of todo #2
+- `{"op": "remove", "id": "3"}` removes todo #3
+Several ops can be sent in one call, e.g. marking one todo completed and the next in_progress.
+
 ## Task States and Management
 
 1. **Task States**: Use these states to track progress:
@@ -262,6 +271,9 @@ Usage:
 - Also supports WITH (CTE) and EXPLAIN queries for analysis
 - Queries are automatically limited to 1000 rows unless LIMIT is explicitly specified
 - Results are formatted as a tab-separated table with column headers
+- For large results, pass preview_rows (e.g. preview_rows=50, limit=0) to get only the first rows plus a result handle; read further rows with postgres_fetch_page instead of re-running the query
+- When you only need the shape of a result (ranges, averages, quantiles, NULL counts, most common values), pass mode='summary': the full result is summarized per column and only the compact summary is returned, with no default LIMIT applied
+- For large numeric or analytical results (thousands of rows of numbers, dates and aggregates), pass columnar=True for a faster fetch; the output format is the same
 - The database connection must be established at startup of the deep agent
 - Returns formatted query results or error messages
 - SECURITY: Modification operations (INSERT, UPDATE, DELETE, DROP, etc.) are strictly forbidden
@@ -271,7 +283,20 @@ Example queries:
 - SELECT name, email FROM customers ORDER BY created_at DESC LIMIT 50
 - SELECT COUNT(*) FROM orders WHERE status = 'completed'
 - WITH monthly_sales AS (SELECT ...) SELECT * FROM monthly_sales
-- EXPLAIN SELECT * FROM large_table WHERE indexed_column = 'value'"""
+- EXPLAIN SELECT * FROM large_table WHERE indexed_column = 'value'
+- postgres_query(query='SELECT * FROM events', limit=0, preview_rows=50) - Preview a large result and get a handle
+- postgres_query(query='SELECT amount, status, created_at FROM orders', mode='summary') - Per-column statistics of all orders"""
+
+POSTGRES_FETCH_PAGE_DESCRIPTION = """Read a page of rows from a large query result returned by postgres_query.
+
+Usage:
+- Use the result handle reported by postgres_query when it was called with preview_rows
+- offset is the zero-based index of the first row to return, n is the number of rows
+- Pages are served from a local copy of the result, so the query is not re-run against the database
+- Handles expire when many newer results have been stored; re-run the query if a handle is unknown
+
+Examples:
+- postgres_fetch_page(handle='res_1a2b3c4d5e6f', offset=50, n=100) - Rows 50 to 149 of the result"""
 
 POSTGRES_SCHEMA_DESCRIPTION = """Get schema information for PostgreSQL database tables.
 
@@ -284,7 +309,49 @@ Usage:
 
 Examples:
 - postgres_schema() - Lists all tables in the database
-- postgres_schema(table_name='users') - Shows schema for the 'users' table"""
+- postgres_schema(table_name='users') - Shows schema for the 'users' table
+
+On databases with many tables, prefer postgres_search_schema to find relevant tables instead of listing them all."""
+
+POSTGRES_SEARCH_SCHEMA_DESCRIPTION = """Search the database catalog for the tables most relevant to a query.
+
+Usage:
+- Pass keywords or a short description of the data you need (e.g. 'customer shipping address')
+- Matches table names, column names and table/column comments, tolerating plural forms and partial words
+- Returns the top k tables ranked by relevance, each with its primary key and the columns that matched
+- Much cheaper than listing every table with postgres_schema on large databases
+- Read-only operation that does not modify the database
+
+Examples:
+- postgres_search_schema(query='order line items') - Tables about order items
+- postgres_search_schema(query='refund payment', k=5) - Top 5 tables about refunds and payments"""
+
+POSTGRES_JOIN_PATH_DESCRIPTION = """Find how two tables join, following the database's foreign keys.
+
+Usage:
+- Pass two table names, optionally schema-qualified (e.g. 'public.orders'); a name found in several schemas must be qualified
+- Returns the shortest join paths as ready-to-use JOIN ... ON ... clauses, including intermediate tables
+- Each join notes whether the join columns are indexed; prefer paths whose joins are indexed on large tables
+- Use this instead of guessing joins from column names
+- Read-only operation that does not modify the database
+
+Examples:
+- postgres_join_path(table_a='users', table_b='order_items') - How users relate to order items
+- postgres_join_path(table_a='sales.invoices', table_b='public.customers')"""
+
+POSTGRES_EXPORT_DESCRIPTION = """Export the full result of a SELECT query to a local CSV or Parquet file.
+
+Usage:
+- Use this when the user wants a complete extract or a file, rather than rows to read in the conversation
+- The result is streamed from the database straight to disk, so exports of any size are fine; no LIMIT is added
+- filename is relative to the export directory (the extension is added if missing); paths outside it are rejected
+- format='csv' (default) writes CSV with a header line; format='parquet' writes typed columns in row groups
+- Returns only the file path, row count, size, throughput and column schema - never the data itself
+- Only SELECT and WITH queries are allowed; read-only operation that does not modify the database
+
+Examples:
+- postgres_export(query="SELECT * FROM orders", filename="orders") - Full orders table as exports/orders.csv
+- postgres_export(query="SELECT * FROM events WHERE created_at >= '2024-01-01'", filename="events_2024", format='parquet')"""
 
 POSTGRES_ANALYZE_DESCRIPTION = """Perform analysis on PostgreSQL database tables to get insights and statistics.
 
@@ -293,6 +360,7 @@ Usage:
 - Call with table_name to analyze a specific table
 - Use analysis_type='basic' for row counts, sizes, and column statistics
 - Use analysis_type='detailed' for comprehensive column analysis with sample data
+- Table profiles are cached locally and reused until the table is modified or re-analyzed; pass refresh=True to force recomputation
 - Returns formatted analysis results including row counts, data distribution, and table sizes
 - Read-only operation that does not modify the database
 
@@ -300,3 +368,71 @@ Examples:
 - postgres_analyze() - Database overview with all tables and sizes
 - postgres_analyze(table_name='users') - Basic analysis of the users table
 - postgres_analyze(table_name='orders', analysis_type='detailed') - Detailed analysis with sample data"""
+
+POSTGRES_INDEX_ADVICE_DESCRIPTION = """Suggest indexes that would speed up the queries run against the database, ranked by estimated benefit.
+
+Usage:
+- Call with no arguments to analyze the queries captured from postgres_query calls (when the workload log is enabled)
+- Or pass queries, a list of SELECT statements, to analyze those instead
+- Each query is explained, not run; filters and join keys that force sequential scans of large tables become candidate indexes
+- Benefits are the planner's estimates with hypothetical indexes when the hypopg extension is installed, cost heuristics otherwise
+- Returns ready-to-run CREATE INDEX statements for a DBA to review; nothing is created
+- Read-only operation that does not modify the database
+
+Examples:
+- postgres_index_advice() - Index advice for the captured agent workload
+- postgres_index_advice(queries=["SELECT * FROM orders WHERE customer_id = 42 AND status = 'paid'"], limit=3)"""
+
+READ_SUBAGENT_RESULT_DESCRIPTION = """Read the full report of a sub-agent whose result was condensed.
+
+Usage:
+- Long sub-agent reports are returned condensed, ending with a note that names a handle
+- Pass that handle to read the original text; offset and length select a range of characters
+- Only read the full report when the condensed one lacks a detail you need
+
+Examples:
+- read_subagent_result(handle='rep_1a2b3c4d5e6f') - The first 6000 characters of the report
+- read_subagent_result(handle='rep_1a2b3c4d5e6f', offset=6000) - The next part"""
+
+# Compact tiers of the built-in descriptions, selected by create_deep_agent to
+# keep the fixed prompt overhead of every model call under a token ceiling.
+WRITE_TODOS_DESCRIPTION_COMPACT = """Create and track a task list for multi-step work (3+ steps); skip it for trivial or conversational requests.
+- First call: pass `todos`, the whole list; each todo gets a stable id (#1, #2, ...)
+- Later calls: pass `ops` instead: {"op": "add", "content": "..."}, {"op": "update", "id": "2", "status": "completed"}, {"op": "remove", "id": "3"}
+- Statuses: pending, in_progress (only ONE at a time), completed
+- Mark a todo in_progress before starting it and completed as soon as it is fully done, never with errors or blockers left"""
+
+TASK_DESCRIPTION_SUFFIX_COMPACT = """Pass the agent type as subagent_type and a complete, self-contained task as description.
+- Launch independent agents in parallel with several tool calls in one message
+- Each agent is stateless and returns one final message, which the user does not see; say exactly what it should return and summarize its result for the user"""
+
+POSTGRES_QUERY_DESCRIPTION_COMPACT = """Run a read-only SELECT, WITH or EXPLAIN query; results come back as a tab-separated table (default LIMIT 1000).
+- preview_rows=N with limit=0: first N rows plus a handle for postgres_fetch_page
+- mode='summary': per-column statistics of the full result instead of rows
+- columnar=True: faster fetch for large numeric results"""
+
+POSTGRES_FETCH_PAGE_DESCRIPTION_COMPACT = """Read rows offset..offset+n-1 of a result handle from postgres_query(preview_rows=...), without re-running the query."""
+
+POSTGRES_SCHEMA_DESCRIPTION_COMPACT = """List all tables (no arguments) or the columns, types, nullability and defaults of table_name."""
+
+POSTGRES_SEARCH_SCHEMA_DESCRIPTION_COMPACT = """Find the k tables most relevant to keywords, with their primary keys and matching columns."""
+
+POSTGRES_JOIN_PATH_DESCRIPTION_COMPACT = """Get the foreign-key JOIN ... ON clauses connecting table_a and table_b, noting which joins are indexed."""
+
+POSTGRES_EXPORT_DESCRIPTION_COMPACT = """Stream the full result of a SELECT to filename in the export directory as format='csv' or 'parquet'; returns the path, row count and schema only."""
+
+POSTGRES_ANALYZE_DESCRIPTION_COMPACT = """Database overview (no arguments) or profile of table_name: analysis_type='basic' or 'detailed'; refresh=True recomputes a cached profile."""
+
+POSTGRES_INDEX_ADVICE_DESCRIPTION_COMPACT = """Rank CREATE INDEX suggestions for the captured agent queries, or for the given queries, by estimated benefit; explains only, creates nothing."""
+
+COMPACT_TOOL_DESCRIPTIONS = {
+    "write_todos": WRITE_TODOS_DESCRIPTION_COMPACT,
+    "postgres_query": POSTGRES_QUERY_DESCRIPTION_COMPACT,
+    "postgres_fetch_page": POSTGRES_FETCH_PAGE_DESCRIPTION_COMPACT,
+    "postgres_schema": POSTGRES_SCHEMA_DESCRIPTION_COMPACT,
+    "postgres_search_schema": POSTGRES_SEARCH_SCHEMA_DESCRIPTION_COMPACT,
+    "postgres_join_path": POSTGRES_JOIN_PATH_DESCRIPTION_COMPACT,
+    "postgres_export": POSTGRES_EXPORT_DESCRIPTION_COMPACT,
+    "postgres_analyze": POSTGRES_ANALYZE_DESCRIPTION_COMPACT,
+    "postgres_index_advice": POSTGRES_INDEX_ADVICE_DESCRIPTION_COMPACT,
+}
@@ -0,0 +1,149 @@
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+# Characters of a sub-agent's final message passed on to the main agent
+# before it is condensed.
+MAX_OUTPUT_CHARS = 6000
+# Full reports kept for retrieval, by count and total characters.
+MAX_REPORTS = 256
+MAX_STORED_CHARS = 16 * 1024 * 1024
+
+_OMITTED = "[...]"
+
+SUMMARIZE_PROMPT = """Condense the following report from a research sub-agent to at most {max_chars} characters.
+Keep its structure (headings, lists, tables), every conclusion, and all figures, identifiers, table and column names and SQL it relies on.
+Drop narration of the steps taken, repetition and raw data that the conclusions already cover. Reply with the condensed report only."""
+
+
+class ReportStore:
+    """Keeps full sub-agent reports in memory behind handles, least recently used evicted first."""
+
+    def __init__(self, max_reports: int = MAX_REPORTS, max_chars: int = MAX_STORED_CHARS):
+        self.max_reports = max_reports
+        self.max_chars = max_chars
+        self._reports: "OrderedDict[str, str]" = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    def put(self, text: str) -> str:
+        handle = f"rep_{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self._reports[handle] = text
+            self._chars += len(text)
+            while len(self._reports) > 1 and (
+                len(self._reports) > self.max_reports or self._chars > self.max_chars
+            ):
+                _, evicted = self._reports.popitem(last=False)
+                self._chars -= len(evicted)
+        return handle
+
+    def read(self, handle: str, offset: int = 0, length: int = MAX_OUTPUT_CHARS) -> tuple[str, int]:
+        """Return `(text, total_chars)` for characters `[offset, offset + length)` of a report."""
+        with self._lock:
+            text = self._reports.get(handle)
+            if text is None:
+                raise KeyError(handle)
+            self._reports.move_to_end(handle)
+        offset = max(offset, 0)
+        return text[offset:offset + max(length, 0)], len(text)
+
+
+report_store = ReportStore()
+
+
+def truncate_report(text: str, max_chars: int) -> str:
+    """Shorten `text` to about `max_chars` while keeping its outline.
+
+    Headings and the first line of every paragraph are kept first, then the
+    whole last paragraph (usually the conclusion), then the remaining lines
+    in document order as far as they fit. Each run of dropped lines is
+    marked with "[...]".
+    """
+    if len(text) <= max_chars:
+        return text
+    lines = text.splitlines()
+    essential, rest = [], []
+    last_block = []
+    starts_block = True
+    for i, line in enumerate(lines):
+        if not line.strip():
+            starts_block = True
+            continue
+        if starts_block:
+            last_block = []
+        last_block.append(i)
+        if starts_block or line.lstrip().startswith("#"):
+            essential.append(i)
+        else:
+            rest.append(i)
+        starts_block = False
+    order = essential + [i for i in last_block if i not in essential] + [i for i in rest if i not in last_block]
+
+    added = []
+    used = 0
+    for i in order:
+        if used + len(lines[i]) + 1 > max_chars:
+            break
+        added.append(i)
+        used += len(lines[i]) + 1
+    if not added:
+        return text[:max(max_chars - len(_OMITTED) - 1, 0)] + "\n" + _OMITTED
+    output = _render(lines, set(added))
+    # Gap markers and blank lines were not budgeted; drop the last kept lines until they fit.
+    while len(output) > max_chars and len(added) > 1:
+        added.pop()
+        output = _render(lines, set(added))
+    return output[:max_chars]
+
+
+def _render(lines: list[str], kept: set[int]) -> str:
+    output = []
+    gap = False
+    for i, line in enumerate(lines):
+        if i in kept or not line.strip():
+            if gap and (not output or output[-1] != _OMITTED):
+                output.append(_OMITTED)
+            gap = False
+            if i in kept:
+                output.append(line)
+            elif output and output[-1]:
+                output.append("")
+        else:
+            gap = True
+    if gap and output[-1] != _OMITTED:
+        output.append(_OMITTED)
+    return "\n".join(output).strip("\n")
+
+
+def condense_report(text: str, max_chars: int = MAX_OUTPUT_CHARS, summarizer: Optional[Any] = None) -> str:
+    """Fit a sub-agent's report into `max_chars`.
+
+    Oversized reports are stored in `report_store` and replaced by a
+    condensed version: the `summarizer` model's summary when one is given
+    and succeeds, structure-preserving truncation otherwise. A footer names
+    the handle under which the full text can be read.
+    """
+    if len(text) <= max_chars:
+        return text
+    handle = report_store.put(text)
+    footer = (
+        f"\n\n[Condensed from {len(text):,} characters. "
+        f"Read the full report with read_subagent_result(handle='{handle}').]"
+    )
+    budget = max(max_chars - len(footer), 0)
+    condensed = None
+    if summarizer is not None:
+        try:
+            response = summarizer.invoke([
+                SystemMessage(SUMMARIZE_PROMPT.format(max_chars=budget)),
+                HumanMessage(text),
+            ])
+            condensed = response.content if isinstance(response.content, str) else None
+        except Exception:
+            # A failing summarizer must not lose the report; truncate instead.
+            condensed = None
+    return truncate_report(condensed or text, budget) + footer
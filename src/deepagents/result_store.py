@@ -0,0 +1,164 @@
+import atexit
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Iterable, NamedTuple, Optional
+
+from deepagents.formatting import BYTEA_OID
+
+
+class ResultHandle(NamedTuple):
+    """A reference to a query result spilled to local disk."""
+
+    handle: str
+    column_names: list[str]
+    row_count: int
+
+
+class Page(NamedTuple):
+    """Rows read back from a spilled result."""
+
+    column_names: list[str]
+    rows: list[list]
+    total_rows: int
+    # The columns' type OIDs from the cursor description, or None if unknown.
+    type_oids: Optional[list[Optional[int]]]
+
+
+class _SpilledResult(NamedTuple):
+    path: str
+    column_names: list[str]
+    row_count: int
+    # Byte offset of every `block_size`-th row, so a page can seek close to its
+    # first row instead of scanning the file from the start.
+    block_offsets: list[int]
+    type_oids: Optional[list[Optional[int]]]
+
+
+def _to_cell(val: Any) -> Any:
+    """Convert a database value into something JSON can round-trip.
+
+    Arrays and JSON values keep their structure and bytea becomes hex, so
+    the column's formatter renders read-back values as it did the originals.
+    """
+    if val is None or isinstance(val, (bool, int, float, str)):
+        return val
+    if isinstance(val, (list, tuple)):
+        return [_to_cell(item) for item in val]
+    if isinstance(val, dict):
+        return {key: _to_cell(item) for key, item in val.items()}
+    if isinstance(val, (bytes, bytearray, memoryview)):
+        return bytes(val).hex()
+    return str(val)
+
+
+class ResultStore:
+    """Spills large query results to local files and serves them back page by page.
+
+    Rows are written as JSON lines. Handles are evicted least-recently-used
+    once `max_handles` results are stored, and their files are deleted.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_handles: int = 64,
+        block_size: int = 256,
+    ):
+        self._directory = directory
+        self._max_handles = max_handles
+        self._block_size = block_size
+        self._results: "OrderedDict[str, _SpilledResult]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self) -> str:
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix="deepagents-results-")
+            atexit.register(shutil.rmtree, self._directory, True)
+        os.makedirs(self._directory, exist_ok=True)
+        return self._directory
+
+    def spill(
+        self, column_names: list[str], rows: Iterable[tuple], type_oids: Optional[list[Optional[int]]] = None
+    ) -> ResultHandle:
+        """Write `rows` to a new spill file and return a handle for it.
+
+        `type_oids`, from the cursor description, are kept with the file so
+        pages can be formatted by column type like the first rows were.
+        """
+        handle = f"res_{uuid.uuid4().hex[:12]}"
+        path = os.path.join(self.directory, f"{handle}.jsonl")
+        block_offsets = []
+        row_count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for row in rows:
+                if row_count % self._block_size == 0:
+                    block_offsets.append(f.tell())
+                f.write(json.dumps([_to_cell(val) for val in row]))
+                f.write("\n")
+                row_count += 1
+
+        spilled = _SpilledResult(
+            path, list(column_names), row_count, block_offsets, list(type_oids) if type_oids is not None else None
+        )
+        with self._lock:
+            self._results[handle] = spilled
+            while len(self._results) > self._max_handles:
+                _, evicted = self._results.popitem(last=False)
+                _remove_quietly(evicted.path)
+        return ResultHandle(handle, spilled.column_names, row_count)
+
+    def fetch_page(self, handle: str, offset: int, n: int) -> Page:
+        """Return the `Page` of rows `[offset, offset + n)`."""
+        with self._lock:
+            spilled = self._results.get(handle)
+            if spilled is None:
+                raise KeyError(handle)
+            self._results.move_to_end(handle)
+
+        offset = max(offset, 0)
+        rows = []
+        if n > 0 and offset < spilled.row_count:
+            block = offset // self._block_size
+            skip = offset - block * self._block_size
+            with open(spilled.path, "r", encoding="utf-8") as f:
+                f.seek(spilled.block_offsets[block])
+                for _ in range(skip):
+                    f.readline()
+                for _ in range(n):
+                    line = f.readline()
+                    if not line:
+                        break
+                    rows.append(json.loads(line))
+        if spilled.type_oids is not None and BYTEA_OID in spilled.type_oids:
+            _restore_bytea(rows, spilled.type_oids)
+        return Page(spilled.column_names, rows, spilled.row_count, spilled.type_oids)
+
+    def discard(self, handle: str) -> None:
+        with self._lock:
+            spilled = self._results.pop(handle, None)
+        if spilled is not None:
+            _remove_quietly(spilled.path)
+
+
+def _restore_bytea(rows: list[list], type_oids: list[Optional[int]]) -> None:
+    columns = [i for i, oid in enumerate(type_oids) if oid == BYTEA_OID]
+    for row in rows:
+        for i in columns:
+            if row[i] is not None:
+                row[i] = bytes.fromhex(row[i])
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+result_store = ResultStore()
@@ -0,0 +1,143 @@
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import NamedTuple
+
+from deepagents.catalog import Catalog, TableInfo, get_derived
+
+# Term weights per field: a hit in the table name says more than a hit in a
+# column name or a comment.
+TABLE_NAME_WEIGHT = 3.0
+COLUMN_NAME_WEIGHT = 1.0
+COMMENT_WEIGHT = 0.5
+# Query words are expanded to catalog words that share enough trigrams with
+# them, so "customer" also finds "customers" and "addr" finds "address".
+MIN_TRIGRAM_SIMILARITY = 0.4
+MAX_EXPANSIONS = 8
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Runs of letters in any script, and runs of digits.
+_WORD_RE = re.compile(r"[^\W\d_]+|\d+")
+
+
+def _split_case(word: str) -> list[str]:
+    """Split a run of letters at case changes: `orderItems` -> order, Items; `HTTPServer` -> HTTP, Server."""
+    parts, start = [], 0
+    for i in range(1, len(word)):
+        previous, current, following = word[i - 1], word[i], word[i + 1:i + 2]
+        if current.isupper() and (previous.islower() or (previous.isupper() and following.islower())):
+            parts.append(word[start:i])
+            start = i
+    parts.append(word[start:])
+    return parts
+
+
+def tokenize(text: str) -> list[str]:
+    """Split identifiers and prose into lowercase tokens (`orderItems_v2` -> order, items, v, 2)."""
+    if not text:
+        return []
+    return [part.lower() for word in _WORD_RE.findall(text) for part in _split_case(word)]
+
+
+def trigrams(token: str) -> set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchHit(NamedTuple):
+    table: TableInfo
+    score: float
+    matched_columns: list[str]
+
+
+class SchemaIndex:
+    """An in-memory BM25 index over table names, column names and comments.
+
+    Postings store the saturated, length-normalised term frequency of each
+    table, so a query only has to multiply by the term's IDF and add. Fuzzy
+    matching goes through a trigram index over the vocabulary rather than
+    over the tables, which keeps the number of postings a query touches small.
+    """
+
+    def __init__(self, catalog: Catalog):
+        self.tables = catalog.tables
+        term_freqs = []
+        for table in self.tables:
+            terms: Counter = Counter()
+            self._add_text(terms, table.name, TABLE_NAME_WEIGHT)
+            self._add_text(terms, table.comment, COMMENT_WEIGHT)
+            for column in table.columns:
+                self._add_text(terms, column.name, COLUMN_NAME_WEIGHT)
+                self._add_text(terms, column.comment, COMMENT_WEIGHT)
+            term_freqs.append(terms)
+
+        doc_lengths = [sum(terms.values()) for terms in term_freqs]
+        # Every table may tokenize to nothing, e.g. names made only of punctuation.
+        avg_doc_length = (sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0) or 1.0
+        self._postings: dict[str, list[tuple[int, float]]] = defaultdict(list)
+        for doc_id, terms in enumerate(term_freqs):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[doc_id] / avg_doc_length)
+            for term, tf in terms.items():
+                self._postings[term].append((doc_id, tf * (BM25_K1 + 1) / (tf + norm)))
+
+        n = len(self.tables)
+        self._idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+        self._vocabulary_trigrams: dict[str, list[str]] = defaultdict(list)
+        for term in self._postings:
+            for gram in trigrams(term):
+                self._vocabulary_trigrams[gram].append(term)
+
+    @staticmethod
+    def _add_text(terms: Counter, text: str, weight: float) -> None:
+        for token in tokenize(text):
+            terms[token] += weight
+
+    def expand(self, token: str) -> list[tuple[str, float]]:
+        """Return catalog words similar to `token` with their trigram similarity."""
+        grams = trigrams(token)
+        shared: Counter = Counter()
+        for gram in grams:
+            for term in self._vocabulary_trigrams.get(gram, ()):
+                shared[term] += 1
+        similar = []
+        for term, count in shared.items():
+            similarity = count / (len(grams) + len(trigrams(term)) - count)
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                similar.append((term, similarity))
+        similar.sort(key=lambda item: -item[1])
+        return similar[:MAX_EXPANSIONS]
+
+    def search(self, query: str, k: int = 10) -> list[SearchHit]:
+        """Return the `k` tables that best match `query`, best first."""
+        query_terms: dict[str, float] = {}
+        for token in tokenize(query):
+            for term, similarity in self.expand(token):
+                query_terms[term] = max(query_terms.get(term, 0.0), similarity)
+
+        scores: dict[int, float] = defaultdict(float)
+        for term, similarity in query_terms.items():
+            weight = similarity * self._idf[term]
+            for doc_id, saturated_tf in self._postings[term]:
+                scores[doc_id] += weight * saturated_tf
+
+        ranked = heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], self.tables[item[0]].name))
+        hits = []
+        for doc_id, score in ranked:
+            table = self.tables[doc_id]
+            matched = [
+                column.name for column in table.columns
+                if any(token in query_terms for token in tokenize(column.name))
+            ]
+            hits.append(SearchHit(table, score, matched))
+        return hits
+
+
+def get_schema_index(db_connection: str) -> SchemaIndex:
+    """Return the index for `db_connection`, rebuilding it whenever the cached catalog is reloaded."""
+    return get_derived(db_connection, SchemaIndex)
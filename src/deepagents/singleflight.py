@@ -0,0 +1,70 @@
+import json
+import threading
+from typing import Any, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+def flight_key(db_connection: str, operation: str, *params: Any) -> tuple[str, str, str]:
+    """Build the coalescing key for a database call.
+
+    `operation` is a tool name or SQL text; runs of whitespace are collapsed so
+    differently formatted but identical SQL shares a key. Parameters are
+    compared by their JSON form.
+    """
+    normalized = " ".join(operation.split())
+    return db_connection, normalized, json.dumps(params, sort_keys=True, default=str)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls so only one of them does the work.
+
+    While a call for a key is in flight, further callers with the same key
+    wait for it and receive its result (or exception) instead of running
+    their own. Nothing is cached: once the call finishes, the next caller
+    starts a new one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Run `fn()`, or wait for the identical call already in flight in another thread."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,24 @@
+from contextlib import contextmanager
+from typing import Iterator
+
+from deepagents.db import get_pool
+
+
+@contextmanager
+def exported_snapshot(db_connection: str) -> Iterator[str]:
+    """Export a read-only snapshot of `db_connection` for the duration of the block.
+
+    Yields the snapshot identifier. The exporting `REPEATABLE READ READ ONLY`
+    transaction is held open on a dedicated connection until the block exits;
+    database tools running with the identifier as `db_snapshot` (in the state
+    or the run config's `configurable`) all read the data it sees.
+    """
+    with get_pool(db_connection).dedicated() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+            cursor.execute("SELECT pg_export_snapshot()")
+            yield cursor.fetchone()[0]
+        finally:
+            cursor.close()
+            conn.rollback()
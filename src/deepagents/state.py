@@ -1,5 +1,5 @@
 from langgraph.prebuilt.chat_agent_executor import AgentState
-from typing import NotRequired, Any
+from typing import Annotated, NotRequired, Any, Optional
 from typing import Literal
 from typing_extensions import TypedDict
 
@@ -9,8 +9,95 @@ class Todo(TypedDict):
 
     content: str
     status: Literal["pending", "in_progress", "completed"]
+    # Stable identifier, assigned when the todo is added.
+    id: NotRequired[str]
+
+
+class TodoOp(TypedDict):
+    """One change to the todo list: add a todo, or update or remove one by id."""
+
+    op: Literal["add", "update", "remove"]
+    id: NotRequired[str]
+    content: NotRequired[str]
+    status: NotRequired[Literal["pending", "in_progress", "completed"]]
+
+
+def _next_id(todos: list[Todo]) -> int:
+    return max((int(t["id"]) for t in todos if t.get("id", "").isdigit()), default=0) + 1
+
+
+def number_todos(todos: list[Todo]) -> list[Todo]:
+    """Return `todos` with an id given to each todo that has none."""
+    next_id = _next_id(todos)
+    numbered = []
+    for todo in todos:
+        if not todo.get("id"):
+            todo = {**todo, "id": str(next_id)}
+            next_id += 1
+        numbered.append(todo)
+    return numbered
+
+
+def apply_todo_ops(todos: list[Todo], ops: list[TodoOp], strict: bool = True) -> tuple[list[Todo], list[TodoOp]]:
+    """Apply `ops` to `todos`, returning the new list and the ops as applied (with ids assigned).
+
+    With `strict`, an op naming an unknown id or an invalid op raises
+    ValueError; otherwise it is skipped.
+    """
+    todos = number_todos(todos)
+    index = {todo["id"]: i for i, todo in enumerate(todos)}
+    next_id = _next_id(todos)
+    applied = []
+    for op in ops:
+        kind = op.get("op")
+        if kind == "add":
+            if "content" not in op:
+                if strict:
+                    raise ValueError("an 'add' op needs 'content'")
+                continue
+            todo_id = op.get("id")
+            if not todo_id or todo_id in index:
+                while str(next_id) in index:
+                    next_id += 1
+                todo_id = str(next_id)
+            todo = {"id": todo_id, "content": op["content"], "status": op.get("status", "pending")}
+            index[todo_id] = len(todos)
+            todos.append(todo)
+            applied.append({"op": "add", **todo})
+        elif kind in ("update", "remove"):
+            position = index.get(op.get("id"))
+            if position is None:
+                if strict:
+                    raise ValueError(f"no todo with id {op.get('id')!r}")
+                continue
+            if kind == "update":
+                changes = {k: op[k] for k in ("content", "status") if k in op}
+                todos[position] = {**todos[position], **changes}
+                applied.append({"op": "update", "id": op["id"], **changes})
+            else:
+                todos[position] = None
+                del index[op["id"]]
+                applied.append({"op": "remove", "id": op["id"]})
+        elif strict:
+            raise ValueError(f"unknown op {kind!r}; use 'add', 'update' or 'remove'")
+    return [todo for todo in todos if todo is not None], applied
+
+
+def todos_reducer(current: Optional[list[Todo]], update: list[Any]) -> list[Todo]:
+    """Merge an update into the `todos` channel.
+
+    A list of TodoOp dicts is applied as a patch; any other list (e.g. the
+    initial input) replaces the todos.
+    """
+    if update and all("op" in item for item in update):
+        return apply_todo_ops(current or [], update, strict=False)[0]
+    return number_todos(update or [])
 
 
 class DeepAgentState(AgentState):
-    todos: NotRequired[list[Todo]]
+    todos: Annotated[NotRequired[list[Todo]], todos_reducer]
     db_connection: NotRequired[Any]
+    # Name of the sub-agent running with this state; unset for the main agent.
+    subagent: NotRequired[str]
+    # Identifier of an exported snapshot every database call reads from.
+    db_snapshot: NotRequired[str]
@@ -0,0 +1,311 @@
+import sys
+import threading
+import tracemalloc
+import warnings
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage, RemoveMessage, ToolMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+# Steps and node allocations kept by a StateTracker, and sessions whose
+# high-water marks it remembers (least recently updated dropped first).
+MAX_TRACKED_STEPS = 10_000
+MAX_TRACKED_SESSIONS = 10_000
+# Source lines reported per node when allocation snapshots are taken.
+TOP_ALLOCATIONS = 10
+# Messages kept at the end of the history when it is compacted.
+COMPACT_KEEP_MESSAGES = 20
+
+# The serializer checkpointers store state with.
+_serde = JsonPlusSerializer()
+
+
+class StateSizeWarning(ResourceWarning):
+    """A state channel grew past its threshold."""
+
+
+class ChannelSize(NamedTuple):
+    """Size of one state channel."""
+
+    # Bytes as a checkpointer would store it; None when it cannot be serialized.
+    serialized: Optional[int]
+    # Bytes held in memory by the value and everything it references.
+    memory: int
+    # Length of lists and dicts, e.g. the number of messages.
+    items: Optional[int]
+
+
+class StateStep(NamedTuple):
+    """The state channels' sizes as one node started."""
+
+    session: str
+    agent: str
+    node: str
+    step: Optional[int]
+    channels: dict[str, ChannelSize]
+
+    @property
+    def serialized(self) -> int:
+        return sum(size.serialized or 0 for size in self.channels.values())
+
+    @property
+    def memory(self) -> int:
+        return sum(size.memory for size in self.channels.values())
+
+
+class NodeAllocation(NamedTuple):
+    """Memory allocated while one node ran, from tracemalloc."""
+
+    session: str
+    agent: str
+    node: str
+    # Change in traced memory from the node's start to its end.
+    delta: int
+    # Biggest changes by source line, as ("file:line", bytes); empty unless snapshots are taken.
+    top: list[tuple[str, int]]
+
+
+class StateSizeEvent(NamedTuple):
+    """A channel (or "total") that went over its threshold."""
+
+    session: str
+    agent: str
+    node: str
+    channel: str
+    size: int
+    threshold: int
+
+
+def deep_sizeof(value: Any) -> int:
+    """Bytes held by `value` and the objects it references, each counted once."""
+    seen = set()
+    total = 0
+    pending = [value]
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or isinstance(obj, (type, type(sys), type(deep_sizeof))):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            pending.extend(obj.keys())
+            pending.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            pending.extend(obj)
+        elif not isinstance(obj, (str, bytes, bytearray, int, float, bool)):
+            if hasattr(obj, "__dict__"):
+                pending.append(obj.__dict__)
+            for slot in getattr(type(obj), "__slots__", ()):
+                if hasattr(obj, slot):
+                    pending.append(getattr(obj, slot))
+    return total
+
+
+def serialized_size(value: Any) -> Optional[int]:
+    """Bytes of `value` as a checkpointer would store it, or None when it cannot be serialized."""
+    try:
+        return len(_serde.dumps_typed(value)[1])
+    except Exception:
+        return None
+
+
+def channel_sizes(state: dict) -> dict[str, ChannelSize]:
+    """Serialized and in-memory size of each channel of `state`."""
+    return {
+        channel: ChannelSize(
+            serialized_size(value),
+            deep_sizeof(value),
+            len(value) if isinstance(value, (list, dict)) else None,
+        )
+        for channel, value in state.items()
+    }
+
+
+class StateTracker(BaseCallbackHandler):
+    """Records how big each state channel is at every step, per session.
+
+    Pass it as a callback, e.g. `agent.invoke(inputs, config={"callbacks": [tracker]})`.
+    At the start of every graph node that receives the state (the model
+    call, in the main agent and sub-agents), each channel is measured both
+    serialized and in memory. `high_water` keeps the largest sizes seen per
+    session: the run config's `thread_id`, or the run itself.
+
+    `thresholds` maps channel names, or "total" for the whole state, to
+    serialized bytes. The first time a session's channel goes over its
+    threshold, `on_threshold` is called with a `StateSizeEvent`, or a
+    `StateSizeWarning` is issued when there is none.
+
+    With `trace_allocations`, tracemalloc (started if it is not already
+    running) records the memory each node allocates, and `allocation_top`
+    source lines per node are taken from snapshot diffs. Nodes running in
+    parallel share the process's counters, so their deltas overlap.
+
+    Measuring serializes the whole state, so it costs time in proportion to
+    the state's size at every step.
+    """
+
+    raise_error = False
+    run_inline = True
+
+    def __init__(
+        self,
+        thresholds: Optional[dict[str, int]] = None,
+        on_threshold: Optional[Callable[[StateSizeEvent], Any]] = None,
+        trace_allocations: bool = False,
+        allocation_top: int = TOP_ALLOCATIONS,
+    ):
+        self.thresholds = dict(thresholds or {})
+        self.on_threshold = on_threshold
+        self.trace_allocations = trace_allocations
+        self.allocation_top = allocation_top
+        self.steps: list[StateStep] = []
+        self.allocations: list[NodeAllocation] = []
+        self.high_water: "OrderedDict[str, dict[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Run id -> id of the run at the root of its tree, and nodes being traced.
+        self._roots: dict[Any, Any] = {}
+        self._nodes: dict[Any, tuple[str, str, str, int, Any]] = {}
+        self._crossed: set[tuple[str, str]] = set()
+        self._started_tracing = False
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def close(self) -> None:
+        """Stop tracemalloc if this tracker started it."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        metadata = metadata or {}
+        with self._lock:
+            root = self._roots[run_id] = self._roots.get(parent_run_id, run_id)
+        node = metadata.get("langgraph_node")
+        if not node or node != kwargs.get("name"):
+            return
+        session = str(metadata.get("thread_id") or root)
+        # Sub-agents run inside the main graph's tools node.
+        agent = "subagent" if "|" in metadata.get("langgraph_checkpoint_ns", "") else "main"
+        if isinstance(inputs, dict) and "messages" in inputs:
+            self._measure(StateStep(session, agent, node, metadata.get("langgraph_step"), channel_sizes(inputs)))
+        if self.trace_allocations and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot() if self.allocation_top else None
+            with self._lock:
+                self._nodes[run_id] = (session, agent, node, tracemalloc.get_traced_memory()[0], snapshot)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        # Sub-agents run inside the `task` tool, so it links them to the main run.
+        with self._lock:
+            self._roots[run_id] = self._roots.get(parent_run_id, run_id)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def _end(self, run_id) -> None:
+        with self._lock:
+            self._roots.pop(run_id, None)
+            traced = self._nodes.pop(run_id, None)
+        if traced is None or not tracemalloc.is_tracing():
+            return
+        session, agent, node, before, snapshot = traced
+        delta = tracemalloc.get_traced_memory()[0] - before
+        top = []
+        if snapshot is not None:
+            diff = tracemalloc.take_snapshot().compare_to(snapshot, "lineno")
+            top = [
+                (f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", stat.size_diff)
+                for stat in diff[: self.allocation_top]
+                if stat.size_diff
+            ]
+        with self._lock:
+            self.allocations.append(NodeAllocation(session, agent, node, delta, top))
+            del self.allocations[:-MAX_TRACKED_STEPS]
+
+    def _measure(self, step: StateStep) -> None:
+        sizes = {channel: size.serialized or 0 for channel, size in step.channels.items()}
+        sizes["total"] = step.serialized
+        crossed = []
+        with self._lock:
+            self.steps.append(step)
+            del self.steps[:-MAX_TRACKED_STEPS]
+            marks = self.high_water.pop(step.session, {})
+            for channel, size in sizes.items():
+                marks[channel] = max(marks.get(channel, 0), size)
+            marks["memory"] = max(marks.get("memory", 0), step.memory)
+            self.high_water[step.session] = marks
+            while len(self.high_water) > MAX_TRACKED_SESSIONS:
+                dropped, _ = self.high_water.popitem(last=False)
+                self._crossed = {key for key in self._crossed if key[0] != dropped}
+            for channel, threshold in self.thresholds.items():
+                size = sizes.get(channel, 0)
+                if size > threshold and (step.session, channel) not in self._crossed:
+                    self._crossed.add((step.session, channel))
+                    crossed.append(StateSizeEvent(step.session, step.agent, step.node, channel, size, threshold))
+        for event in crossed:
+            if self.on_threshold is not None:
+                self.on_threshold(event)
+            else:
+                warnings.warn(
+                    f"state channel {event.channel!r} of session {event.session} is {event.size} bytes, "
+                    f"over its threshold of {event.threshold}",
+                    StateSizeWarning,
+                    stacklevel=2,
+                )
+
+    def report(self, session: Optional[str] = None) -> str:
+        """The latest channel sizes and high-water marks of `session` (default: the latest one)."""
+        with self._lock:
+            steps = [step for step in self.steps if session is None or step.session == session]
+            if not steps:
+                return "No state measured."
+            latest = steps[-1]
+            marks = dict(self.high_water.get(latest.session, {}))
+        lines = [
+            f"Session {latest.session}: {len(steps)} step{'s' if len(steps) != 1 else ''}, "
+            f"latest at {latest.agent} {latest.node}",
+            f"{'channel':<20}  {'items':>6}  {'serialized':>12}  {'memory':>12}  {'high water':>12}",
+        ]
+        for channel, size in sorted(latest.channels.items(), key=lambda item: -(item[1].serialized or 0)):
+            serialized = "n/a" if size.serialized is None else str(size.serialized)
+            items = "" if size.items is None else str(size.items)
+            lines.append(
+                f"{channel:<20}  {items:>6}  {serialized:>12}  {size.memory:>12}  {marks.get(channel, 0):>12}"
+            )
+        lines.append(
+            f"{'total':<20}  {'':>6}  {latest.serialized:>12}  {latest.memory:>12}  {marks.get('total', 0):>12}"
+        )
+        return "\n".join(lines)
+
+
+def message_compactor(max_bytes: int, keep: int = COMPACT_KEEP_MESSAGES) -> Callable[[dict], dict]:
+    """A `pre_model_hook` that drops old messages once they serialize to more than `max_bytes`.
+
+    The first message (the task) and the last `keep` messages are kept; the
+    kept tail is extended back to the model call of any tool results it
+    starts with.
+    """
+
+    def compact_messages(state: dict) -> dict:
+        messages = state["messages"]
+        if len(messages) <= keep + 1 or (serialized_size(messages) or 0) <= max_bytes:
+            return {}
+        start = len(messages) - keep
+        while start > 1 and isinstance(messages[start], ToolMessage):
+            start -= 1
+        kept: list[BaseMessage] = [messages[0], *messages[start:]]
+        return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *kept]}
+
+    return compact_messages
@@ -1,26 +1,56 @@
-from deepagents.prompts import TASK_DESCRIPTION_PREFIX, TASK_DESCRIPTION_SUFFIX
+import asyncio
+
+from deepagents.prompts import TASK_DESCRIPTION_PREFIX, TASK_DESCRIPTION_SUFFIX, TASK_DESCRIPTION_SUFFIX_COMPACT
+from deepagents.reports import MAX_OUTPUT_CHARS, condense_report
 from deepagents.state import DeepAgentState
+from deepagents.tools import _progress_writer, _run_config
+from deepagents.tool_slots import limited_tool_node
 from langgraph.prebuilt import create_react_agent
 from langchain_core.tools import BaseTool
 from typing import TypedDict
-from langchain_core.tools import tool, InjectedToolCallId
-from langchain_core.messages import ToolMessage
-from typing import Annotated, NotRequired
+from langchain_core.tools import tool, InjectedToolCallId, StructuredTool
+from langchain_core.messages import AIMessage, ToolMessage
+from typing import Annotated, Iterator, NotRequired
 from langgraph.types import Command
 
 from langgraph.prebuilt import InjectedState
 
+# Sub-agent stream modes forwarded to the main agent's custom stream; "values"
+# carries the sub-agent's final state.
+SUBAGENT_STREAM_MODES = ["messages", "updates", "values"]
+
 
 class SubAgent(TypedDict):
     name: str
     description: str
     prompt: str
     tools: NotRequired[list[str]]
+    # Longest final message passed back verbatim; longer ones are condensed.
+    max_output_chars: NotRequired[int]
+
+
+def _task_description(subagents: list[SubAgent], compact: bool = False) -> str:
+    other_agents_string = [
+        f"- {_agent['name']}: {_agent['description']}" for _agent in subagents
+    ]
+    suffix = TASK_DESCRIPTION_SUFFIX_COMPACT if compact else TASK_DESCRIPTION_SUFFIX
+    return TASK_DESCRIPTION_PREFIX.format(other_agents=other_agents_string) + suffix
 
 
-def _create_task_tool(tools, instructions, subagents: list[SubAgent], model, state_schema):
+def _create_task_tool(
+    tools,
+    instructions,
+    subagents: list[SubAgent],
+    model,
+    state_schema,
+    compact: bool = False,
+    max_output_chars: int = MAX_OUTPUT_CHARS,
+    summarizer=None,
+):
     agents = {
-        "general-purpose": create_react_agent(model, prompt=instructions, tools=tools)
+        "general-purpose": create_react_agent(
+            model, prompt=instructions, tools=limited_tool_node(tools), state_schema=state_schema
+        )
     }
     tools_by_name = {}
     for tool_ in tools:
@@ -33,17 +63,38 @@ def _create_task_tool(tools, instructions, subagents: list[SubAgent], model, sta
         else:
             _tools = tools
         agents[_agent["name"]] = create_react_agent(
-            model, prompt=_agent["prompt"], tools=_tools, state_schema=state_schema
+            model, prompt=_agent["prompt"], tools=limited_tool_node(_tools), state_schema=state_schema
         )
 
-    other_agents_string = [
-        f"- {_agent['name']}: {_agent['description']}" for _agent in subagents
-    ]
+    output_budgets = {
+        _agent["name"]: _agent["max_output_chars"] for _agent in subagents if "max_output_chars" in _agent
+    }
+
+    def start(description, subagent_type, state):
+        # A copy: the main agent's own state stays untouched.
+        sub_state = {
+            **state,
+            "messages": [{"role": "user", "content": description}],
+            # Tools use this to run the sub-agent's database calls at background priority.
+            "subagent": subagent_type,
+        }
+        return agents[subagent_type], sub_state
+
+    def finish(result, subagent_type, tool_call_id):
+        # The report stays in the main agent's context for the rest of the run,
+        # so oversized ones are condensed and kept in full behind a handle.
+        content = result["messages"][-1].content
+        if isinstance(content, str):
+            content = condense_report(content, output_budgets.get(subagent_type, max_output_chars), summarizer)
+        return Command(
+            update={
+                "files": result.get("files", {}),
+                "messages": [
+                    ToolMessage(content, tool_call_id=tool_call_id)
+                ],
+            }
+        )
 
-    @tool(
-        description=TASK_DESCRIPTION_PREFIX.format(other_agents=other_agents_string)
-        + TASK_DESCRIPTION_SUFFIX
-    )
     def task(
         description: str,
         subagent_type: str,
@@ -52,18 +103,98 @@ def _create_task_tool(tools, instructions, subagents: list[SubAgent], model, sta
     ):
         if subagent_type not in agents:
             return f"Error: invoked agent of type {subagent_type}, the only allowed types are {[f'`{k}`' for k in agents]}"
-        sub_agent = agents[subagent_type]
-        state["messages"] = [{"role": "user", "content": description}]
-        result = sub_agent.invoke(state)
-        return Command(
-            update={
-                "files": result.get("files", {}),
-                "messages": [
-                    ToolMessage(
-                        result["messages"][-1].content, tool_call_id=tool_call_id
-                    )
-                ],
-            }
-        )
+        sub_agent, sub_state = start(description, subagent_type, state)
+        writer = _subagent_writer()
+        if writer is None:
+            result = sub_agent.invoke(sub_state)
+        else:
+            # Forward the sub-agent's progress to the caller's custom stream
+            # while it runs, instead of going silent until it finishes.
+            result = sub_state
+            events = _SubagentEvents(subagent_type, tool_call_id)
+            for mode, chunk in sub_agent.stream(sub_state, stream_mode=SUBAGENT_STREAM_MODES):
+                if mode == "values":
+                    result = chunk
+                for event in events(mode, chunk):
+                    writer(event)
+        return finish(result, subagent_type, tool_call_id)
+
+    async def atask(
+        description: str,
+        subagent_type: str,
+        state: Annotated[DeepAgentState, InjectedState],
+        tool_call_id: Annotated[str, InjectedToolCallId],
+    ):
+        if subagent_type not in agents:
+            return f"Error: invoked agent of type {subagent_type}, the only allowed types are {[f'`{k}`' for k in agents]}"
+        sub_agent, sub_state = start(description, subagent_type, state)
+        writer = _subagent_writer()
+        if writer is None:
+            result = await sub_agent.ainvoke(sub_state)
+        else:
+            result = sub_state
+            events = _SubagentEvents(subagent_type, tool_call_id)
+            async for mode, chunk in sub_agent.astream(sub_state, stream_mode=SUBAGENT_STREAM_MODES):
+                if mode == "values":
+                    result = chunk
+                for event in events(mode, chunk):
+                    writer(event)
+        return await asyncio.to_thread(finish, result, subagent_type, tool_call_id)
+
+    return StructuredTool.from_function(
+        func=task,
+        coroutine=atask,
+        name="task",
+        description=_task_description(subagents, compact),
+    )
+
+
+def _subagent_writer():
+    """The custom stream writer to forward sub-agent progress to, or None unless the run streams `custom` events.
+
+    Inside a run LangGraph always has a writer, a no-op one when nobody
+    reads the custom stream; streaming the sub-agent then would only cost.
+    """
+    if not _run_config().get("custom_stream"):
+        return None
+    return _progress_writer()
+
+
+class _SubagentEvents:
+    """Translates a sub-agent's stream into events for the main agent's custom stream.
+
+    Every event carries the sub-agent's name and the id of the task call
+    that started it: "token" events carry model output as it is generated,
+    "tool_call" and "tool_result" events the sub-agent's tool use, and
+    "todos" events its whole todo list (as in the `todos` state channel,
+    not the ops a `write_todos` call sent) each time it changes.
+    """
+
+    def __init__(self, subagent_type: str, task_id: str):
+        self.tag = {"subagent": subagent_type, "task_id": task_id}
+        # The todo list of the last "values" chunk; the first is the sub-agent's input.
+        self.todos = None
+        self.started = False
 
-    return task
+    def __call__(self, mode: str, chunk) -> Iterator[dict]:
+        tag = self.tag
+        if mode == "messages":
+            message, _ = chunk
+            if isinstance(message, AIMessage) and isinstance(message.content, str) and message.content:
+                yield {**tag, "event": "token", "content": message.content}
+        elif mode == "updates":
+            for update in chunk.values():
+                for values in update if isinstance(update, list) else [update]:
+                    if not isinstance(values, dict):
+                        continue
+                    for message in values.get("messages", []):
+                        if isinstance(message, AIMessage):
+                            for call in message.tool_calls:
+                                yield {**tag, "event": "tool_call", "name": call["name"], "args": call["args"], "id": call["id"]}
+                        elif isinstance(message, ToolMessage):
+                            yield {**tag, "event": "tool_result", "name": message.name, "id": message.tool_call_id}
+        elif mode == "values":
+            todos = chunk.get("todos")
+            if self.started and todos != self.todos:
+                yield {**tag, "event": "todos", "todos": todos}
+            self.todos, self.started = todos, True
@@ -0,0 +1,451 @@
+import itertools
+import math
+import random
+import statistics
+from collections import Counter
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterable, NamedTuple, Optional, Sequence
+
+from deepagents.columnar import truncate
+from deepagents.formatting import _encode_json
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; statistics fall back to pure Python.
+    np = None
+
+# Up to this many non-NULL values per column, quantiles and distinct counts
+# are exact. Beyond it, quantiles come from a uniform sample and distinct
+# counts from a HyperLogLog sketch.
+EXACT_LIMIT = 50_000
+QUANTILE_SAMPLE_SIZE = 20_000
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+TOP_VALUES = 5
+# Rows fetched per round trip when summarizing a query result.
+FETCH_CHUNK_ROWS = 10_000
+
+
+class ColumnSummary(NamedTuple):
+    name: str
+    kind: str  # "numeric", "temporal", "boolean", "text" or "mixed"
+    count: int
+    nulls: int
+    distinct: int
+    distinct_is_estimate: bool
+    stats: dict[str, Any]
+    top_values: list[tuple[Any, int]]
+    # True when top value counts are scaled up from a sample.
+    top_is_estimate: bool = False
+
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(x: int) -> int:
+    """The splitmix64 finalizer: spreads integer hashes over all 64 bits."""
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EB & _MASK64
+    return x ^ (x >> 31)
+
+
+class HyperLogLog:
+    """A HyperLogLog distinct-count sketch with 2**p registers (~1.6% error at p=12)."""
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8) if np is not None else [0] * self.m
+
+    def add_hashes(self, hashes) -> None:
+        """Add 64-bit hashes, as a NumPy uint64 array or an iterable of ints."""
+        p = self.p
+        if np is not None and isinstance(hashes, np.ndarray):
+            # Vectorized splitmix64; uint64 arithmetic wraps like the scalar version.
+            x = hashes.astype(np.uint64)
+            x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            x = x ^ (x >> np.uint64(31))
+            index = (x >> np.uint64(64 - p)).astype(np.intp)
+            rest = (x << np.uint64(p)) | np.uint64(1 << (p - 1))
+            # Count leading zeros of `rest` by binary search over the bit width.
+            rho = np.ones(len(rest), dtype=np.uint8)
+            for shift in (32, 16, 8, 4, 2, 1):
+                high_clear = rest < np.uint64(1 << (64 - shift))
+                rho += high_clear.astype(np.uint8) * np.uint8(shift)
+                rest = np.where(high_clear, rest << np.uint64(shift), rest)
+            np.maximum.at(self.registers, index, rho)
+            return
+        registers = self.registers
+        for h in hashes:
+            x = _mix64(h & _MASK64)
+            index = x >> (64 - p)
+            rest = ((x << p) & _MASK64) | (1 << (p - 1))
+            rho = 65 - rest.bit_length()
+            if rho > registers[index]:
+                registers[index] = rho
+
+    def estimate(self) -> int:
+        m = self.m
+        registers = self.registers.tolist() if np is not None else self.registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / math.fsum(2.0 ** -r for r in registers)
+        zeros = registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities.
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+
+def _value_hashes(values):
+    """64-bit hashes of `values`, as a NumPy uint64 array when NumPy is installed."""
+    if np is None:
+        return [hash(v) for v in values]
+    if isinstance(values, np.ndarray) and values.dtype.kind in "iufbM":
+        if values.dtype.kind == "f":
+            # Hash the float64 bit pattern; adding 0.0 turns -0.0 into 0.0.
+            return (values.astype(np.float64) + 0.0).view(np.uint64)
+        return values.astype(np.int64).view(np.uint64)
+    return np.fromiter((hash(v) for v in values), dtype=np.int64, count=len(values)).view(np.uint64)
+
+
+def _numeric_stats(values) -> dict[str, Any]:
+    n = len(values)
+    if np is not None:
+        array = np.asarray(values, dtype=np.float64)
+        sample = array
+        if n > EXACT_LIMIT:
+            sample = np.random.default_rng(0).choice(array, QUANTILE_SAMPLE_SIZE, replace=False)
+        stats = {
+            "min": array.min().item(),
+            "max": array.max().item(),
+            "mean": array.mean().item(),
+            "std": array.std().item(),
+        }
+        for q, value in zip(QUANTILES, np.quantile(sample, QUANTILES).tolist()):
+            stats[f"p{round(q * 100)}"] = value
+        return stats
+
+    floats = [float(v) for v in values]
+    sample = floats if n <= EXACT_LIMIT else random.Random(0).sample(floats, QUANTILE_SAMPLE_SIZE)
+    sample.sort()
+    stats = {
+        "min": min(floats),
+        "max": max(floats),
+        "mean": math.fsum(floats) / n,
+        "std": statistics.pstdev(floats) if n > 1 else 0.0,
+    }
+    for q in QUANTILES:
+        # Linear interpolation between closest ranks, as numpy.quantile does.
+        position = q * (len(sample) - 1)
+        lower = math.floor(position)
+        upper = min(lower + 1, len(sample) - 1)
+        stats[f"p{round(q * 100)}"] = sample[lower] + (sample[upper] - sample[lower]) * (position - lower)
+    return stats
+
+
+def _value_kind(value_type: type) -> str:
+    if issubclass(value_type, bool):
+        return "boolean"
+    if issubclass(value_type, (int, float, Decimal)):
+        return "numeric"
+    if issubclass(value_type, (date, datetime)):
+        return "temporal"
+    # psycopg2 decodes JSON objects and arrays (and Postgres arrays) to these.
+    if issubclass(value_type, dict):
+        return "object"
+    if issubclass(value_type, list):
+        return "array"
+    return "text"
+
+
+def _kind_counts(values) -> Counter:
+    """How many of the non-NULL `values` are of each kind."""
+    if np is not None and isinstance(values, np.ndarray) and values.dtype != object:
+        return Counter({{"b": "boolean", "M": "temporal"}.get(values.dtype.kind, "numeric"): len(values)})
+    kinds: Counter = Counter()
+    for value_type, count in Counter(map(type, values)).items():
+        kinds[_value_kind(value_type)] += count
+    return kinds
+
+
+def _kind(kinds: Counter) -> str:
+    """The column kind for values of `kinds`; JSON values of one kind are summarized by their text."""
+    if len(kinds) > 1:
+        # E.g. a JSON column holding objects, arrays and scalars.
+        return "mixed"
+    kind = next(iter(kinds), "text")
+    return "text" if kind in ("object", "array") else kind
+
+
+def summarize_column(name: str, values, nulls=None) -> ColumnSummary:
+    """Summarize one column given its values and an optional NULL mask.
+
+    Without a mask, `None` entries are treated as NULLs.
+    """
+    summarizer = ColumnSummarizer(name)
+    summarizer.add(values, nulls)
+    return summarizer.summary()
+
+
+def summarize_chunks(column_names: list[str], chunks: Iterable[Sequence[Sequence[Any]]]) -> tuple[list[ColumnSummary], int]:
+    """Summarize a result arriving as chunks of row tuples, e.g. from `fetchmany`.
+
+    Returns the column summaries and the row count. Memory stays bounded by
+    the chunk size and the sketch sizes, however many rows there are.
+    """
+    summarizers = [ColumnSummarizer(name) for name in column_names]
+    row_count = 0
+    for rows in chunks:
+        row_count += len(rows)
+        for summarizer, column in zip(summarizers, zip(*rows)):
+            summarizer.add(column)
+    return [summarizer.summary() for summarizer in summarizers], row_count
+
+
+class ColumnSummarizer:
+    """Summarizes one column chunk by chunk.
+
+    Up to EXACT_LIMIT non-NULL values are kept and summarized exactly. Past
+    that the values are dropped: distinct counts come from a HyperLogLog
+    sketch, quantiles from a uniform reservoir sample, and top values from
+    exact counts while there are at most EXACT_LIMIT different values (from
+    the sample after that). Min, max, mean and std stay exact.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.total = 0
+        self.kind: Optional[str] = None
+        self.kinds: Counter = Counter()
+        self._seen = 0
+        self._chunks: Optional[list] = []  # None once past EXACT_LIMIT
+        self._sketch: Optional[HyperLogLog] = None
+        self._sample: list = []
+        self._counts: Optional[Counter] = None
+        self._rng = np.random.default_rng(0) if np is not None else random.Random(0)
+        # Numeric columns: count, mean, sum of squared deviations (Chan et al.).
+        self._moments = (0, 0.0, 0.0)
+        self._min = self._max = None
+
+    def add(self, values, nulls=None) -> None:
+        """Add a chunk of values, with an optional NULL mask (else `None` is NULL)."""
+        self.total += len(values)
+        if nulls is not None:
+            if np is not None and isinstance(values, np.ndarray):
+                values = values[~np.asarray(nulls, dtype=bool)]
+            else:
+                values = [v for v, is_null in zip(values, nulls) if not is_null]
+        elif not (np is not None and isinstance(values, np.ndarray) and values.dtype != object):
+            values = [v for v in values if v is not None]
+        if not len(values):
+            return
+        self.kinds.update(_kind_counts(values))
+        kind = _kind(self.kinds)
+        if kind == "mixed" and self.kind not in (None, "mixed"):
+            # A value of another kind: numeric and temporal statistics stop.
+            self._to_mixed()
+        self.kind = kind
+        if self.kind == "mixed":
+            # By JSON text, so that e.g. true, 1 and "1" stay different values.
+            values = [_encode_json(v) for v in values]
+        elif self.kind == "text":
+            # JSON and array values are counted by their text form.
+            values = [_encode_json(v) if isinstance(v, (dict, list)) else v for v in values]
+        start = self._seen
+        self._seen += len(values)
+        if self._chunks is not None:
+            self._chunks.append(values)
+            if self._seen > EXACT_LIMIT:
+                # Past the limit: sketch what was kept and stop keeping values.
+                buffered = _concat(self._chunks)
+                self._chunks = None
+                self._sketch = HyperLogLog()
+                picked = random.Random(0).sample(range(len(buffered)), QUANTILE_SAMPLE_SIZE)
+                self._sample = [buffered[i] for i in picked]
+                if self.kind != "numeric":
+                    self._counts = Counter()
+                self._add_sketched(buffered)
+            return
+        self._resample(values, start)
+        self._add_sketched(values)
+
+    def _add_sketched(self, values) -> None:
+        self._sketch.add_hashes(_value_hashes(values))
+        if self._counts is not None:
+            self._counts.update(_as_list(values))
+            if len(self._counts) > EXACT_LIMIT:
+                self._counts = None
+        if self.kind == "numeric":
+            self._merge_moments(values)
+        elif self.kind == "temporal":
+            low, high = (values.min(), values.max()) if np is not None and isinstance(values, np.ndarray) else (min(values), max(values))
+            self._min = low if self._min is None else min(self._min, low)
+            self._max = high if self._max is None else max(self._max, high)
+
+    def _resample(self, values, start: int) -> None:
+        # Reservoir sampling (Algorithm R): value number j replaces a random
+        # sample slot with probability size/(j + 1).
+        size = len(self._sample)
+        if np is not None:
+            slots = (self._rng.random(len(values)) * np.arange(start + 1, start + len(values) + 1)).astype(np.int64)
+            for i in np.flatnonzero(slots < size).tolist():
+                self._sample[slots[i]] = values[i]
+            return
+        for j, value in enumerate(values, start):
+            slot = self._rng.randrange(j + 1)
+            if slot < size:
+                self._sample[slot] = value
+
+    def _merge_moments(self, values) -> None:
+        if np is not None:
+            array = np.asarray(values, dtype=np.float64)
+            n, mean = len(array), array.mean().item()
+            m2 = ((array - mean) ** 2).sum().item()
+            low, high = array.min().item(), array.max().item()
+        else:
+            floats = [float(v) for v in values]
+            n = len(floats)
+            mean = math.fsum(floats) / n
+            m2 = math.fsum((v - mean) ** 2 for v in floats)
+            low, high = min(floats), max(floats)
+        count, total_mean, total_m2 = self._moments
+        merged = count + n
+        delta = mean - total_mean
+        self._moments = (
+            merged,
+            total_mean + delta * n / merged,
+            total_m2 + m2 + delta * delta * count * n / merged,
+        )
+        self._min = low if self._min is None else min(self._min, low)
+        self._max = high if self._max is None else max(self._max, high)
+
+    def summary(self) -> ColumnSummary:
+        if self._chunks is not None:
+            summary = _summarize_non_null(self.name, _concat(self._chunks), self.total, self.kind)
+            return summary._replace(stats=self._kind_stats()) if self.kind == "mixed" else summary
+        n = self._seen
+        distinct = min(self._sketch.estimate(), n)
+        stats: dict[str, Any] = {}
+        top_values: list[tuple[Any, int]] = []
+        top_is_estimate = False
+        if self.kind == "numeric":
+            count, mean, m2 = self._moments
+            stats = _numeric_stats(self._sample)
+            stats.update({"min": self._min, "max": self._max, "mean": mean, "std": math.sqrt(m2 / count)})
+        else:
+            if self.kind == "mixed":
+                stats = self._kind_stats()
+            if self.kind == "temporal":
+                stats = {"min": _temporal_text(self._min), "max": _temporal_text(self._max)}
+            if distinct < n:
+                counts = self._counts
+                if counts is None:
+                    counts = Counter(self._sample)
+                    top_is_estimate = True
+                top_values = [
+                    (value, round(count * n / len(self._sample)) if top_is_estimate else count)
+                    for value, count in counts.most_common(TOP_VALUES)
+                    if count > 1
+                ]
+        return ColumnSummary(self.name, self.kind, self.total, self.total - n, distinct, True, stats,
+                             top_values, top_is_estimate)
+
+
+    def _to_mixed(self) -> None:
+        # Values kept so far become JSON text like the ones that follow; the
+        # distinct count sketch keeps the hashes it already has.
+        if self._chunks is not None:
+            self._chunks = [[_encode_json(v) for v in _as_list(chunk)] for chunk in self._chunks]
+            return
+        self._sample = [_encode_json(v) for v in _as_list(self._sample)]
+        if self._counts is not None:
+            counts = Counter()
+            for value, count in self._counts.items():
+                counts[_encode_json(value)] += count
+            self._counts = counts
+
+    def _kind_stats(self) -> dict[str, Any]:
+        return {"kinds": dict(self.kinds.most_common())}
+
+
+def _concat(chunks: list):
+    if np is not None and chunks and all(isinstance(chunk, np.ndarray) for chunk in chunks):
+        return np.concatenate(chunks)
+    return list(itertools.chain.from_iterable(chunks))
+
+
+def _as_list(values) -> list:
+    return values.tolist() if np is not None and isinstance(values, np.ndarray) else list(values)
+
+
+def _temporal_text(value):
+    if np is not None and isinstance(value, np.datetime64):
+        return str(value).replace("T", " ")
+    return value
+
+
+def _summarize_non_null(name: str, values, total: int, kind: Optional[str]) -> ColumnSummary:
+    n = len(values)
+    kind = kind or "text"
+    stats: dict[str, Any] = {}
+    top_values: list[tuple[Any, int]] = []
+
+    # Callers keep at most EXACT_LIMIT values, so everything here is exact.
+    if np is not None and isinstance(values, np.ndarray) and values.dtype != object:
+        distinct = len(np.unique(values))
+    else:
+        distinct = len(set(values))
+
+    if n and kind == "numeric":
+        stats = _numeric_stats(values)
+    elif n and kind == "temporal":
+        if np is not None and isinstance(values, np.ndarray) and values.dtype.kind == "M":
+            stats = {"min": str(values.min()).replace("T", " "), "max": str(values.max()).replace("T", " ")}
+        else:
+            stats = {"min": min(values), "max": max(values)}
+    if n and kind != "numeric" and distinct < n:
+        if np is not None and isinstance(values, np.ndarray):
+            values = values.tolist()
+        top_values = [(value, count) for value, count in Counter(values).most_common(TOP_VALUES) if count > 1]
+    return ColumnSummary(name, kind, total, total - n, distinct, False, stats, top_values)
+
+
+def _format_number(value: float) -> str:
+    if math.isfinite(value) and value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return f"{value:.6g}"
+
+
+def format_summary(summaries: list[ColumnSummary], row_count: int) -> str:
+    """Render column summaries compactly, one line per column."""
+    lines = [f"Summary of {row_count:,} rows x {len(summaries)} columns:"]
+    for summary in summaries:
+        distinct = f"{'~' if summary.distinct_is_estimate else ''}{summary.distinct:,}"
+        parts = [f"nulls {summary.nulls:,}", f"distinct {distinct}"]
+        if summary.kind == "numeric" and summary.stats:
+            stats = summary.stats
+            parts.append(f"min {_format_number(stats['min'])}")
+            parts.append(f"max {_format_number(stats['max'])}")
+            parts.append(f"mean {_format_number(stats['mean'])}")
+            parts.append(f"std {_format_number(stats['std'])}")
+            approx = "~" if summary.count - summary.nulls > EXACT_LIMIT else ""
+            quantiles = "/".join(_format_number(stats[f"p{round(q * 100)}"]) for q in QUANTILES)
+            parts.append(f"p5/p25/p50/p75/p95 {approx}{quantiles}")
+        elif summary.kind == "temporal" and summary.stats:
+            parts.append(f"min {summary.stats['min']}")
+            parts.append(f"max {summary.stats['max']}")
+        elif summary.kind == "mixed" and summary.stats:
+            parts.append("kinds " + ", ".join(f"{kind} {count:,}" for kind, count in summary.stats["kinds"].items()))
+        if summary.top_values:
+            approx = "~" if summary.top_is_estimate else ""
+            top = ", ".join(f"{_short(value)} ({approx}{count:,})" for value, count in summary.top_values)
+            parts.append(f"top: {top}")
+        elif summary.kind != "numeric" and 0 < summary.distinct == summary.count - summary.nulls:
+            parts.append("all values distinct")
+        lines.append(f"- {summary.name} ({summary.kind}): {', '.join(parts)}")
+    return "\n".join(lines)
+
+
+def _short(value: Any, width: int = 40) -> str:
+    return truncate(str(value), width)
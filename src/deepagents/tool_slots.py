@@ -0,0 +1,57 @@
+import asyncio
+import threading
+from typing import Optional
+
+from langgraph.prebuilt import ToolNode
+
+# Tool calls that wait on other tool calls (a sub-agent's) instead of doing work themselves.
+UNCOUNTED_TOOLS = frozenset({"task"})
+
+
+class ToolSlots:
+    """Lets at most `limit` tool calls of one run work at once, counting those of its sub-agents.
+
+    One instance is shared by a run and every sub-agent it starts, through
+    the run config's `configurable["tool_slots"]`. Sync runs wait on a
+    thread semaphore and async runs on an asyncio one, created in the run's
+    event loop on first use.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.threads = threading.BoundedSemaphore(limit)
+        self._tasks: Optional[asyncio.Semaphore] = None
+
+    @property
+    def tasks(self) -> asyncio.Semaphore:
+        if self._tasks is None:
+            self._tasks = asyncio.Semaphore(self.limit)
+        return self._tasks
+
+
+def _slots(request) -> Optional[ToolSlots]:
+    if request.tool_call["name"] in UNCOUNTED_TOOLS:
+        return None
+    config = request.runtime.config if request.runtime is not None else None
+    return ((config or {}).get("configurable") or {}).get("tool_slots")
+
+
+def _limited(request, execute):
+    slots = _slots(request)
+    if slots is None:
+        return execute(request)
+    with slots.threads:
+        return execute(request)
+
+
+async def _alimited(request, execute):
+    slots = _slots(request)
+    if slots is None:
+        return await execute(request)
+    async with slots.tasks:
+        return await execute(request)
+
+
+def limited_tool_node(tools) -> ToolNode:
+    """A `ToolNode` whose calls take a slot of the run's `ToolSlots`, when it has any."""
+    return ToolNode(tools, wrap_tool_call=_limited, awrap_tool_call=_alimited)
@@ -1,34 +1,175 @@
 from langchain_core.tools import tool, InjectedToolCallId
 from langgraph.types import Command
 from langchain_core.messages import ToolMessage
-from typing import Annotated, Any
+from typing import Annotated, Any, Callable, Optional
 from langgraph.prebuilt import InjectedState
 import psycopg2
 import asyncpg
 import asyncio
+import itertools
+import os
+import time
+from datetime import datetime, timezone
 from contextlib import asynccontextmanager
 
+from langchain_core.runnables import ensure_config
+
+try:
+    from langgraph.config import get_stream_writer
+except ImportError:  # Older langgraph releases have no custom stream channel.
+    get_stream_writer = None
+
 from deepagents.prompts import (
     WRITE_TODOS_DESCRIPTION,
     POSTGRES_QUERY_DESCRIPTION,
     POSTGRES_SCHEMA_DESCRIPTION,
     POSTGRES_ANALYZE_DESCRIPTION,
+    POSTGRES_FETCH_PAGE_DESCRIPTION,
+    POSTGRES_SEARCH_SCHEMA_DESCRIPTION,
+    POSTGRES_JOIN_PATH_DESCRIPTION,
+    POSTGRES_EXPORT_DESCRIPTION,
+    READ_SUBAGENT_RESULT_DESCRIPTION,
+    POSTGRES_INDEX_ADVICE_DESCRIPTION,
 )
-from deepagents.state import Todo, DeepAgentState
+from deepagents.state import Todo, TodoOp, DeepAgentState, apply_todo_ops, number_todos
+from deepagents.result_store import result_store
+from deepagents.reports import MAX_OUTPUT_CHARS, report_store
+from deepagents.columnar import fetch_columnar, format_columns, truncate, UnsupportedColumnType
+from deepagents.summary import FETCH_CHUNK_ROWS, summarize_chunks, format_summary
+from deepagents.formatting import Formatter, column_formatter, column_formatters, format_table
+from deepagents.db import get_pool
+from deepagents.admission import INTERACTIVE, BACKGROUND
+from deepagents.singleflight import single_flight, flight_key
+from deepagents.export import EXPORT_FORMATS, export_csv, export_parquet, format_export, resolve_export_path
+from deepagents.schema_index import get_schema_index
+from deepagents.join_graph import get_join_graph, format_join_path
+from deepagents.profile_store import profile_store, database_identity, staleness_signature
+from deepagents.workload import read_workload, workload_log
+from deepagents.catalog import get_catalog
+from deepagents.index_advice import Statement, advise_indexes, explainable, format_index_advice, statements_from_workload
 
 
 @tool(description=WRITE_TODOS_DESCRIPTION)
 def write_todos(
-    todos: list[Todo], tool_call_id: Annotated[str, InjectedToolCallId]
+    state: Annotated[DeepAgentState, InjectedState],
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    todos: Optional[list[Todo]] = None,
+    ops: Optional[list[TodoOp]] = None,
 ) -> Command:
-    return Command(
-        update={
-            "todos": todos,
-            "messages": [
-                ToolMessage(f"Updated todo list to {todos}", tool_call_id=tool_call_id)
-            ],
-        }
-    )
+    if todos is not None and ops is not None:
+        return _todo_error("Error: Pass either `todos` (the whole list) or `ops` (changes to it), not both.", tool_call_id)
+    if todos is None and ops is None:
+        return _todo_error("Error: Pass `todos` (the whole list) or `ops` (changes to it).", tool_call_id)
+    if ops is not None:
+        # Only the ops travel through the `todos` channel; its reducer applies
+        # them to the current list. An empty list of ops changes nothing.
+        try:
+            updated, applied = apply_todo_ops(state.get("todos") or [], ops)
+        except ValueError as e:
+            return _todo_error(f"Error: {str(e)}", tool_call_id)
+        update, message = applied, _describe_todo_ops(applied, updated)
+    else:
+        update = number_todos(todos)
+        ids = ", ".join(f"#{todo['id']}" for todo in update)
+        message = f"Todo list set: {ids or 'empty'}. {_count_todos(update)}"
+    messages = [ToolMessage(message, tool_call_id=tool_call_id)]
+    if ops is not None and not update:
+        # An empty list would reach the reducer as a replacement, not a patch.
+        return Command(update={"messages": messages})
+    return Command(update={"todos": update, "messages": messages})
+
+
+def _todo_error(message: str, tool_call_id: str) -> Command:
+    """Answer a rejected write_todos call without touching the `todos` channel."""
+    return Command(update={"messages": [ToolMessage(message, tool_call_id=tool_call_id, status="error")]})
+
+
+def _count_todos(todos: list[Todo]) -> str:
+    counts = {status: 0 for status in ("pending", "in_progress", "completed")}
+    for todo in todos:
+        counts[todo["status"]] = counts.get(todo["status"], 0) + 1
+    return "Now " + ", ".join(f"{n} {status}" for status, n in counts.items()) + "."
+
+
+def _describe_todo_ops(applied: list[TodoOp], todos: list[Todo]) -> str:
+    """A one-line acknowledgement of applied todo ops, instead of echoing the whole list."""
+    changes = []
+    for op in applied:
+        if op["op"] == "add":
+            content = truncate(op["content"], 60)
+            changes.append(f"added #{op['id']} {content!r}")
+        elif op["op"] == "update":
+            fields = [op["status"]] if "status" in op else []
+            if "content" in op:
+                fields.append("content changed")
+            changes.append(f"#{op['id']} -> {', '.join(fields) or 'unchanged'}")
+        else:
+            changes.append(f"removed #{op['id']}")
+    return f"Todos updated: {'; '.join(changes) or 'no changes'}. {_count_todos(todos)}"
+
+
+def _run_config() -> dict:
+    """The `configurable` section of the current run's config, or {} outside a run."""
+    return ensure_config().get("configurable") or {}
+
+
+def _db_connection(state) -> Any:
+    """The connection string for this call: the run config's `db_connection`, else the state's.
+
+    Selecting the database per run lets one compiled agent serve many tenants.
+    """
+    return _run_config().get("db_connection") or state.get("db_connection")
+
+
+def _admission(state) -> tuple[int, Any]:
+    """Admission priority and deadline for a database call.
+
+    Sub-agent calls queue behind the main agent's. The run config may set
+    `db_deadline`, the most seconds a call waits for a connection.
+    """
+    priority = BACKGROUND if state.get("subagent") else INTERACTIVE
+    return priority, _run_config().get("db_deadline")
+
+
+def _db_snapshot(state) -> Optional[str]:
+    """The exported snapshot this call reads from, if the run has one.
+
+    Set as `db_snapshot` in the run config or the state (which sub-agents
+    inherit), so every tool call of the run sees the same data.
+    """
+    return _run_config().get("db_snapshot") or state.get("db_snapshot")
+
+
+def _limit_query(query: str, query_upper: str, limit: int) -> str:
+    """Add LIMIT to SELECT queries if not present and limit is reasonable."""
+    if query_upper.startswith('SELECT') and 'LIMIT' not in query_upper and limit > 0:
+        return f"{query} LIMIT {limit}"
+    return query
+
+
+def _fetch_rows(conn, query: str) -> tuple[list[str], list, list[Formatter]]:
+    """Run `query` and return its column names, rows and column formatters."""
+    cursor = conn.cursor()
+    cursor.execute(query)
+    results = cursor.fetchall()
+    column_names = [desc[0] for desc in cursor.description] if cursor.description else []
+    formatters = column_formatters(cursor.description)
+    cursor.close()
+    return column_names, results, formatters
+
+
+def _format_query_result(column_names: list[str], results, formatters: Optional[list[Formatter]] = None) -> str:
+    if not results:
+        return "Query executed successfully. No rows returned."
+    
+    # Format results as a table with better formatting
+    result_lines = format_table(column_names, results, formatters)
+    
+    # Add summary info
+    result_lines.append("")
+    result_lines.append(f"Total rows returned: {len(results)}")
+    
+    return "\n".join(result_lines)
 
 
 @tool(description=POSTGRES_QUERY_DESCRIPTION)
@@ -36,10 +177,16 @@ def postgres_query(
     query: str,
     state: Annotated[DeepAgentState, InjectedState],
     limit: int = 1000,
+    preview_rows: int = 0,
+    columnar: bool = False,
+    mode: str = "rows",
 ) -> str:
     """Execute a SELECT query against the PostgreSQL database. Only read operations are allowed."""
+    conn = None
+    # Set once the statement is sent, for the workload log.
+    started = rows = error = None
     try:
-        db_connection = state.get("db_connection")
+        db_connection = _db_connection(state)
         if not db_connection:
             return "Error: No database connection available. Database connection should be established at startup."
         
@@ -53,57 +200,169 @@ def postgres_query(
         if not query_upper.startswith('SELECT') and not query_upper.startswith('WITH') and not query_upper.startswith('EXPLAIN'):
             return "Error: Only SELECT, WITH (CTE), and EXPLAIN queries are allowed."
         
-        conn = psycopg2.connect(db_connection)
-        cursor = conn.cursor()
+        if mode not in ("rows", "summary"):
+            return f"Error: Unknown mode '{mode}'. Use 'rows' or 'summary'."
+        if mode == "summary" and query_upper.startswith('EXPLAIN'):
+            return "Error: mode='summary' is not available for EXPLAIN queries."
         
-        # Add LIMIT to SELECT queries if not present and limit is reasonable
-        if query_upper.startswith('SELECT') and 'LIMIT' not in query_upper and limit > 0:
-            query = f"{query} LIMIT {limit}"
+        snapshot = _db_snapshot(state)
+        hedge = _run_config().get("db_hedge")
+        started = time.monotonic()
+        if hedge is not None and snapshot is None and mode == "rows" and (
+            query_upper.startswith('EXPLAIN') or (not columnar and preview_rows <= 0)
+        ):
+            # A slow statement is re-issued on a replica. An exported snapshot
+            # exists on one server only, so snapshot runs are never hedged.
+            query = _limit_query(query, query_upper, limit)
+            column_names, results, formatters = hedge.run(
+                db_connection, lambda conn: _fetch_rows(conn, query), *_admission(state)
+            )
+            rows = len(results)
+            return _format_query_result(column_names, results, formatters)
         
-        cursor.execute(query)
-        results = cursor.fetchall()
-        column_names = [desc[0] for desc in cursor.description] if cursor.description else []
+        # Closing a pooled connection returns it to the pool.
+        conn = get_pool(db_connection).acquire(*_admission(state), snapshot=snapshot)
         
-        cursor.close()
-        conn.close()
+        if mode == "summary":
+            # Summaries describe the whole result, so no default LIMIT is added.
+            # The rows are streamed through a server-side cursor and folded
+            # into per-column sketches a chunk at a time.
+            try:
+                cursor = conn.cursor(name="deepagents_summary")
+                cursor.itersize = FETCH_CHUNK_ROWS
+                cursor.execute(query)
+                # A named cursor only knows its column description after the
+                # first fetch.
+                first = cursor.fetchmany(cursor.itersize)
+                column_names = [desc[0] for desc in cursor.description] if cursor.description else []
+                chunks = itertools.chain([first], iter(lambda: cursor.fetchmany(cursor.itersize), []))
+                summaries, row_count = summarize_chunks(column_names, chunks)
+                cursor.close()
+            finally:
+                conn.close()
+            rows = row_count
+            return format_summary(summaries, row_count)
         
-        if not results:
-            return "Query executed successfully. No rows returned."
+        query = _limit_query(query, query_upper, limit)
         
-        # Format results as a table with better formatting
-        result_lines = []
-        if column_names:
-            # Create header
-            header = "\t".join(column_names)
-            result_lines.append(header)
-            result_lines.append("-" * len(header))
-        
-        # Add data rows
-        for row in results:
-            formatted_row = []
-            for val in row:
-                if val is None:
-                    formatted_row.append("NULL")
-                elif isinstance(val, (int, float)):
-                    formatted_row.append(str(val))
-                else:
-                    # Truncate long strings for readability
-                    str_val = str(val)
-                    if len(str_val) > 100:
-                        str_val = str_val[:97] + "..."
-                    formatted_row.append(str_val)
-            result_lines.append("\t".join(formatted_row))
+        if columnar and preview_rows <= 0 and not query_upper.startswith('EXPLAIN'):
+            # Decode the result column by column from a binary COPY stream
+            # rather than boxing every value into a row tuple.
+            try:
+                columns = fetch_columnar(conn, query)
+            except UnsupportedColumnType:
+                conn.rollback()
+            else:
+                conn.close()
+                rows = columns.row_count
+                if not columns.row_count:
+                    return "Query executed successfully. No rows returned."
+                header = "\t".join(columns.column_names)
+                result_lines = [header, "-" * len(header)]
+                result_lines.extend("\t".join(row) for row in zip(*format_columns(columns)))
+                result_lines.append("")
+                result_lines.append(f"Total rows returned: {columns.row_count}")
+                return "\n".join(result_lines)
         
-        # Add summary info
-        result_lines.append("")
-        result_lines.append(f"Total rows returned: {len(results)}")
+        if preview_rows > 0 and not query_upper.startswith('EXPLAIN'):
+            # Stream the result through a server-side cursor into a local
+            # spill file, so large results never have to fit in memory.
+            try:
+                cursor = conn.cursor(name="deepagents_preview")
+                cursor.itersize = max(2000, preview_rows)
+                cursor.execute(query)
+                # A named cursor only knows its column description after the
+                # first fetch.
+                results = cursor.fetchmany(cursor.itersize)
+                column_names = [desc[0] for desc in cursor.description] if cursor.description else []
+                formatters = column_formatters(cursor.description)
+                spilled = None
+                if len(results) > preview_rows:
+                    spilled = result_store.spill(
+                        column_names, itertools.chain(results, cursor), [desc[1] for desc in cursor.description]
+                    )
+                cursor.close()
+            finally:
+                conn.close()
+
+            if spilled is not None:
+                rows = spilled.row_count
+                result_lines = format_table(column_names, results[:preview_rows], formatters)
+                result_lines.append("")
+                result_lines.append(f"Showing {preview_rows} of {spilled.row_count} rows.")
+                result_lines.append(
+                    f"Result handle: {spilled.handle} "
+                    f"(use postgres_fetch_page to read more rows)"
+                )
+                return "\n".join(result_lines)
+        else:
+            column_names, results, formatters = _fetch_rows(conn, query)
+            conn.close()
         
-        return "\n".join(result_lines)
+        rows = len(results)
+        return _format_query_result(column_names, results, formatters)
         
     except Exception as e:
+        error = str(e)
+        if conn is not None:
+            conn.close()
         return f"Error executing query: {str(e)}"
+    finally:
+        if started is not None and workload_log.enabled:
+            config = _run_config()
+            workload_log.record(
+                query,
+                time.monotonic() - started,
+                rows,
+                error,
+                db_connection,
+                session=config.get("session_id") or config.get("thread_id"),
+                subagent=state.get("subagent"),
+            )
 
 
+@tool(description=POSTGRES_FETCH_PAGE_DESCRIPTION)
+def postgres_fetch_page(
+    handle: str,
+    offset: int = 0,
+    n: int = 100,
+) -> str:
+    """Read a page of rows from a result handle returned by postgres_query."""
+    try:
+        page = result_store.fetch_page(handle, offset, n)
+    except KeyError:
+        return f"Error: Unknown or expired result handle '{handle}'. Re-run the query with postgres_query."
+    
+    if not page.rows:
+        return f"No rows at offset {offset}. The result has {page.total_rows} rows."
+    
+    # Formatted by the columns' types, like the preview postgres_query returned.
+    formatters = [column_formatter(oid) for oid in page.type_oids] if page.type_oids is not None else None
+    result_lines = format_table(page.column_names, page.rows, formatters)
+    result_lines.append("")
+    result_lines.append(f"Rows {offset}-{offset + len(page.rows) - 1} of {page.total_rows}.")
+    return "\n".join(result_lines)
+
+
+@tool(description=READ_SUBAGENT_RESULT_DESCRIPTION)
+def read_subagent_result(
+    handle: str,
+    offset: int = 0,
+    length: int = MAX_OUTPUT_CHARS,
+) -> str:
+    """Read part of a sub-agent report that was condensed by the task tool."""
+    try:
+        text, total_chars = report_store.read(handle, offset, length)
+    except KeyError:
+        return f"Error: Unknown or expired report handle '{handle}'."
+    
+    if not text:
+        return f"No text at offset {offset}. The report has {total_chars} characters."
+    
+    end = offset + len(text)
+    note = f"[Characters {offset}-{end} of {total_chars}"
+    note += f"; continue with offset={end}.]" if end < total_chars else ".]"
+    return f"{text}\n\n{note}"
 
 
 @tool(description=POSTGRES_SCHEMA_DESCRIPTION)
@@ -112,61 +371,382 @@ def postgres_schema(
     table_name: str = None,
 ) -> str:
     """Get schema information for PostgreSQL database tables."""
+    db_connection = _db_connection(state)
+    if not db_connection:
+        return "Error: No database connection available. Database connection should be established at startup."
+    
+    # Identical concurrent calls, e.g. from a fan-out of sub-agents, share one
+    # round of catalog queries.
+    snapshot = _db_snapshot(state)
+    return _coalesced(
+        flight_key(db_connection, "postgres_schema", table_name, snapshot),
+        lambda: _postgres_schema(db_connection, table_name, *_admission(state), snapshot),
+    )
+
+
+def _coalesced(key, load: Callable[[], str]) -> str:
+    """The run's prefetched result for `key`, or `load()` shared with identical concurrent calls."""
+    prefetched = _run_config().get("prefetched")
+    result = prefetched.take(key) if prefetched is not None else None
+    return result if result is not None else single_flight.do(key, load)
+
+
+def _postgres_schema(
+    db_connection: str,
+    table_name: str = None,
+    priority: int = INTERACTIVE,
+    deadline: float = None,
+    snapshot: str = None,
+) -> str:
     try:
-        db_connection = state.get("db_connection")
+        # Pooled connections keep these fixed catalog statements prepared, so
+        # repeated calls skip parsing and planning.
+        with get_pool(db_connection).connection(priority, deadline, snapshot) as conn:
+            cursor = conn.cursor()
+            
+            if table_name:
+                # Get schema for specific table
+                cursor.execute_prepared(f"""
+                    SELECT column_name, data_type, is_nullable, column_default
+                    FROM information_schema.columns 
+                    WHERE (table_schema, table_name) IN {_RESOLVED_TABLE}
+                    ORDER BY ordinal_position
+                """, (table_name,))
+                results = cursor.fetchall()
+                
+                if not results:
+                    cursor.close()
+                    return f"Table '{table_name}' not found."
+                
+                result_lines = [f"Schema for table '{table_name}':"]
+                result_lines.append("Column Name\tData Type\tNullable\tDefault")
+                result_lines.append("-" * 60)
+                
+                for row in results:
+                    result_lines.append(f"{row[0]}\t{row[1]}\t{row[2]}\t{row[3] or 'None'}")
+            else:
+                # Get list of all tables
+                cursor.execute_prepared("""
+                    SELECT table_name 
+                    FROM information_schema.tables 
+                    WHERE table_schema = 'public'
+                    ORDER BY table_name
+                """)
+                results = cursor.fetchall()
+                
+                if not results:
+                    cursor.close()
+                    return "No tables found in the database."
+                
+                result_lines = ["Available tables:"]
+                for row in results:
+                    result_lines.append(f"- {row[0]}")
+            
+            cursor.close()
+        
+        return "\n".join(result_lines)
+        
+    except Exception as e:
+        return f"Error getting schema: {str(e)}"
+
+
+@tool(description=POSTGRES_SEARCH_SCHEMA_DESCRIPTION)
+def postgres_search_schema(
+    query: str,
+    state: Annotated[DeepAgentState, InjectedState],
+    k: int = 10,
+) -> str:
+    """Find the tables most relevant to a natural-language or keyword query."""
+    try:
+        db_connection = _db_connection(state)
         if not db_connection:
             return "Error: No database connection available. Database connection should be established at startup."
         
-        conn = psycopg2.connect(db_connection)
-        cursor = conn.cursor()
-        
-        if table_name:
-            # Get schema for specific table
-            cursor.execute("""
-                SELECT column_name, data_type, is_nullable, column_default
-                FROM information_schema.columns 
-                WHERE table_name = %s 
-                ORDER BY ordinal_position
-            """, (table_name,))
-            results = cursor.fetchall()
-            
-            if not results:
-                cursor.close()
-                conn.close()
-                return f"Table '{table_name}' not found."
-            
-            result_lines = [f"Schema for table '{table_name}':"]
-            result_lines.append("Column Name\tData Type\tNullable\tDefault")
-            result_lines.append("-" * 60)
-            
-            for row in results:
-                result_lines.append(f"{row[0]}\t{row[1]}\t{row[2]}\t{row[3] or 'None'}")
-        else:
-            # Get list of all tables
-            cursor.execute("""
-                SELECT table_name 
-                FROM information_schema.tables 
-                WHERE table_schema = 'public'
-                ORDER BY table_name
-            """)
-            results = cursor.fetchall()
-            
-            if not results:
-                cursor.close()
-                conn.close()
-                return "No tables found in the database."
+        hits = get_schema_index(db_connection).search(query, k)
+        if not hits:
+            return f"No tables match '{query}'."
+        
+        result_lines = [f"Top {len(hits)} tables for '{query}':"]
+        for rank, hit in enumerate(hits, start=1):
+            table = hit.table
+            header = f"{rank}. {table.qualified_name} (score {hit.score:.2f})"
+            if table.comment:
+                header += f" - {table.comment}"
+            result_lines.append(header)
             
-            result_lines = ["Available tables:"]
-            for row in results:
-                result_lines.append(f"- {row[0]}")
+            # Key columns: primary key first, then columns matching the query,
+            # then the leading columns of the table.
+            key_columns = [c for c in table.columns if c.is_primary_key]
+            key_columns += [c for c in table.columns if c.name in hit.matched_columns and c not in key_columns]
+            key_columns += [c for c in table.columns if c not in key_columns][:max(0, 6 - len(key_columns))]
+            described = [
+                f"{c.name} ({c.data_type}{', PK' if c.is_primary_key else ''})" for c in key_columns
+            ]
+            more = len(table.columns) - len(key_columns)
+            if more > 0:
+                described.append(f"+{more} more")
+            result_lines.append(f"   columns: {', '.join(described)}")
         
-        cursor.close()
-        conn.close()
+        return "\n".join(result_lines)
+        
+    except Exception as e:
+        return f"Error searching schema: {str(e)}"
+
+
+@tool(description=POSTGRES_JOIN_PATH_DESCRIPTION)
+def postgres_join_path(
+    table_a: str,
+    table_b: str,
+    state: Annotated[DeepAgentState, InjectedState],
+) -> str:
+    """Find the shortest foreign-key join paths between two tables."""
+    try:
+        db_connection = _db_connection(state)
+        if not db_connection:
+            return "Error: No database connection available. Database connection should be established at startup."
+        
+        graph = get_join_graph(db_connection)
+        endpoints = []
+        for name in (table_a, table_b):
+            matches = graph.resolve(name)
+            if not matches:
+                return f"Table '{name}' not found."
+            if len(matches) > 1:
+                options = ", ".join(sorted(t.qualified_name for t in matches))
+                return f"Table name '{name}' is ambiguous. Use one of: {options}"
+            endpoints.append(matches[0])
+        
+        paths = graph.shortest_paths(endpoints[0], endpoints[1])
+        if not paths:
+            return (
+                f"No foreign-key path connects {endpoints[0].qualified_name} "
+                f"and {endpoints[1].qualified_name}."
+            )
+        if paths == [[]]:
+            return f"{table_a} and {table_b} are the same table."
+        
+        hops = len(paths[0])
+        result_lines = [
+            f"Shortest join paths from {endpoints[0].qualified_name} to "
+            f"{endpoints[1].qualified_name} ({hops} join{'s' if hops > 1 else ''}):"
+        ]
+        for number, path in enumerate(paths, start=1):
+            result_lines.append("")
+            result_lines.append(f"Path {number}:")
+            result_lines.extend(format_join_path(path))
         
         return "\n".join(result_lines)
         
     except Exception as e:
-        return f"Error getting schema: {str(e)}"
+        return f"Error finding join path: {str(e)}"
+
+
+def _progress_writer():
+    """Return the run's custom stream writer, or None outside a streaming run."""
+    if get_stream_writer is None:
+        return None
+    try:
+        return get_stream_writer()
+    except (RuntimeError, KeyError):
+        return None
+
+
+@tool(description=POSTGRES_EXPORT_DESCRIPTION)
+def postgres_export(
+    query: str,
+    filename: str,
+    state: Annotated[DeepAgentState, InjectedState],
+    format: str = "csv",
+) -> str:
+    """Stream the full result of a SELECT query to a local CSV or Parquet file."""
+    try:
+        db_connection = _db_connection(state)
+        if not db_connection:
+            return "Error: No database connection available. Database connection should be established at startup."
+        
+        # Security check: Only allow SELECT statements and read-only operations
+        query_upper = query.upper().strip()
+        forbidden_keywords = ['INSERT', 'UPDATE', 'DELETE', 'DROP', 'CREATE', 'ALTER', 'TRUNCATE', 'GRANT', 'REVOKE']
+        
+        if any(keyword in query_upper for keyword in forbidden_keywords):
+            return f"Error: Modification operations are not allowed. Only SELECT queries are permitted. Forbidden operation detected in query."
+        
+        if not query_upper.startswith('SELECT') and not query_upper.startswith('WITH'):
+            return "Error: Only SELECT and WITH (CTE) queries can be exported."
+        
+        format = format.lower()
+        if format not in EXPORT_FORMATS:
+            return f"Error: Unknown format '{format}'. Use 'csv' or 'parquet'."
+        
+        try:
+            path = resolve_export_path(filename, format)
+        except ValueError as e:
+            return f"Error: {str(e)}"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        # Progress goes to the custom stream (stream_mode="custom"), not the model.
+        exporter = export_parquet if format == "parquet" else export_csv
+        conn = get_pool(db_connection).acquire(*_admission(state), snapshot=_db_snapshot(state))
+        try:
+            result = exporter(conn, query, path, report=_progress_writer())
+        finally:
+            conn.close()
+        
+        return format_export(result)
+        
+    except ImportError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Error exporting query: {str(e)}"
+
+
+# The schema and name of the table a (possibly schema-qualified) name refers
+# to, resolved like the planner does: bare names along the search_path.
+_RESOLVED_TABLE = """(
+    SELECT n.nspname, c.relname
+    FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.oid = to_regclass(%s)
+)"""
+
+# The planner's row estimate; -1 (never vacuumed or analyzed) falls back to
+# the statistics collector's live row count.
+ESTIMATED_ROWS_QUERY = """
+    SELECT CASE WHEN c.reltuples >= 0 THEN c.reltuples::bigint ELSE coalesce(s.n_live_tup, 0) END
+    FROM pg_class c LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    WHERE c.oid = to_regclass(%s)
+"""
+
+
+def _profile_table_basic(cursor, table_name: str, estimate_rows: bool = False) -> dict:
+    """Row count, size and planner statistics for a table.
+
+    With `estimate_rows`, the row count is the planner's estimate instead of
+    a `COUNT(*)` over the whole table.
+    """
+    # Get basic table statistics
+    cursor.execute_prepared(f"""
+        SELECT 
+            schemaname,
+            tablename,
+            attname as column_name,
+            n_distinct,
+            correlation
+        FROM pg_stats 
+        WHERE (schemaname, tablename) IN {_RESOLVED_TABLE}
+        ORDER BY attname
+    """, (table_name,))
+    stats_results = cursor.fetchall()
+    
+    # Get row count
+    if estimate_rows:
+        cursor.execute_prepared(ESTIMATED_ROWS_QUERY, (table_name,))
+    else:
+        cursor.execute(f"""
+            SELECT COUNT(*) as total_rows 
+            FROM {table_name}
+        """)
+    row_count = cursor.fetchone()[0]
+    
+    # Get table size
+    cursor.execute_prepared("""
+        SELECT pg_size_pretty(pg_total_relation_size(%s)) as table_size
+    """, (table_name,))
+    table_size = cursor.fetchone()[0]
+    
+    return {
+        "row_count": row_count,
+        "row_count_is_estimate": estimate_rows,
+        "table_size": table_size,
+        "columns": [[col_name, n_distinct, correlation] for _, _, col_name, n_distinct, correlation in stats_results],
+    }
+
+
+def _render_table_basic(table_name: str, profile: dict) -> list[str]:
+    result_lines = [f"Analysis for table '{table_name}':"]
+    result_lines.append("=" * 50)
+    if profile.get("row_count_is_estimate"):
+        result_lines.append(f"Total rows: ~{profile['row_count']:,} (planner estimate)")
+    else:
+        result_lines.append(f"Total rows: {profile['row_count']:,}")
+    result_lines.append(f"Table size: {profile['table_size']}")
+    result_lines.append("")
+    result_lines.append("Column Statistics:")
+    result_lines.append("Column\t\tDistinct Values\tCorrelation")
+    result_lines.append("-" * 50)
+    
+    for col_name, n_distinct, correlation in profile["columns"]:
+        n_distinct_str = str(n_distinct) if n_distinct else "N/A"
+        correlation_str = f"{correlation:.3f}" if correlation else "N/A"
+        result_lines.append(f"{col_name}\t\t{n_distinct_str}\t\t{correlation_str}")
+    return result_lines
+
+
+def _profile_table_detailed(cursor, table_name: str) -> dict:
+    """Column definitions and a few sample values per column."""
+    # Get detailed column analysis
+    cursor.execute_prepared(f"""
+        SELECT column_name, data_type, is_nullable, column_default
+        FROM information_schema.columns 
+        WHERE (table_schema, table_name) IN {_RESOLVED_TABLE}
+        ORDER BY ordinal_position
+    """, (table_name,))
+    columns = cursor.fetchall()
+    
+    column_profiles = []
+    for col_name, data_type, is_nullable, default_val in columns:
+        samples = []
+        # Get sample values for the column
+        try:
+            cursor.execute(f"""
+                SELECT DISTINCT {col_name} 
+                FROM {table_name} 
+                WHERE {col_name} IS NOT NULL 
+                LIMIT 5
+            """)
+            samples = [str(row[0]) for row in cursor.fetchall()]
+        except:
+            pass  # Skip if there are issues with the column
+        column_profiles.append({
+            "name": col_name,
+            "type": data_type,
+            "nullable": is_nullable,
+            "default": default_val,
+            "samples": samples,
+        })
+    return {"columns": column_profiles}
+
+
+def _render_table_detailed(table_name: str, profile: dict) -> list[str]:
+    result_lines = [f"Detailed Analysis for table '{table_name}':"]
+    result_lines.append("=" * 60)
+    
+    for column in profile["columns"]:
+        result_lines.append(f"\nColumn: {column['name']}")
+        result_lines.append(f"  Type: {column['type']}")
+        result_lines.append(f"  Nullable: {column['nullable']}")
+        result_lines.append(f"  Default: {column['default'] or 'None'}")
+        if column["samples"]:
+            result_lines.append(f"  Sample values: {', '.join(column['samples'])}")
+    return result_lines
+
+
+_TABLE_ANALYSES = {
+    "basic": (_profile_table_basic, _render_table_basic),
+    "detailed": (_profile_table_detailed, _render_table_detailed),
+}
+
+
+def _describe_staleness(signature: dict, computed_at: float, from_store: bool) -> str:
+    computed = datetime.fromtimestamp(computed_at, timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+    source = "served from the local profile store" if from_store else "freshly computed"
+    line = f"Profile {source} (computed {computed})"
+    if signature:
+        last_analyzed = max(filter(None, [signature["last_analyze"], signature["last_autoanalyze"]]), default=None)
+        line += (
+            f"; rows modified since last ANALYZE: {signature['n_mod_since_analyze']:,}"
+            f"; last analyzed: {last_analyzed or 'never'}"
+        )
+    return line
 
 
 @tool(description=POSTGRES_ANALYZE_DESCRIPTION)
@@ -174,124 +754,141 @@ def postgres_analyze(
     state: Annotated[DeepAgentState, InjectedState],
     table_name: str = None,
     analysis_type: str = "basic",
+    refresh: bool = False,
 ) -> str:
     """Perform analysis on PostgreSQL database tables to get insights like row counts, data distribution, etc."""
+    db_connection = _db_connection(state)
+    if not db_connection:
+        return "Error: No database connection available. Database connection should be established at startup."
+    
+    # Identical concurrent calls share one run of the analysis queries.
+    snapshot = _db_snapshot(state)
+    return _coalesced(
+        flight_key(db_connection, "postgres_analyze", table_name, analysis_type, refresh, snapshot),
+        lambda: _postgres_analyze(db_connection, table_name, analysis_type, refresh, *_admission(state), snapshot),
+    )
+
+
+def _postgres_analyze(
+    db_connection: str,
+    table_name: str = None,
+    analysis_type: str = "basic",
+    refresh: bool = False,
+    priority: int = INTERACTIVE,
+    deadline: float = None,
+    snapshot: str = None,
+    estimate_rows: bool = False,
+) -> str:
     try:
-        db_connection = state.get("db_connection")
-        if not db_connection:
-            return "Error: No database connection available. Database connection should be established at startup."
+        with get_pool(db_connection).connection(priority, deadline, snapshot) as conn:
+            cursor = conn.cursor()
         
-        conn = psycopg2.connect(db_connection)
-        cursor = conn.cursor()
-        
-        if table_name:
-            # Analyze specific table
-            if analysis_type == "basic":
-                # Get basic table statistics
-                cursor.execute(f"""
+            if table_name:
+                # Analyze specific table
+                if analysis_type not in _TABLE_ANALYSES:
+                    cursor.close()
+                    return f"Error: Unknown analysis_type '{analysis_type}'. Use 'basic' or 'detailed'."
+                profile_table, render_table = _TABLE_ANALYSES[analysis_type]
+            
+                # Profiles are reused across calls and processes for as long as
+                # Postgres reports no modification of the table since they were
+                # computed. On a snapshot the profile must describe the
+                # snapshot's data, so it is always computed.
+                table_oid, signature, stored = None, {}, None
+                if profile_store.enabled and snapshot is None:
+                    try:
+                        cursor.execute_prepared("SELECT to_regclass(%s)::oid", (table_name,))
+                        table_oid = cursor.fetchone()[0]
+                    except psycopg2.Error:
+                        conn.rollback()
+                    if table_oid is not None:
+                        identity = database_identity(conn, db_connection)
+                        signature = staleness_signature(cursor, table_oid)
+                        if not refresh:
+                            stored = profile_store.get_fresh(identity, table_oid, analysis_type, signature)
+            
+                if stored is not None:
+                    profile, computed_at = stored.profile, stored.created_at
+                elif estimate_rows and analysis_type == "basic":
+                    # Estimated profiles are never stored in place of counted ones.
+                    profile, computed_at = profile_table(cursor, table_name, estimate_rows=True), time.time()
+                else:
+                    profile, computed_at = profile_table(cursor, table_name), time.time()
+                    if signature:
+                        profile_store.put(identity, table_oid, analysis_type, profile, signature)
+            
+                result_lines = render_table(table_name, profile)
+                result_lines.append("")
+                result_lines.append(_describe_staleness(signature, computed_at, stored is not None))
+            else:
+                # Analyze all tables
+                cursor.execute_prepared("""
                     SELECT 
                         schemaname,
                         tablename,
-                        attname as column_name,
-                        n_distinct,
-                        correlation
-                    FROM pg_stats 
-                    WHERE tablename = %s
-                    ORDER BY attname
-                """, (table_name,))
-                stats_results = cursor.fetchall()
-                
-                # Get row count
-                cursor.execute(f"""
-                    SELECT COUNT(*) as total_rows 
-                    FROM {table_name}
+                        pg_size_pretty(pg_total_relation_size(schemaname||'.'||tablename)) as size
+                    FROM pg_tables 
+                    WHERE schemaname = 'public'
+                    ORDER BY pg_total_relation_size(schemaname||'.'||tablename) DESC
                 """)
-                row_count = cursor.fetchone()[0]
-                
-                # Get table size
-                cursor.execute(f"""
-                    SELECT pg_size_pretty(pg_total_relation_size(%s)) as table_size
-                """, (table_name,))
-                table_size = cursor.fetchone()[0]
-                
-                result_lines = [f"Analysis for table '{table_name}':"]
+                table_results = cursor.fetchall()
+            
+                result_lines = ["Database Overview:"]
                 result_lines.append("=" * 50)
-                result_lines.append(f"Total rows: {row_count:,}")
-                result_lines.append(f"Table size: {table_size}")
-                result_lines.append("")
-                result_lines.append("Column Statistics:")
-                result_lines.append("Column\t\tDistinct Values\tCorrelation")
+                result_lines.append("Schema\t\tTable\t\tSize")
                 result_lines.append("-" * 50)
-                
-                for row in stats_results:
-                    schema, table, col_name, n_distinct, correlation = row
-                    n_distinct_str = str(n_distinct) if n_distinct else "N/A"
-                    correlation_str = f"{correlation:.3f}" if correlation else "N/A"
-                    result_lines.append(f"{col_name}\t\t{n_distinct_str}\t\t{correlation_str}")
             
-            elif analysis_type == "detailed":
-                # Get detailed column analysis
-                cursor.execute(f"""
-                    SELECT column_name, data_type, is_nullable, column_default
-                    FROM information_schema.columns 
-                    WHERE table_name = %s 
-                    ORDER BY ordinal_position
-                """, (table_name,))
-                columns = cursor.fetchall()
-                
-                result_lines = [f"Detailed Analysis for table '{table_name}':"]
-                result_lines.append("=" * 60)
+                for schema, table, size in table_results:
+                    result_lines.append(f"{schema}\t\t{table}\t\t{size}")
                 
-                for col_name, data_type, is_nullable, default_val in columns:
-                    result_lines.append(f"\nColumn: {col_name}")
-                    result_lines.append(f"  Type: {data_type}")
-                    result_lines.append(f"  Nullable: {is_nullable}")
-                    result_lines.append(f"  Default: {default_val or 'None'}")
-                    
-                    # Get sample values for the column
-                    try:
-                        cursor.execute(f"""
-                            SELECT DISTINCT {col_name} 
-                            FROM {table_name} 
-                            WHERE {col_name} IS NOT NULL 
-                            LIMIT 5
-                        """)
-                        samples = [str(row[0]) for row in cursor.fetchall()]
-                        if samples:
-                            result_lines.append(f"  Sample values: {', '.join(samples)}")
-                    except:
-                        pass  # Skip if there are issues with the column
-        else:
-            # Analyze all tables
-            cursor.execute("""
-                SELECT 
-                    schemaname,
-                    tablename,
-                    pg_size_pretty(pg_total_relation_size(schemaname||'.'||tablename)) as size
-                FROM pg_tables 
-                WHERE schemaname = 'public'
-                ORDER BY pg_total_relation_size(schemaname||'.'||tablename) DESC
-            """)
-            table_results = cursor.fetchall()
-            
-            result_lines = ["Database Overview:"]
-            result_lines.append("=" * 50)
-            result_lines.append("Schema\t\tTable\t\tSize")
-            result_lines.append("-" * 50)
-            
-            for schema, table, size in table_results:
-                result_lines.append(f"{schema}\t\t{table}\t\t{size}")
-                
-            # Get total database size
-            cursor.execute("SELECT pg_size_pretty(pg_database_size(current_database()))")
-            db_size = cursor.fetchone()[0]
-            result_lines.append("")
-            result_lines.append(f"Total database size: {db_size}")
+                # Get total database size
+                cursor.execute_prepared("SELECT pg_size_pretty(pg_database_size(current_database()))")
+                db_size = cursor.fetchone()[0]
+                result_lines.append("")
+                result_lines.append(f"Total database size: {db_size}")
         
-        cursor.close()
-        conn.close()
+            cursor.close()
         
         return "\n".join(result_lines)
         
     except Exception as e:
         return f"Error performing analysis: {str(e)}"
+
+
+@tool(description=POSTGRES_INDEX_ADVICE_DESCRIPTION)
+def postgres_index_advice(
+    state: Annotated[DeepAgentState, InjectedState],
+    queries: Optional[list[str]] = None,
+    limit: int = 10,
+) -> str:
+    """Suggest indexes for the queries agents run, ranked by estimated benefit."""
+    db_connection = _db_connection(state)
+    if not db_connection:
+        return "Error: No database connection available. Database connection should be established at startup."
+    
+    if queries:
+        rejected = [query for query in queries if not explainable(query)]
+        if rejected:
+            return (
+                "Error: Only single SELECT and WITH (CTE) statements without modification keywords "
+                f"can be analyzed. Rejected: {rejected[0][:200]}"
+            )
+        statements = [Statement(query) for query in queries]
+    elif workload_log.enabled and os.path.exists(workload_log.path):
+        database = psycopg2.extensions.parse_dsn(db_connection).get("dbname")
+        statements = statements_from_workload(read_workload(workload_log.path), database)
+    else:
+        statements = []
+    if not statements:
+        return (
+            "Error: No queries to analyze. Pass queries, or set DEEPAGENTS_WORKLOAD_LOG "
+            "so the statements sent through postgres_query are captured."
+        )
+    
+    try:
+        catalog = get_catalog(db_connection)
+        with get_pool(db_connection).connection(*_admission(state), _db_snapshot(state)) as conn:
+            advice = advise_indexes(conn, statements, catalog, limit)
+        return format_index_advice(advice)
+    except Exception as e:
+        return f"Error computing index advice: {str(e)}"
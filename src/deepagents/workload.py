@@ -0,0 +1,269 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+import psycopg2
+
+# String literals, numbers and bind parameters, which pg_stat_statements
+# replaces with $n when it normalizes a statement.
+_CONSTANT = re.compile(r"'(?:[^']|'')*'|(?<![\w$])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b|\$\d+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# Statements read from pg_stat_statements to correlate a log with.
+PG_STAT_STATEMENTS_QUERY = """
+    SELECT queryid, query, calls, total_exec_time / nullif(calls, 0)
+    FROM pg_stat_statements
+    WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+"""
+
+
+def default_workload_log_path() -> Optional[str]:
+    """Location of the workload log, from `DEEPAGENTS_WORKLOAD_LOG`; unset or empty disables it."""
+    return os.getenv("DEEPAGENTS_WORKLOAD_LOG") or None
+
+
+def default_workload_log_raw() -> bool:
+    """Whether the workload log keeps SQL as sent, from `DEEPAGENTS_WORKLOAD_LOG_RAW=1`."""
+    return os.getenv("DEEPAGENTS_WORKLOAD_LOG_RAW") == "1"
+
+
+def normalize_sql(sql: str) -> str:
+    """`sql` with constants replaced by `?` and whitespace collapsed.
+
+    Also accepts pg_stat_statements' own normalized text, whose `$n`
+    placeholders normalize the same way.
+    """
+    normalized = _CONSTANT.sub("?", sql)
+    normalized = _IN_LIST.sub("(?)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip().rstrip(";").strip()
+
+
+def fingerprint(sql: str) -> str:
+    """A short hash identifying statements that differ only in constants, case and whitespace."""
+    return hashlib.sha1(normalize_sql(sql).lower().encode()).hexdigest()[:16]
+
+
+class WorkloadEntry(NamedTuple):
+    """One statement sent by `postgres_query`.
+
+    `sql` is the statement normalized by `normalize_sql`, so literal values
+    are not kept, unless `raw` says it is the statement as sent.
+    """
+
+    ts: float
+    sql: str
+    fingerprint: str
+    latency_ms: float
+    rows: Optional[int]
+    error: Optional[str]
+    database: Optional[str]
+    session: Optional[str]
+    subagent: Optional[str]
+    # Filled in by `correlate` from pg_stat_statements.
+    queryid: Optional[int] = None
+    raw: bool = False
+
+
+class WorkloadLog:
+    """An append-only JSON Lines log of the statements agents send through `postgres_query`.
+
+    Statements are logged normalized, without the literal values they were
+    sent with, unless `raw` is set; only a raw log can be replayed.
+    """
+
+    def __init__(self, path: Optional[str], raw: bool = False):
+        self.path = path
+        self.raw = raw
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def record(
+        self,
+        sql: str,
+        latency: float,
+        rows: Optional[int] = None,
+        error: Optional[str] = None,
+        db_connection: Optional[str] = None,
+        session: Optional[str] = None,
+        subagent: Optional[str] = None,
+    ) -> None:
+        if not self.enabled:
+            return
+        if error is not None and not self.raw:
+            # DETAIL lines of an error can quote row values.
+            error = error.split("\n", 1)[0]
+        entry = WorkloadEntry(
+            ts=time.time(),
+            sql=sql if self.raw else normalize_sql(sql),
+            fingerprint=fingerprint(sql),
+            latency_ms=round(latency * 1000, 3),
+            rows=rows,
+            error=error,
+            database=_database_name(db_connection),
+            session=session,
+            subagent=subagent,
+            raw=self.raw,
+        )
+        line = json.dumps(entry._asdict(), default=str) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # One write per line on an O_APPEND file, so processes sharing the log do not interleave.
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+def _database_name(db_connection: Optional[str]) -> Optional[str]:
+    # Only the database name is kept: connection strings may carry passwords.
+    if not db_connection:
+        return None
+    try:
+        return psycopg2.extensions.parse_dsn(db_connection).get("dbname")
+    except psycopg2.ProgrammingError:
+        return None
+
+
+def read_workload(path: str) -> Iterator[WorkloadEntry]:
+    """The entries of a workload log, oldest first."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                fields = json.loads(line)
+                # Logs written before statements were normalized hold them as sent.
+                fields.setdefault("raw", True)
+                yield WorkloadEntry(**fields)
+
+
+def correlate(entries: Iterable[WorkloadEntry], db_connection: str) -> list[WorkloadEntry]:
+    """Fill in each entry's pg_stat_statements `queryid`, matched by fingerprint.
+
+    Entries stay without one when the extension is not installed or the
+    statement has been evicted from it.
+    """
+    entries = list(entries)
+    conn = psycopg2.connect(db_connection)
+    try:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(PG_STAT_STATEMENTS_QUERY)
+        except psycopg2.Error:
+            return entries
+        queryids = {}
+        for queryid, query, calls, _ in cursor.fetchall():
+            queryids.setdefault(fingerprint(query), queryid)
+    finally:
+        conn.close()
+    return [entry._replace(queryid=queryids.get(entry.fingerprint)) for entry in entries]
+
+
+class ReplayStats(NamedTuple):
+    """Latencies of one statement fingerprint, as recorded and as replayed."""
+
+    fingerprint: str
+    sql: str
+    calls: int
+    errors: int
+    recorded_ms: float
+    mean_ms: float
+    p95_ms: float
+
+
+class ReplayReport(NamedTuple):
+    elapsed: float
+    statements: int
+    errors: int
+    by_fingerprint: list[ReplayStats]
+
+    def format(self) -> str:
+        lines = [
+            f"Replayed {self.statements} statements ({self.errors} failed) in {self.elapsed:.2f}s",
+            f"{'fingerprint':<16}  {'calls':>6}  {'recorded':>10}  {'mean':>10}  {'p95':>10}  sql",
+        ]
+        for stats in self.by_fingerprint:
+            lines.append(
+                f"{stats.fingerprint:<16}  {stats.calls:>6}  {stats.recorded_ms:>8.1f}ms  "
+                f"{stats.mean_ms:>8.1f}ms  {stats.p95_ms:>8.1f}ms  {normalize_sql(stats.sql)[:60]}"
+            )
+        return "\n".join(lines)
+
+
+def replay_workload(
+    entries: Iterable[WorkloadEntry],
+    db_connection: str,
+    concurrency: int = 4,
+    repeat: int = 1,
+) -> ReplayReport:
+    """Re-run a captured workload against `db_connection` and time every statement.
+
+    Statements that failed when captured are skipped. `concurrency` worker
+    threads, each on its own read-only connection, take statements in log
+    order. Results are grouped by fingerprint, slowest total time first.
+    Normalized statements cannot be run, so the log must have been
+    recorded with `DEEPAGENTS_WORKLOAD_LOG_RAW=1`; otherwise ValueError is raised.
+    """
+    workload = [entry for entry in entries if entry.error is None] * repeat
+    if not all(entry.raw for entry in workload):
+        raise ValueError(
+            "The workload log holds normalized statements, which cannot be replayed. "
+            "Record it with DEEPAGENTS_WORKLOAD_LOG_RAW=1."
+        )
+    local = threading.local()
+    connections = []
+    lock = threading.Lock()
+
+    def run(entry: WorkloadEntry) -> tuple[WorkloadEntry, float, bool]:
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = local.conn = psycopg2.connect(db_connection)
+            conn.set_session(readonly=True, autocommit=True)
+            with lock:
+                connections.append(conn)
+        started = time.perf_counter()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(entry.sql)
+            if cursor.description:
+                cursor.fetchall()
+            cursor.close()
+            ok = True
+        except psycopg2.Error:
+            ok = False
+        return entry, time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="deepagents-replay") as executor:
+            results = list(executor.map(run, workload))
+    finally:
+        for conn in connections:
+            conn.close()
+    elapsed = time.perf_counter() - started
+
+    groups: dict[str, list[tuple[WorkloadEntry, float, bool]]] = {}
+    for result in results:
+        groups.setdefault(result[0].fingerprint, []).append(result)
+    by_fingerprint = []
+    for key, group in groups.items():
+        latencies = sorted(latency * 1000 for _, latency, _ in group)
+        by_fingerprint.append(ReplayStats(
+            fingerprint=key,
+            sql=group[0][0].sql,
+            calls=len(group),
+            errors=sum(not ok for _, _, ok in group),
+            recorded_ms=sum(entry.latency_ms for entry, _, _ in group) / len(group),
+            mean_ms=sum(latencies) / len(latencies),
+            p95_ms=latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)],
+        ))
+    by_fingerprint.sort(key=lambda stats: stats.mean_ms * stats.calls, reverse=True)
+    return ReplayReport(elapsed, len(results), sum(stats.errors for stats in by_fingerprint), by_fingerprint)
+
+
+workload_log = WorkloadLog(default_workload_log_path(), default_workload_log_raw())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script to verify admission control in front of the database tools.
+
+This script uses a fake server load probe and does not require a database connection.
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from deepagents.admission import BACKGROUND, INTERACTIVE, AdmissionController, AdmissionRejected, ServerLoad
+
+
+def _wait_for_queue(controller, n):
+    while controller.metrics()["queued"] < n:
+        time.sleep(0.001)
+
+
+def test_interactive_calls_are_admitted_first():
+    """Test that queued main-agent calls run before queued sub-agent calls."""
+    print("Testing priority admission...")
+    controller = AdmissionController(max_limit=1)
+    controller.acquire(INTERACTIVE)
+    order = []
+
+    def call(priority, name):
+        controller.acquire(priority)
+        order.append(name)
+        controller.release()
+
+    threads = [threading.Thread(target=call, args=(BACKGROUND, "background-1"))]
+    threads[0].start()
+    _wait_for_queue(controller, 1)
+    for priority, name in [(BACKGROUND, "background-2"), (INTERACTIVE, "interactive")]:
+        threads.append(threading.Thread(target=call, args=(priority, name)))
+        threads[-1].start()
+        _wait_for_queue(controller, len(threads))
+
+    controller.release()
+    for thread in threads:
+        thread.join()
+    assert order == ["interactive", "background-1", "background-2"]
+
+    metrics = controller.metrics()
+    assert metrics["admitted"] == 4 and metrics["in_flight"] == 0
+    assert metrics["queue_time"][BACKGROUND]["max"] > 0
+    print("✅ Interactive calls admitted first")
+
+
+def test_rejections():
+    """Test rejection for a full queue, an unmeetable deadline and an expired wait."""
+    print("Testing rejections...")
+    controller = AdmissionController(max_limit=1, max_queue=1)
+    controller.acquire()
+    # Recent calls held their slot for about a second.
+    controller._service_time = 1.0
+
+    try:
+        controller.acquire(deadline=0.5)
+        raise AssertionError("expected a deadline rejection")
+    except AdmissionRejected:
+        pass
+
+    waiter = threading.Thread(target=controller.acquire, kwargs={"deadline": 60})
+    waiter.start()
+    _wait_for_queue(controller, 1)
+    try:
+        controller.acquire(deadline=60)
+        raise AssertionError("expected a queue-full rejection")
+    except AdmissionRejected:
+        pass
+    controller.release()
+    waiter.join()
+
+    controller._service_time = 0.001
+    started = time.monotonic()
+    try:
+        controller.acquire(deadline=0.05)
+        raise AssertionError("expected a timeout")
+    except AdmissionRejected:
+        assert time.monotonic() - started < 1
+
+    metrics = controller.metrics()
+    assert (metrics["rejected_deadline"], metrics["rejected_queue_full"], metrics["timed_out"]) == (1, 1, 1)
+    assert metrics["queued"] == 0
+    print("✅ Calls rejected instead of waiting past their deadline")
+
+
+def test_limit_adapts_to_server_load():
+    """Test that the limit halves under overload and recovers one step per healthy probe."""
+    print("Testing adaptive limit...")
+    loads = [ServerLoad(40, 95, 100), ServerLoad(40, 95, 100), ServerLoad(5, 20, 100)]
+    controller = AdmissionController(max_limit=8, probe=lambda: loads.pop(0), probe_interval=0)
+    limits = []
+    for _ in range(3):
+        controller.acquire()
+        controller.release()
+        limits.append(controller.limit)
+    assert limits == [4, 2, 3]
+
+    failing = AdmissionController(max_limit=8, probe=lambda: 1 / 0, probe_interval=0)
+    with failing.slot():
+        pass
+    assert failing.limit == 8
+    print("✅ Limit adapts to server load")
+
+
+if __name__ == "__main__":
+    test_interactive_calls_are_admitted_first()
+    test_rejections()
+    test_limit_adapts_to_server_load()
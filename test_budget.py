@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script to verify prompt token accounting and compact description tiers.
+
+A fake chat model counts whitespace-separated words as tokens, so this script does not require a model API.
+"""
+
+import sys
+import os
+import json
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from deepagents import create_deep_agent
+from deepagents.budget import BudgetTracker, TokenCounter
+
+
+class WordCountingModel(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools])
+
+    def get_num_tokens_from_messages(self, messages, tools=None):
+        text = " ".join(m.content for m in messages) + (json.dumps(tools) if tools else "")
+        return len(text.split()) + 3 * len(messages)
+
+
+def _model(*replies):
+    return WordCountingModel(messages=iter(replies or [AIMessage(content="done")]))
+
+
+def test_counter_splits_prompt():
+    """Test that a call is split into system prompt, tool schemas and history."""
+    print("Testing token counter...")
+    from deepagents.tools import postgres_schema
+    counter = TokenCounter(_model())
+    budget = counter.measure("You are a database analyst", [postgres_schema], [HumanMessage("How many orders?")])
+    assert budget.system == 5 + 3
+    assert budget.history == 3 + 3
+    assert budget.tools > 0 and budget.exact
+    assert budget.total == budget.fixed + budget.history
+    print(f"✅ system={budget.system} tools={budget.tools} history={budget.history}")
+
+
+def test_estimate_without_tokenizer():
+    """Test the fallback when the model cannot count tokens."""
+    counter = TokenCounter(object())
+    budget = counter.measure("x" * 400, [])
+    assert budget.system > 0 and not budget.exact
+
+
+def test_compact_tiers_fit_ceiling():
+    """Test that descriptions are compacted only as far as the ceiling requires."""
+    print("Testing compact description tiers...")
+    full = create_deep_agent([], "Instructions.", model=_model(), max_prompt_overhead=10**6)
+    compact = create_deep_agent([], "Instructions.", model=_model(), description_tier="compact", max_prompt_overhead=10**6)
+    assert compact.prompt_budget.fixed < full.prompt_budget.fixed / 2
+
+    ceiling = (full.prompt_budget.fixed + compact.prompt_budget.fixed) // 2
+    fitted = create_deep_agent([], "Instructions.", model=_model(), max_prompt_overhead=ceiling)
+    assert compact.prompt_budget.fixed <= fitted.prompt_budget.fixed <= ceiling
+    print(
+        f"✅ Fixed overhead: full {full.prompt_budget.fixed}, fitted {fitted.prompt_budget.fixed}, "
+        f"compact {compact.prompt_budget.fixed} tokens"
+    )
+
+
+def test_tracker_records_main_and_subagent_calls():
+    """Test per-call accounting across the main agent and a sub-agent."""
+    print("Testing budget tracker...")
+    model = _model(
+        AIMessage(content="", tool_calls=[{"name": "task", "args": {"description": "Count rows", "subagent_type": "general-purpose"}, "id": "call-1"}]),
+        AIMessage(content="42 rows"),
+        AIMessage(content="There are 42 rows."),
+    )
+    agent = create_deep_agent([], "Instructions.", model=model)
+    tracker = BudgetTracker(model)
+    agent.invoke({"messages": [{"role": "user", "content": "How many rows?"}]}, config={"callbacks": [tracker]})
+
+    assert [step.agent for step in tracker.steps] == ["main", "subagent", "main"]
+    main_calls = [step.budget for step in tracker.steps if step.agent == "main"]
+    assert main_calls[0].fixed == main_calls[1].fixed
+    assert main_calls[1].history > main_calls[0].history
+    totals = tracker.totals()
+    assert totals["main"]["calls"] == 2 and totals["subagent"]["calls"] == 1
+    print(f"✅ Tracked {len(tracker.steps)} model calls")
+
+
+if __name__ == "__main__":
+    test_counter_splits_prompt()
+    test_estimate_without_tokenizer()
+    test_compact_tiers_fit_ceiling()
+    test_tracker_records_main_and_subagent_calls()
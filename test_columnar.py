@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Test script to verify decoding of binary COPY streams into columns.
+
+The streams are built by hand, so this script does not require a database connection.
+"""
+
+import sys
+import os
+import struct
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from deepagents import columnar
+from deepagents.columnar import COPY_SIGNATURE, ColumnarResult, decode_copy_binary, format_columns, session_time_zone
+from deepagents.formatting import column_formatter, format_table
+
+
+def _stream(rows):
+    """Build a binary COPY stream; each field is pre-encoded bytes or None."""
+    data = COPY_SIGNATURE + struct.pack(">ii", 0, 0)
+    for row in rows:
+        data += struct.pack(">h", len(row))
+        for field in row:
+            if field is None:
+                data += struct.pack(">i", -1)
+            else:
+                data += struct.pack(">i", len(field)) + field
+    return data + struct.pack(">h", -1)
+
+
+def _numeric(ndigits_list, weight, sign, dscale):
+    return struct.pack(f">hhHH{len(ndigits_list)}h", len(ndigits_list), weight, sign, dscale, *ndigits_list)
+
+
+def _as_list(column):
+    return column.tolist() if hasattr(column, "tolist") else list(column)
+
+
+def test_fixed_width_fast_path():
+    """Test NULL-free fixed-width columns, including dates and timestamps."""
+    print("Testing fixed-width decoding...")
+    rows = [
+        [struct.pack(">i", i), struct.pack(">d", i / 4), struct.pack(">i", i), struct.pack(">q", i * 1_000_000), struct.pack("?", i % 2 == 0)]
+        for i in range(5)
+    ]
+    columns, null_masks, row_count = decode_copy_binary(_stream(rows), [23, 701, 1082, 1114, 16])
+    assert row_count == 5
+    assert null_masks == [None] * 5
+    assert _as_list(columns[0]) == [0, 1, 2, 3, 4]
+    assert _as_list(columns[1]) == [0.0, 0.25, 0.5, 0.75, 1.0]
+    assert _as_list(columns[4]) == [True, False, True, False, True]
+
+    result = ColumnarResult(["i", "f", "d", "t", "b"], [23, 701, 1082, 1114, 16], columns, null_masks, row_count)
+    rendered = format_columns(result)
+    assert rendered[2][1] == str(date(2000, 1, 2))
+    assert rendered[3][1] == str(datetime(2000, 1, 1, 0, 0, 1))
+    print("✅ Fixed-width columns decoded")
+
+
+def test_nulls_and_variable_width():
+    """Test the general decoder with NULLs, text and numeric values."""
+    print("Testing variable-width decoding...")
+    rows = [
+        [struct.pack(">i", 1), "alpha".encode(), _numeric([12, 3456], 0, 0x4000, 4)],
+        [None, None, _numeric([1], 5, 0, 0)],
+        [struct.pack(">i", 3), ("x" * 150).encode(), _numeric([], 0, 0, 2)],
+    ]
+    columns, null_masks, row_count = decode_copy_binary(_stream(rows), [23, 25, 1700])
+    assert row_count == 3
+    assert _as_list(null_masks[0]) == [False, True, False]
+    assert null_masks[2] is None
+    assert _as_list(columns[2]) == [Decimal("-12.3456"), Decimal("100000000000000000000"), Decimal("0.00")]
+
+    rendered = format_columns(ColumnarResult(["i", "s", "n"], [23, 25, 1700], columns, null_masks, row_count))
+    assert rendered[0] == ["1", "NULL", "3"]
+    assert rendered[1][:2] == ["alpha", "NULL"]
+    assert rendered[1][2] == "x" * 97 + "..."
+    assert rendered[2] == ["-12.3456", "100000000000000000000", "0.00"]
+    print("✅ NULLs, text and numeric decoded")
+
+
+def test_infinities():
+    """Test that infinite dates and timestamps render as Postgres prints them."""
+    print("Testing infinite dates and timestamps...")
+    oids = [1082, 1114, 1184]
+    rows = [
+        [struct.pack(">i", 2**31 - 1), struct.pack(">q", 2**63 - 1), struct.pack(">q", 2**63 - 1)],
+        [struct.pack(">i", -2**31), struct.pack(">q", -2**63), struct.pack(">q", -2**63)],
+        [struct.pack(">i", 0), struct.pack(">q", 0), struct.pack(">q", 0)],
+    ]
+    for stream_rows in (rows, rows + [[None, None, None]]):
+        columns, null_masks, row_count = decode_copy_binary(_stream(stream_rows), oids)
+        result = ColumnarResult(["d", "t", "tz"], oids, columns, null_masks, row_count, ZoneInfo("America/New_York"))
+        rendered = format_columns(result)
+        assert [column[:2] for column in rendered] == [["infinity", "-infinity"]] * 3
+        assert rendered[0][2] == "2000-01-01"
+        assert rendered[2][2] == "1999-12-31 19:00:00-05:00"
+
+    # The row path renders psycopg2's sentinels the same way.
+    assert column_formatter(1082)([date.max, date.min, None]) == ["infinity", "-infinity", "NULL"]
+    assert column_formatter(1184)([datetime.max.replace(tzinfo=timezone.utc)]) == ["infinity"]
+    print("✅ Infinities rendered")
+
+
+def test_session_time_zone():
+    """Test resolving the session TimeZone setting."""
+    print("Testing session time zones...")
+
+    class FakeCursor:
+        def __init__(self, row):
+            self.row = row
+
+        def execute(self, query):
+            pass
+
+        def fetchone(self):
+            return self.row
+
+    assert session_time_zone(FakeCursor(("Etc/UTC", 0))) is timezone.utc
+    assert session_time_zone(FakeCursor(("Europe/Berlin", 3600))) == ZoneInfo("Europe/Berlin")
+    fixed = session_time_zone(FakeCursor(("<+03>-03", 10800)))
+    assert fixed.utcoffset(None).total_seconds() == 10800
+    print("✅ Session time zones resolved")
+
+
+def test_float4_like_the_row_path():
+    """Test that float4 values render as psycopg2 parses Postgres' output, with and without NULLs."""
+    print("Testing float4 rendering...")
+    values = [0.1, 1.1, 3.4028235e38, 16777216.0, -0.0]
+    # Postgres prints the shortest float4 decimal; psycopg2 parses it into a Python float.
+    expected = ["0.1", "1.1", "3.4028235e+38", "16777216.0", "-0.0"]
+    fields = [struct.pack(">f", value) for value in values]
+    for stream_rows, nulls in (([[f] for f in fields], []), ([[f] for f in fields] + [[None]], ["NULL"])):
+        columns, null_masks, row_count = decode_copy_binary(_stream(stream_rows), [700])
+        if columnar.np is not None:
+            assert isinstance(columns[0], columnar.np.ndarray)
+        result = ColumnarResult(["f"], [700], columns, null_masks, row_count)
+        assert format_columns(result) == [expected + nulls], format_columns(result)
+        assert column_formatter(700)([float(text) for text in expected]) == expected
+    print("✅ float4 rendered as on the row path")
+
+
+def test_truncation_like_the_row_path():
+    """Test that long text is cut at the same width on the columnar, row and untyped paths."""
+    print("Testing text truncation...")
+    values = ["x" * 99, "x" * 100, "x" * 101, "é" * 150]
+    expected = ["x" * 99, "x" * 100, "x" * 97 + "...", "é" * 97 + "..."]
+    columns, null_masks, row_count = decode_copy_binary(_stream([[v.encode()] for v in values]), [25])
+    assert format_columns(ColumnarResult(["s"], [25], columns, null_masks, row_count)) == [expected]
+    assert column_formatter(25)(values) == expected
+    assert format_table(["s"], [[v] for v in values])[2:] == expected
+    print("✅ Text cut as on the row path")
+
+
+def test_without_numpy():
+    """Test that decoding works with plain lists when NumPy is unavailable."""
+    print("Testing decoding without NumPy...")
+    saved = columnar.np
+    columnar.np = None
+    try:
+        test_fixed_width_fast_path()
+        test_nulls_and_variable_width()
+        test_infinities()
+        test_float4_like_the_row_path()
+    finally:
+        columnar.np = saved
+    print("✅ Plain-list fallback works")
+
+
+if __name__ == "__main__":
+    test_fixed_width_fast_path()
+    test_nulls_and_variable_width()
+    test_infinities()
+    test_session_time_zone()
+    test_float4_like_the_row_path()
+    test_truncation_like_the_row_path()
+    test_without_numpy()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test script to verify multi-tenant connection management.
+
+Connections are fake objects, so this script does not require a database connection.
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from deepagents import db
+from deepagents.admission import AdmissionRejected
+from deepagents.db import ConnectionManager
+
+
+class FakeConnection:
+    open_count = 0
+    peak = 0
+
+    def __init__(self, dsn):
+        self.dsn = dsn
+        self.closed = 0
+        FakeConnection.open_count += 1
+        FakeConnection.peak = max(FakeConnection.peak, FakeConnection.open_count)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        if not self.closed:
+            self.closed = 1
+            FakeConnection.open_count -= 1
+
+
+def _use_fake_connections():
+    FakeConnection.open_count = FakeConnection.peak = 0
+    saved = db.psycopg2.connect
+    db.psycopg2.connect = FakeConnection
+    return saved
+
+
+def test_global_connection_cap():
+    """Test that many tenants never hold more than the global number of connections."""
+    print("Testing global connection cap...")
+    saved = _use_fake_connections()
+    try:
+        manager = ConnectionManager(max_open_connections=4, max_pools=100)
+        barrier = threading.Barrier(12)
+
+        def call(tenant):
+            pool = manager.pool(f"postgresql://db/tenant{tenant}")
+            # No admission probe: these fake connections cannot run queries.
+            pool.admission.probe = None
+            barrier.wait()
+            with pool.connection():
+                time.sleep(0.02)
+
+        threads = [threading.Thread(target=call, args=(i % 6,)) for i in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert FakeConnection.peak <= 4
+        assert manager.open_connections == FakeConnection.open_count <= 4
+        print(f"✅ At most {FakeConnection.peak} connections open for 6 tenants")
+    finally:
+        db.psycopg2.connect = saved
+
+
+def test_budget_exhaustion_is_rejected():
+    """Test that a connection beyond the budget is rejected once nothing is returned in time."""
+    saved = _use_fake_connections()
+    try:
+        manager = ConnectionManager(max_open_connections=1, connect_timeout=0.05)
+        busy = manager.pool("postgresql://db/a")
+        busy.admission.probe = None
+        other = manager.pool("postgresql://db/b")
+        other.admission.probe = None
+        with busy.connection():
+            try:
+                other.acquire()
+                raise AssertionError("expected a rejection")
+            except AdmissionRejected:
+                pass
+        # Once returned, the idle connection is reclaimed for the other tenant.
+        with other.connection():
+            assert manager.open_connections == 1
+    finally:
+        db.psycopg2.connect = saved
+
+
+def test_lru_pools_and_warm_up():
+    """Test LRU pool shutdown and pre-warming when a hot tenant comes back."""
+    print("Testing pool LRU and warm-up...")
+    saved = _use_fake_connections()
+    try:
+        manager = ConnectionManager(max_open_connections=10, max_pools=2)
+        hot = "postgresql://db/hot"
+        pool = manager.pool(hot)
+        pool.admission.probe = None
+        for _ in range(3):
+            first, second = pool.acquire(), pool.acquire()
+            first.close()
+            second.close()
+
+        manager.pool("postgresql://db/b")
+        manager.pool("postgresql://db/c")
+        assert hot not in manager.pools()
+        assert pool.closed and FakeConnection.open_count == 0
+
+        warmed = manager.pool(hot)
+        for _ in range(100):
+            if len(warmed._idle) == 2:
+                break
+            time.sleep(0.01)
+        assert len(warmed._idle) == 2
+        assert manager.open_connections == 2
+        print("✅ Hot tenant pool pre-warmed")
+    finally:
+        db.psycopg2.connect = saved
+
+
+if __name__ == "__main__":
+    test_global_connection_cap()
+    test_budget_exhaustion_is_rejected()
+    test_lru_pools_and_warm_up()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the file export helpers behind postgres_export.
+
+CSV streams are built by hand, so this script does not require a database connection.
+"""
+
+import sys
+import os
+import io
+import tempfile
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from deepagents.export import (
+    ExportColumn,
+    ExportResult,
+    _Progress,
+    _unique_names,
+    _write_row_groups,
+    format_export,
+    pa,
+    resolve_export_path,
+)
+
+
+def test_export_paths_are_confined():
+    """Test that export paths stay inside the export directory."""
+    print("Testing export path resolution...")
+    root = os.path.realpath(tempfile.mkdtemp())
+    assert resolve_export_path("orders", "csv", root) == os.path.join(root, "orders.csv")
+    assert resolve_export_path("2024/orders.parquet", "parquet", root) == os.path.join(root, "2024", "orders.parquet")
+    for escaping in ("../orders", "/etc/orders", "a/../../orders"):
+        try:
+            resolve_export_path(escaping, "csv", root)
+        except ValueError:
+            continue
+        raise AssertionError(f"{escaping} escaped the export directory")
+    print("✅ Export paths confined")
+
+
+def test_parquet_row_groups():
+    """Test that COPY CSV output is parsed into typed, fixed-size row groups."""
+    if pa is None:
+        print("Skipping Parquet test: pyarrow is not installed")
+        return
+    import pyarrow.parquet as pq
+
+    print("Testing Parquet row groups...")
+    lines = [f'{i},"name {i}",{i / 2},t,1.50\n' for i in range(10)]
+    # NULLs are empty unquoted fields; empty strings are quoted.
+    lines.append(',"",NaN,f,\n')
+    names = _unique_names(["id", "name", "score", "flag", "id"])
+    assert names == ["id", "name", "score", "flag", "id_2"]
+    types = [pa.int32(), pa.string(), pa.float64(), pa.bool_(), pa.decimal128(6, 2)]
+    path = os.path.join(tempfile.mkdtemp(), "out.parquet")
+
+    row_groups, infinities = _write_row_groups(
+        io.BytesIO("".join(lines).encode()), path, names, types,
+        pa.schema(list(zip(names, types))), _Progress(None, path), row_group_rows=4,
+    )
+    metadata = pq.ParquetFile(path).metadata
+    assert row_groups == metadata.num_row_groups == 3
+    assert infinities == {}
+    assert [metadata.row_group(i).num_rows for i in range(3)] == [4, 4, 3]
+
+    rows = pq.read_table(path).to_pylist()
+    assert rows[1] == {"id": 1, "name": "name 1", "score": 0.5, "flag": True, "id_2": Decimal("1.50")}
+    assert rows[-1]["id"] is None and rows[-1]["name"] == "" and rows[-1]["id_2"] is None
+    print("✅ Parquet written in row groups")
+
+
+def test_parquet_infinities():
+    """Test that infinite dates and timestamps become NULL and are counted, not rejected."""
+    if pa is None:
+        print("Skipping Parquet infinity test: pyarrow is not installed")
+        return
+    import pyarrow.parquet as pq
+
+    print("Testing Parquet infinities...")
+    lines = [
+        "2024-01-02,2024-01-02 03:04:05.5,2024-01-02 03:04:05+00\n",
+        "infinity,-infinity,infinity\n",
+        "-infinity,2024-01-02 03:04:05,\n",
+    ]
+    names = ["day", "at", "at_utc"]
+    types = [pa.date32(), pa.timestamp("us"), pa.timestamp("us", tz="UTC")]
+    path = os.path.join(tempfile.mkdtemp(), "out.parquet")
+
+    _, infinities = _write_row_groups(
+        io.BytesIO("".join(lines).encode()), path, names, types,
+        pa.schema(list(zip(names, types))), _Progress(None, path), row_group_rows=2,
+    )
+    assert infinities == {"day": 2, "at": 1, "at_utc": 1}
+    table = pq.read_table(path)
+    assert table.schema.types == types
+    rows = table.to_pylist()
+    assert rows[0]["day"] == date(2024, 1, 2)
+    assert rows[0]["at"] == datetime(2024, 1, 2, 3, 4, 5, 500000)
+    assert rows[0]["at_utc"] == datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    assert rows[1] == {"day": None, "at": None, "at_utc": None}
+    assert rows[2]["day"] is None and rows[2]["at"] == datetime(2024, 1, 2, 3, 4, 5)
+
+    result = ExportResult(path, "parquet", 3, 100, 0.1, [], 2, infinities)
+    assert "written as NULL (Parquet has no infinity): day 2, at 1, at_utc 1." in format_export(result)
+    print("✅ Parquet infinities written as NULL")
+
+
+def test_format_export():
+    """Test that the tool result describes the file without any data."""
+    result = ExportResult(
+        "/exports/orders.csv", "csv", 1200, 2_000_000, 0.5,
+        [ExportColumn("id", "integer", None), ExportColumn("total", "numeric", None)], 0,
+    )
+    rendered = format_export(result)
+    assert rendered.startswith("Exported 1,200 rows to /exports/orders.csv (2.0 MB, csv)")
+    assert "- total: numeric" in rendered
+    assert "infinity" not in rendered
+
+
+if __name__ == "__main__":
+    test_export_paths_are_confined()
+    test_parquet_row_groups()
+    test_parquet_infinities()
+    test_format_export()
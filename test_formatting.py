@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that query results are rendered column by column with formatters chosen from type OIDs.
+
+Values are built in Python as psycopg2 would decode them, so this script does not require a database.
+"""
+
+import sys
+import os
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from deepagents.formatting import column_formatter, column_formatters, format_table
+
+
+def test_scalars_render_like_str():
+    """Test that numbers, booleans and temporal values render as str() does, and NULLs as NULL."""
+    print("Testing column formatters...")
+    assert column_formatter(23)([1, None, -5]) == ["1", "NULL", "-5"]
+    assert column_formatter(701)([1.5, 0.1]) == ["1.5", "0.1"]
+    assert column_formatter(1700)([Decimal("2.50"), None]) == ["2.50", "NULL"]
+    assert column_formatter(16)([True, False]) == ["True", "False"]
+    assert column_formatter(1082)([date(2024, 1, 2)]) == ["2024-01-02"]
+    assert column_formatter(1184)([datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)]) == ["2024-01-02 03:04:05+00:00"]
+    assert column_formatter(1186)([timedelta(days=1, hours=2)]) == ["1 day, 2:00:00"]
+    # Numbers are never cut; text is.
+    assert column_formatter(1700)([Decimal("1" * 120)]) == ["1" * 120]
+    assert column_formatter(25)(["x" * 120, "None", None]) == ["x" * 97 + "...", "None", "NULL"]
+    print("✅ Scalars rendered consistently")
+
+
+def test_structured_values():
+    """Test that JSON renders as JSON, bytea as hex and arrays as Postgres array literals."""
+    assert column_formatter(3802)([{"a": [1, None, True]}, "text", None]) == ['{"a": [1, null, true]}', '"text"', "NULL"]
+    assert column_formatter(17)([memoryview(b"\xde\xad")]) == ["\\xdead"]
+    assert column_formatter(1007)([[1, None, 3], []]) == ["{1,NULL,3}", "{}"]
+    assert column_formatter(1009)([["a b", "x", "", "NULL", 'q"'], None]) == ['{"a b",x,"","NULL","q\\""}', "NULL"]
+    assert column_formatter(1231)([[Decimal("1.50"), Decimal("2")]]) == ["{1.50,2}"]
+    assert column_formatter(1182)([[date(2024, 1, 2)]]) == ["{2024-01-02}"]
+    assert column_formatter(1007)([[[1, 2], [3, 4]]]) == ["{{1,2},{3,4}}"]
+    assert column_formatter(3807)([[{"k": 1}]]) == ['{"{\\"k\\": 1}"}']
+    long_array = column_formatter(1007)([list(range(100))])[0]
+    assert len(long_array) == 100 and long_array.endswith("...")
+    print("✅ JSON, bytea and arrays rendered")
+
+
+def test_format_table():
+    """Test that tables are laid out as before, with and without a cursor description."""
+    description = [("id", 23, None, None, None, None, None), ("name", 25, None, None, None, None, None)]
+    rows = [(1, "alice"), (2, None)]
+    expected = ["id\tname", "-------", "1\talice", "2\tNULL"]
+    assert format_table(["id", "name"], rows, column_formatters(description)) == expected
+    assert format_table(["id", "name"], rows) == expected
+    assert format_table(["id"], []) == ["id", "--"]
+    assert format_table([], [(), ()]) == ["", ""]
+
+
+if __name__ == "__main__":
+    test_scalars_render_like_str()
+    test_structured_values()
+    test_format_table()
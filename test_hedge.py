@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test script to verify hedged reads across replicas.
+
+Pools and connections are fakes whose statements sleep for a set time per server, so this script does not require a database connection.
+"""
+
+import sys
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from deepagents import hedge as hedge_module
+from deepagents.hedge import HedgePolicy
+
+PRIMARY, REPLICA = "postgresql://primary/shop", "postgresql://replica/shop"
+
+
+class FakeConnection:
+    def __init__(self, server, pid):
+        self.server = server
+        self.pid = pid
+        self.cancel_requested = threading.Event()
+
+    def get_backend_pid(self):
+        return self.pid
+
+    def cancel(self):
+        self.cancel_requested.set()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, sql, params=None):
+        # pg_cancel_backend(pid) interrupts the statement running on that backend.
+        self.connection.server.backends[params[0]].cancel_requested.set()
+
+    def close(self):
+        pass
+
+
+class FakeServer:
+    def __init__(self, latency):
+        self.latency = latency
+        self.backends = {}
+        self.cancelled = 0
+
+    def acquire(self, priority=0, deadline=None):
+        conn = FakeConnection(self, len(self.backends) + 1)
+        self.backends[conn.pid] = conn
+        return conn
+
+    @contextmanager
+    def connection(self, priority=0, deadline=None):
+        yield self.acquire()
+
+
+def read(conn):
+    """A statement that takes the server's latency unless cancelled."""
+    if conn.cancel_requested.wait(conn.server.latency):
+        conn.server.cancelled += 1
+        raise RuntimeError("canceling statement due to user request")
+    return conn.server
+
+
+def _servers(primary_latency, replica_latency):
+    servers = {PRIMARY: FakeServer(primary_latency), REPLICA: FakeServer(replica_latency)}
+    hedge_module.get_pool = servers.__getitem__
+    return servers
+
+
+def _warm(policy, servers, n):
+    latency = servers[PRIMARY].latency
+    servers[PRIMARY].latency = 0.01
+    for _ in range(n):
+        policy.run(PRIMARY, read)
+    servers[PRIMARY].latency = latency
+
+
+def test_slow_primary_is_hedged():
+    """Test that a statement slower than the percentile delay is won by the replica and the primary cancelled."""
+    print("Testing hedged reads...")
+    saved = hedge_module.get_pool
+    try:
+        servers = _servers(primary_latency=2.0, replica_latency=0.01)
+        policy = HedgePolicy([REPLICA], percentile=90, max_hedge_ratio=0.5, min_samples=10)
+        _warm(policy, servers, 10)
+        started = time.monotonic()
+        assert policy.run(PRIMARY, read) is servers[REPLICA]
+        assert time.monotonic() - started < 1.0
+        time.sleep(0.1)
+        assert servers[PRIMARY].cancelled == 1
+        metrics = policy.metrics()
+        assert metrics["hedges"] == 1 and metrics["hedge_wins"] == 1 and metrics["cancelled"] == 1
+        print("✅ Replica won and primary statement cancelled")
+    finally:
+        hedge_module.get_pool = saved
+
+
+def test_hedges_are_budgeted():
+    """Test that no more than max_hedge_ratio of statements are hedged, and none before min_samples."""
+    saved = hedge_module.get_pool
+    try:
+        servers = _servers(primary_latency=0.05, replica_latency=0.001)
+        policy = HedgePolicy([REPLICA], percentile=50, max_hedge_ratio=0.1, min_samples=10)
+        assert policy.delay() is None
+        _warm(policy, servers, 10)
+        for _ in range(20):
+            policy.run(PRIMARY, read)
+        # Every statement is slow enough, but at a 10% budget only the 11th and 21st are hedged.
+        assert policy.metrics()["hedges"] == 2, policy.metrics()
+    finally:
+        hedge_module.get_pool = saved
+
+
+def test_failed_primary_falls_back_to_replica():
+    """Test that when the hedged primary fails, the replica's result is used."""
+    saved = hedge_module.get_pool
+    try:
+        servers = _servers(primary_latency=0.2, replica_latency=0.3)
+        policy = HedgePolicy([REPLICA], percentile=90, max_hedge_ratio=0.5, min_samples=10)
+        _warm(policy, servers, 10)
+
+        def flaky(conn):
+            if conn.server is servers[PRIMARY]:
+                time.sleep(0.1)
+                raise RuntimeError("could not read block")
+            return read(conn)
+
+        assert policy.run(PRIMARY, flaky) is servers[REPLICA]
+    finally:
+        hedge_module.get_pool = saved
+
+
+if __name__ == "__main__":
+    test_slow_primary_is_hedged()
+    test_hedges_are_budgeted()
+    test_failed_primary_falls_back_to_replica()
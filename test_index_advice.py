@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the index advisor behind postgres_index_advice.
+
+A fake connection returns canned EXPLAIN plans, so this script does not require a database connection.
+"""
+
+import sys
+import os
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from deepagents.catalog import Catalog, TableInfo
+from deepagents.index_advice import (
+    Statement,
+    advise_indexes,
+    conditions,
+    explainable,
+    format_index_advice,
+    statement_count,
+    statements_from_workload,
+)
+from deepagents.workload import WorkloadEntry, fingerprint
+
+
+def seq_scan(table, alias, cost, rows, filter=None):
+    node = {"Node Type": "Seq Scan", "Relation Name": table, "Schema": "public", "Alias": alias,
+            "Total Cost": cost, "Plan Rows": rows}
+    if filter:
+        node["Filter"] = filter
+    return node
+
+
+PLANS = {
+    "SELECT * FROM orders o WHERE o.customer_id = 7 AND o.created_at > '2024-01-01'":
+        seq_scan("orders", "o", 2000.0, 5, "((o.customer_id = 7) AND (o.created_at > '2024-01-01'::date))"),
+    "SELECT * FROM orders WHERE customer_id = 9":
+        seq_scan("orders", "orders", 1800.0, 10, "(orders.customer_id = 9)"),
+    "SELECT * FROM orders WHERE status <> 'paid'":
+        seq_scan("orders", "orders", 1800.0, 90000, "((orders.status)::text <> 'paid'::text)"),
+    "SELECT * FROM orders o JOIN vip v ON v.customer_id = o.customer_id": {
+        "Node Type": "Hash Join", "Total Cost": 2100.0, "Plan Rows": 40,
+        "Hash Cond": "(o.customer_id = v.customer_id)",
+        "Plans": [seq_scan("orders", "o", 1800.0, 100000), {"Node Type": "Hash", "Plans": [seq_scan("vip", "v", 1.2, 20)]}],
+    },
+    "SELECT * FROM users WHERE email = 'a@b.c'":
+        seq_scan("users", "users", 900.0, 1, "((users.email)::text = 'a@b.c'::text)"),
+}
+TABLE_ROWS = {"public.orders": 100000.0, "public.vip": 20.0, "public.users": 40000.0}
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.result = None
+
+    def execute(self, sql, params=None):
+        self.conn.sent.append(sql)
+        if sql.startswith("EXPLAIN"):
+            statement = sql.split(") ", 1)[1]
+            if statement not in PLANS:
+                raise RuntimeError(f"relation does not exist")
+            plan = dict(PLANS[statement])
+            if self.conn.hypothetical and "orders" in statement and "customer_id" in statement:
+                plan["Total Cost"] = 20.0
+            self.result = [[{"Plan": plan}]]
+        elif "pg_class" in sql:
+            self.result = [TABLE_ROWS.get(".".join(params), 0.0)]
+        elif "pg_extension" in sql:
+            self.result = [1] if self.conn.hypopg else None
+        elif "hypopg_create_index" in sql:
+            self.conn.hypothetical = params[0]
+            self.conn.created.append(params[0])
+            self.result = [13001]
+        elif "hypopg_drop_index" in sql:
+            self.conn.hypothetical = None
+            self.result = [True]
+
+    def fetchone(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, hypopg=False):
+        self.hypopg = hypopg
+        self.hypothetical = None
+        self.sent = []
+        self.created = []
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+STATEMENTS = [Statement(sql, calls) for sql, calls in zip(PLANS, (10, 5, 50, 3, 1))] + [Statement("SELECT * FROM missing")]
+
+
+def test_conditions_are_split():
+    """Test that plan conditions are split into ANDed comparisons, and OR conditions give none."""
+    print("Testing condition parsing...")
+    assert conditions("((o.customer_id = 7) AND (o.created_at > (now() - '1 day'::interval)))") == [
+        ("o.customer_id", "=", "7"),
+        ("o.created_at", ">", "(now() - '1 day'::interval)"),
+    ]
+    assert conditions("((a.x)::integer = (b.y)::integer)") == [("(a.x)::integer", "=", "(b.y)::integer")]
+    assert conditions("((status = 'a') OR (status = 'b'))") == []
+    print("✅ Conditions parsed")
+
+
+def test_heuristic_advice():
+    """Test that filter and join keys of sequential scans become ranked, merged and deduplicated candidates."""
+    print("Testing heuristic index advice...")
+    users = TableInfo(1, "public", "users", None, [])
+    catalog = Catalog([users], 0.0, indexes={1: [["email"]]})
+    advice = advise_indexes(FakeConnection(), STATEMENTS, catalog)
+    assert advice.method == "heuristic" and advice.failed == 1 and advice.statements == 6
+    # The join key and the customer_id filter are served by (customer_id, created_at);
+    # the unselective status filter and the already indexed email get nothing.
+    assert [(c.schema, c.table, c.columns) for c in advice.candidates] == [("public", "orders", ("customer_id", "created_at"))]
+    candidate = advice.candidates[0]
+    assert candidate.reason == "filter and join" and candidate.calls == 18
+    assert candidate.cost_after < candidate.cost_before
+    report = format_index_advice(advice)
+    assert '1. CREATE INDEX ON "public"."orders" ("customer_id", "created_at");' in report
+    assert "3 statements (18 calls)" in report
+    print("✅ Candidates merged and ranked")
+
+
+def test_hypothetical_advice():
+    """Test that with hypopg the benefit comes from re-explaining with a hypothetical index, which is dropped."""
+    conn = FakeConnection(hypopg=True)
+    advice = advise_indexes(conn, STATEMENTS[:2], limit=5)
+    assert advice.method == "hypopg"
+    candidate = advice.candidates[0]
+    assert candidate.cost_before == 3800.0 and candidate.cost_after == 40.0
+    assert candidate.benefit == 10 * (2000.0 - 20.0) + 5 * (1800.0 - 20.0)
+    assert conn.hypothetical is None
+    assert any("hypopg_drop_index" in sql for sql in conn.sent)
+
+
+def test_quoted_identifiers_are_kept():
+    """Test that mixed-case and quoted names reach the DDL and hypopg exactly, quoted."""
+    sql = 'SELECT * FROM "Sales"."Order Lines" l WHERE l."CustomerId" = 7'
+    PLANS[sql] = {**seq_scan("Order Lines", "l", 2000.0, 5, '(l."CustomerId" = 7)'), "Schema": "Sales"}
+    TABLE_ROWS["Sales.Order Lines"] = 100000.0
+    conn = FakeConnection(hypopg=True)
+    try:
+        advice = advise_indexes(conn, [Statement(sql)])
+        hypothetical = conn.created
+        advice = advise_indexes(FakeConnection(), [Statement(sql)])
+    finally:
+        del PLANS[sql], TABLE_ROWS["Sales.Order Lines"]
+    assert hypothetical == ['CREATE INDEX ON "Sales"."Order Lines" ("CustomerId")']
+    candidate = advice.candidates[0]
+    assert (candidate.schema, candidate.table, candidate.columns) == ("Sales", "Order Lines", ("CustomerId",))
+    assert candidate.ddl() == 'CREATE INDEX ON "Sales"."Order Lines" ("CustomerId");'
+
+
+def test_statements_from_workload():
+    """Test that captured statements are grouped by fingerprint, failures and other databases left out."""
+    def entry(sql, latency, error=None, database="shop"):
+        return WorkloadEntry(0.0, sql, fingerprint(sql), latency, 1, error, database, None, None)
+
+    entries = [
+        entry("SELECT * FROM orders WHERE customer_id = 1", 5.0),
+        entry("SELECT * FROM orders WHERE customer_id = 2", 5.0),
+        entry("SELECT * FROM users", 8.0),
+        entry("SELECT * FROM missing", 1.0, error="relation does not exist"),
+        entry("SELECT * FROM other", 1.0, database="analytics"),
+    ]
+    statements = statements_from_workload(entries, "shop")
+    assert [(s.sql, s.calls) for s in statements] == [
+        ("SELECT * FROM orders WHERE customer_id = 2", 2),
+        ("SELECT * FROM users", 1),
+    ]
+    assert all(s.normalized for s in statements)
+    assert not statements_from_workload([entry("SELECT * FROM users", 8.0)._replace(raw=True)])[0].normalized
+
+
+def test_normalized_statements_use_generic_plans():
+    """Test that normalized statements are explained with numbered parameters and a generic plan."""
+    conn = FakeConnection()
+    PLANS["SELECT * FROM orders WHERE customer_id = $1 LIMIT $2"] = seq_scan(
+        "orders", "orders", 1800.0, 10, "(orders.customer_id = $1)"
+    )
+    try:
+        statement = Statement("SELECT * FROM orders WHERE customer_id = ? LIMIT ?", 4, normalized=True)
+        advice = advise_indexes(conn, [statement])
+    finally:
+        del PLANS["SELECT * FROM orders WHERE customer_id = $1 LIMIT $2"]
+    assert advice.failed == 0
+    assert [(c.table, c.columns) for c in advice.candidates] == [("orders", ("customer_id",))]
+    assert any(sql.startswith("EXPLAIN (FORMAT JSON, VERBOSE, GENERIC_PLAN) ") for sql in conn.sent)
+
+
+def test_only_single_read_only_statements_are_explained():
+    """Test that smuggled statements are never sent and EXPLAINs run read-only and are rolled back."""
+    print("Testing statement checks...")
+    assert statement_count("SELECT 1; COMMIT; DROP TABLE users; COMMIT") == 4
+    assert statement_count("SELECT ';', \"a;b\", $x$;$x$ /* ; */ FROM t -- ;\n;") == 1
+    assert statement_count("SELECT 'open; DROP TABLE users") is None
+    assert explainable("SELECT created_at FROM orders")
+    assert not explainable("WITH d AS (DELETE FROM orders RETURNING *) SELECT * FROM d")
+
+    conn = FakeConnection()
+    smuggled = Statement("SELECT * FROM users WHERE email = 'a@b.c'; COMMIT; DROP TABLE users; COMMIT", 100)
+    advice = advise_indexes(conn, [smuggled, STATEMENTS[1]])
+    assert advice.statements == 1
+    assert not any("DROP" in sql for sql in conn.sent)
+    assert conn.sent[0] == "SET TRANSACTION READ ONLY" and conn.rollbacks >= 2
+    print("✅ Only single read-only statements explained")
+
+
+if __name__ == "__main__":
+    test_conditions_are_split()
+    test_heuristic_advice()
+    test_hypothetical_advice()
+    test_quoted_identifiers_are_kept()
+    test_statements_from_workload()
+    test_normalized_statements_use_generic_plans()
+    test_only_single_read_only_statements_are_explained()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script to verify foreign-key join path finding.
+
+This script builds the join graph from a synthetic catalog, so it does not
+require a database connection.
+"""
+
+import sys
+import os
+import time
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from deepagents.catalog import Catalog, ColumnInfo, ForeignKey, TableInfo
+from deepagents.join_graph import JoinGraph, format_join_path
+from deepagents.tools import postgres_join_path
+import deepagents.tools as tools
+
+
+def _table(oid, name, columns, schema="public"):
+    return TableInfo(oid, schema, name, None, [ColumnInfo(c, "integer", False, None, i == 0) for i, c in enumerate(columns)])
+
+
+USERS = _table(1, "users", ["user_id"])
+ORDERS = _table(2, "orders", ["order_id", "user_id"])
+ITEMS = _table(3, "order_items", ["order_item_id", "order_id", "product_id"])
+PRODUCTS = _table(4, "products", ["product_id", "parent_id"])
+REVIEWS = _table(5, "reviews", ["review_id", "user_id", "product_id"])
+ARCHIVED_USERS = _table(6, "users", ["user_id"], schema="archive")
+LEGACY = _table(7, "LegacyOrders", ["Id", "user_id"], schema="archive")
+
+CATALOG = Catalog(
+    [USERS, ORDERS, ITEMS, PRODUCTS, REVIEWS, ARCHIVED_USERS, LEGACY],
+    time.time(),
+    [
+        ForeignKey("orders_user_id_fkey", 2, ["user_id"], 1, ["user_id"]),
+        ForeignKey("order_items_order_id_fkey", 3, ["order_id"], 2, ["order_id"]),
+        ForeignKey("order_items_product_id_fkey", 3, ["product_id"], 4, ["product_id"]),
+        ForeignKey("products_parent_id_fkey", 4, ["parent_id"], 4, ["product_id"]),
+        ForeignKey("reviews_user_id_fkey", 5, ["user_id"], 1, ["user_id"]),
+        ForeignKey("reviews_product_id_fkey", 5, ["product_id"], 4, ["product_id"]),
+        ForeignKey("LegacyOrders_user_fkey", 7, ["user_id"], 6, ["user_id"]),
+        ForeignKey("LegacyOrders_Id_fkey", 7, ["Id"], 2, ["order_id"]),
+    ],
+    {1: [["user_id"]], 2: [["order_id"], ["user_id", "order_id"]], 4: [["product_id"]]},
+)
+
+
+def test_shortest_paths():
+    """Test that the shortest paths are found in both directions of a foreign key."""
+    print("Testing shortest join paths...")
+    graph = JoinGraph(CATALOG)
+
+    paths = graph.shortest_paths(USERS, PRODUCTS)
+    assert len(paths) == 1
+    assert [step.right.name for step in paths[0]] == ["reviews", "products"]
+
+    paths = graph.shortest_paths(ORDERS, REVIEWS)
+    assert [step.right.name for step in paths[0]] == ["users", "reviews"]
+    first = paths[0][0]
+    assert first.on_clause() == '"orders"."user_id" = "users"."user_id"'
+    assert first.left_indexed and first.right_indexed
+    assert not paths[0][1].right_indexed
+
+    assert [step.right.name for step in graph.shortest_paths(USERS, ARCHIVED_USERS)[0]] == ["orders", "LegacyOrders", "users"]
+    print("✅ Shortest paths found")
+
+
+def test_resolve_and_format():
+    """Test table name resolution and rendering of JOIN clauses."""
+    print("Testing table resolution and formatting...")
+    graph = JoinGraph(CATALOG)
+
+    assert graph.resolve("users") == [USERS, ARCHIVED_USERS]
+    assert graph.resolve("archive.users") == [ARCHIVED_USERS]
+    assert graph.resolve("missing") == []
+
+    lines = format_join_path(graph.shortest_paths(ITEMS, USERS)[0])
+    print("\n".join(lines))
+    assert lines[0] == 'FROM "public"."order_items" "order_items"'
+    assert lines[1] == 'JOIN "public"."orders" "orders" ON "order_items"."order_id" = "orders"."order_id"'
+    assert "order_items.order_id NOT indexed" in lines[2]
+
+    # Tables sharing a name get schema-qualified aliases; mixed case stays quoted.
+    lines = format_join_path(graph.shortest_paths(USERS, ARCHIVED_USERS)[0])
+    assert lines[0] == 'FROM "public"."users" "public_users"'
+    assert lines[3] == 'JOIN "archive"."LegacyOrders" "LegacyOrders" ON "orders"."order_id" = "LegacyOrders"."Id"'
+    assert lines[5] == 'JOIN "archive"."users" "archive_users" ON "LegacyOrders"."user_id" = "archive_users"."user_id"'
+    print("✅ Resolution and formatting work")
+
+
+def test_ambiguous_name_rejected():
+    """Test that postgres_join_path asks for a qualified name instead of picking one of several tables."""
+    saved = tools.get_join_graph
+    tools.get_join_graph = lambda db_connection: JoinGraph(CATALOG)
+    try:
+        state = {"messages": [], "db_connection": "postgresql://db/shop"}
+        result = postgres_join_path.invoke({"table_a": "users", "table_b": "products", "state": state})
+        assert result == "Table name 'users' is ambiguous. Use one of: archive.users, public.users", result
+        result = postgres_join_path.invoke({"table_a": "public.users", "table_b": "products", "state": state})
+        assert result.startswith("Shortest join paths from public.users to public.products")
+    finally:
+        tools.get_join_graph = saved
+
+
+if __name__ == "__main__":
+    test_shortest_paths()
+    test_resolve_and_format()
+    test_ambiguous_name_rejected()
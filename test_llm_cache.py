@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that model responses are cached, evicted by size and invalidated by schema changes.
+
+A deterministic fake chat model stands in for the LLM, and the schema fingerprint is faked, so this script does not require an API key or a database.
+"""
+
+import sys
+import os
+import tempfile
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+import deepagents.llm_cache as llm_cache
+from deepagents import create_deep_agent
+from deepagents.llm_cache import ResponseCache
+
+calls = []
+
+
+class EchoModel(BaseChatModel):
+    """Calls `lookup` once, then answers with the lookup's result."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "echo"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        calls.append(len(messages))
+        last = messages[-1]
+        if isinstance(last, ToolMessage):
+            message = AIMessage(content=f"The answer is {last.content}.")
+        else:
+            message = AIMessage(content="", tool_calls=[{"name": "lookup", "args": {"key": "a"}, "id": "call-1"}])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+@tool
+def lookup(key: str) -> str:
+    """Look up a key."""
+    return f"value of {key}"
+
+
+INPUT = {"messages": [{"role": "user", "content": "What is a?"}]}
+
+
+def test_repeated_run_replayed_from_cache():
+    """Test that a second identical run makes no model calls and gives the same answer."""
+    print("Testing response cache...")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResponseCache(os.path.join(directory, "cache.sqlite3"))
+        agent = create_deep_agent([lookup], "Instructions.", model=EchoModel(cache=cache))
+        calls.clear()
+        first = agent.invoke(INPUT)
+        assert len(calls) == 2
+        second = agent.invoke(INPUT)
+        assert len(calls) == 2, calls
+        assert second["messages"][-1].content == first["messages"][-1].content == "The answer is value of a."
+        assert cache.stats()["hits"] == 2 and cache.stats()["entries"] == 2
+
+        # Other tool schemas are another key.
+        EchoModel(cache=cache).bind_tools([lookup]).invoke([HumanMessage("What is a?")])
+        EchoModel(cache=cache).invoke([HumanMessage("What is a?")])
+        assert len(calls) == 4
+        print("✅ Repeated run replayed from the cache")
+
+
+def test_size_eviction():
+    """Test that the least recently used responses are evicted once the cache is too big."""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResponseCache(os.path.join(directory, "cache.sqlite3"), max_bytes=3000)
+        model = EchoModel(cache=cache)
+        for i in range(20):
+            model.invoke([HumanMessage(f"question {i}")])
+        stats = cache.stats()
+        assert 0 < stats["bytes"] <= 3000 and stats["entries"] < 20, stats
+        calls.clear()
+        model.invoke([HumanMessage("question 19")])
+        model.invoke([HumanMessage("question 0")])
+        assert len(calls) == 1
+    print("✅ Least recently used responses evicted")
+
+
+def test_schema_change_invalidates():
+    """Test that responses recorded against an old schema fingerprint are not replayed, and are deleted."""
+    fingerprints = {"dsn": "schema-1"}
+    original = llm_cache.get_derived
+    llm_cache.get_derived = lambda db_connection, factory: fingerprints[db_connection]
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite3")
+            cache = ResponseCache(path, db_connection="dsn")
+            other = ResponseCache(path)
+            calls.clear()
+            EchoModel(cache=cache).invoke([HumanMessage("What is a?")])
+            EchoModel(cache=other).invoke([HumanMessage("What is b?")])
+            EchoModel(cache=cache).invoke([HumanMessage("What is a?")])
+            assert len(calls) == 2
+            fingerprints["dsn"] = "schema-2"
+            EchoModel(cache=cache).invoke([HumanMessage("What is a?")])
+            assert len(calls) == 3
+            # Only the changed database's old answers were dropped.
+            assert cache.stats()["entries"] == 2
+            EchoModel(cache=other).invoke([HumanMessage("What is b?")])
+            assert len(calls) == 3
+    finally:
+        llm_cache.get_derived = original
+    print("✅ Schema change invalidates cached responses")
+
+
+if __name__ == "__main__":
+    test_repeated_run_replayed_from_cache()
+    test_size_eviction()
+    test_schema_change_invalidates()
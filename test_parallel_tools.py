@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that the tool calls of one model response run in parallel up to a limit.
+
+A scripted chat model and a sleeping tool stand in for the model and the database, so this script does not require either.
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import time
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+
+from deepagents import create_deep_agent
+
+
+class ScriptedModel(BaseChatModel):
+    replies: list
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self.replies.pop(0))])
+
+
+class Gauge:
+    """Records the most calls running at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+        # When set, calls also wait for each other, so a limit that is too low breaks it.
+        self.barrier = None
+
+    def __enter__(self):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        if self.barrier is not None:
+            self.barrier.wait()
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.running -= 1
+
+
+gauge = Gauge()
+
+
+@tool
+def slow_lookup(n: int) -> str:
+    """Look up a number slowly."""
+    with gauge:
+        # Later calls finish first, so ordering by completion would be visible.
+        time.sleep(0.05 * (6 - n))
+    return f"result {n}"
+
+
+def _calls(count):
+    return AIMessage(content="", tool_calls=[
+        {"name": "slow_lookup", "args": {"n": i}, "id": f"call-{i}"} for i in range(count)
+    ])
+
+
+INPUT = {"messages": [{"role": "user", "content": "Look up six numbers"}]}
+
+
+def test_parallel_calls_are_capped_and_ordered():
+    """Test that at most max_parallel_tool_calls run at once and results keep the call order."""
+    print("Testing parallel tool calls...")
+    for limit in (1, 3):
+        gauge.peak = 0
+        model = ScriptedModel(replies=[_calls(6), AIMessage(content="Done.")])
+        agent = create_deep_agent([slow_lookup], "Instructions.", model=model, max_parallel_tool_calls=limit)
+        result = agent.invoke(INPUT)
+        results = [m for m in result["messages"] if isinstance(m, ToolMessage)]
+        assert [m.tool_call_id for m in results] == [f"call-{i}" for i in range(6)]
+        assert [m.content for m in results] == [f"result {i}" for i in range(6)]
+        assert gauge.peak == limit, (limit, gauge.peak)
+    print("✅ Tool calls capped and returned in call order")
+
+
+def _subagent_model():
+    return ScriptedModel(replies=[
+        AIMessage(content="", tool_calls=[{"name": "task", "args": {"description": "Look up", "subagent_type": "general-purpose"}, "id": "task-1"}]),
+        _calls(4),
+        AIMessage(content="Looked up."),
+        AIMessage(content="Done."),
+    ])
+
+
+def test_subagents_inherit_the_limit():
+    """Test that a sub-agent's tool calls run under the main agent's limit, in sync and async runs."""
+    runs = [
+        lambda agent: agent.invoke(INPUT),
+        lambda agent: list(agent.stream(INPUT, stream_mode="custom")),
+        lambda agent: asyncio.run(agent.ainvoke(INPUT)),
+    ]
+    for run in runs:
+        gauge.peak = 0
+        # Pairs of calls must overlap to get past the barrier, so a limit below two times out.
+        gauge.barrier = threading.Barrier(2, timeout=5)
+        try:
+            agent = create_deep_agent([slow_lookup], "Instructions.", model=_subagent_model(), max_parallel_tool_calls=2)
+            run(agent)
+        finally:
+            gauge.barrier = None
+        assert gauge.peak == 2, gauge.peak
+    print("✅ Sub-agents share the run's limit")
+
+
+def test_task_calls_do_not_hold_a_slot():
+    """Test that a limit of one still lets a sub-agent's tool calls run, also with a custom stream."""
+    gauge.peak = 0
+    agent = create_deep_agent([slow_lookup], "Instructions.", model=_subagent_model(), max_parallel_tool_calls=1)
+    list(agent.stream(INPUT, stream_mode="custom"))
+    assert gauge.peak == 1, gauge.peak
+
+
+def test_invalid_limit_rejected():
+    """Test that a limit below one is rejected."""
+    try:
+        create_deep_agent([], "Instructions.", model=ScriptedModel(replies=[]), max_parallel_tool_calls=0)
+        raise AssertionError("expected a ValueError")
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    test_parallel_calls_are_capped_and_ordered()
+    test_subagents_inherit_the_limit()
+    test_task_calls_do_not_hold_a_slot()
+    test_invalid_limit_rejected()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the prefetch stage that warms the schema caches when a run starts.
+
+The catalog loaders and tool bodies are replaced with recording fakes, so this script does not require a database connection.
+"""
+
+import sys
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from deepagents import prefetch as prefetch_module
+from deepagents.admission import BACKGROUND
+from deepagents import tools
+from deepagents.singleflight import flight_key
+
+DSN = "postgresql://db/shop"
+
+
+def test_prefetched_result_is_served_once():
+    """Test that a prefetched result answers one call, under any of its keys, and then expires."""
+    print("Testing prefetched results...")
+    prefetched = prefetch_module.Prefetched(ttl=60)
+    warm = Future()
+    warm.set_result(("warm", time.monotonic()))
+    prefetched.add(["public.orders", "orders"], warm)
+    assert prefetched.take("orders") == "warm"
+    assert prefetched.take("public.orders") is None
+
+    stale, failed = Future(), Future()
+    stale.set_result(("warm", time.monotonic() - 61))
+    failed.set_result(("Error: missing", time.monotonic()))
+    prefetched.add(["stale"], stale)
+    prefetched.add(["failed"], failed)
+    assert prefetched.take("stale") is None and prefetched.take("failed") is None
+    assert prefetched.hits == 1
+    print("✅ Prefetched result served once, expired and failed ones ignored")
+
+
+def test_prefetch_warms_hot_tables():
+    """Test that prefetch loads the catalog, table list and hot tables concurrently at background priority."""
+    print("Testing prefetch...")
+    calls = []
+    lock = threading.Lock()
+
+    def record(*args):
+        with lock:
+            calls.append(args)
+
+    def fake_schema(db_connection, table_name, priority, deadline, snapshot):
+        record("schema", table_name, priority, snapshot)
+        return "Error: missing" if table_name == "sales.broken" else f"schema of {table_name}"
+
+    def fake_analyze(db_connection, table_name, analysis_type, refresh, priority, deadline, snapshot, estimate_rows):
+        record("analyze", table_name, analysis_type, priority, estimate_rows)
+        return f"stats of {table_name}"
+
+    patched = {
+        "_postgres_schema": fake_schema,
+        "_postgres_analyze": fake_analyze,
+        "hot_tables": lambda db_connection, n, snapshot: [("public.orders", "orders"), ("sales.broken", None)][:n],
+        "get_schema_index": lambda db_connection: record("index"),
+        "get_join_graph": lambda db_connection: record("join_graph"),
+    }
+    saved = {name: getattr(prefetch_module, name) for name in patched}
+    for name, fake in patched.items():
+        setattr(prefetch_module, name, fake)
+    try:
+        prefetched = prefetch_module.start_prefetch(DSN, "snap-1")
+        prefetched.join(5)
+        assert ("index",) in calls and ("join_graph",) in calls
+        assert ("schema", None, BACKGROUND, "snap-1") in calls
+        # Hot tables are analyzed by their qualified names, without counting rows.
+        assert ("analyze", "public.orders", "basic", BACKGROUND, True) in calls
+
+        # The run's first calls are answered without running the tool, by
+        # qualified or bare name, and only once.
+        assert prefetched.take(flight_key(DSN, "postgres_schema", None, "snap-1")) == "schema of None"
+        assert prefetched.take(flight_key(DSN, "postgres_schema", "orders", "snap-1")) == "schema of public.orders"
+        assert prefetched.take(flight_key(DSN, "postgres_schema", "public.orders", "snap-1")) is None
+        assert prefetched.take(
+            flight_key(DSN, "postgres_analyze", "public.orders", "basic", False, "snap-1")
+        ) == "stats of public.orders"
+        # Errors are not kept, and other snapshots do not see the results.
+        assert prefetched.take(flight_key(DSN, "postgres_schema", "sales.broken", "snap-1")) is None
+        assert prefetched.take(flight_key(DSN, "postgres_analyze", "orders", "basic", False, None)) is None
+        print("✅ Catalog, table list and hot tables prefetched")
+    finally:
+        for name, original in saved.items():
+            setattr(prefetch_module, name, original)
+
+
+def test_tools_take_their_runs_results():
+    """Test that tools serve the prefetched results of their own run only."""
+    print("Testing prefetched results in tool calls...")
+    prefetched = prefetch_module.Prefetched()
+    warm = Future()
+    warm.set_result(("schema of orders", time.monotonic()))
+    prefetched.add([flight_key(DSN, "postgres_schema", "orders", None)], warm)
+    saved = tools._postgres_schema
+    tools._postgres_schema = lambda *args: "fresh"
+
+    def call(config):
+        return tools.postgres_schema.invoke(
+            {"table_name": "orders", "state": {"messages": [], "db_connection": DSN}}, config
+        )
+
+    try:
+        assert call({}) == "fresh"
+        assert call({"configurable": {"prefetched": prefetched}}) == "schema of orders"
+        assert call({"configurable": {"prefetched": prefetched}}) == "fresh"
+    finally:
+        tools._postgres_schema = saved
+    print("✅ Tools served their run's prefetched results once")
+
+
+def test_prefetch_survives_failures():
+    """Test that a failing catalog load or hot-table query does not escape the prefetch."""
+    def fail(*args):
+        raise RuntimeError("database unavailable")
+
+    saved = prefetch_module.get_schema_index, prefetch_module.hot_tables, prefetch_module._postgres_schema
+    prefetch_module.get_schema_index = prefetch_module.hot_tables = fail
+    prefetch_module._postgres_schema = lambda *args: "Error getting schema: database unavailable"
+    try:
+        prefetched = prefetch_module.prefetch(DSN, "snap-2")
+        assert prefetched.take(flight_key(DSN, "postgres_schema", None, "snap-2")) is None
+    finally:
+        prefetch_module.get_schema_index, prefetch_module.hot_tables, prefetch_module._postgres_schema = saved
+
+
+if __name__ == "__main__":
+    test_prefetched_result_is_served_once()
+    test_prefetch_warms_hot_tables()
+    test_tools_take_their_runs_results()
+    test_prefetch_survives_failures()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the per-connection prepared statement cache.
+
+A fake cursor records the SQL it is sent, so this script does not require a database connection.
+"""
+
+import sys
+import os
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from psycopg2.errors import InvalidSqlStatementName
+
+from deepagents.db import PreparedStatementCache, _to_positional
+
+
+class FakeConnection:
+    def __init__(self):
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakeCursor:
+    def __init__(self):
+        self.connection = FakeConnection()
+        self.sent = []
+        self.fail_next_execute = False
+
+    def execute(self, sql, params=None):
+        if self.fail_next_execute and sql.startswith("EXECUTE"):
+            self.fail_next_execute = False
+            raise InvalidSqlStatementName()
+        self.sent.append((sql.split(" (")[0] if sql.startswith("EXECUTE") else sql, params))
+
+
+def test_placeholders_become_positional():
+    """Test the rewrite of psycopg2 placeholders for PREPARE."""
+    assert _to_positional("SELECT * FROM t WHERE a = %s AND b LIKE 'x%%' AND c = %s") == (
+        "SELECT * FROM t WHERE a = $1 AND b LIKE 'x%' AND c = $2"
+    )
+
+
+def test_statements_are_prepared_once():
+    """Test that a statement is prepared on first use and executed by name afterwards."""
+    print("Testing prepare-once...")
+    cache = PreparedStatementCache()
+    cursor = FakeCursor()
+    sql = "SELECT column_name FROM information_schema.columns WHERE table_name = %s"
+    cache.execute(cursor, sql, ("users",))
+    cache.execute(cursor, sql, ("orders",))
+
+    prepares = [s for s, _ in cursor.sent if s.startswith("PREPARE")]
+    executes = [(s, p) for s, p in cursor.sent if s.startswith("EXECUTE")]
+    assert len(prepares) == 1 and prepares[0].endswith("WHERE table_name = $1")
+    name = prepares[0].split()[1]
+    assert executes == [(f"EXECUTE {name}", ("users",)), (f"EXECUTE {name}", ("orders",))]
+    assert (cache.prepares, cache.hits) == (1, 1)
+    print("✅ Statement prepared once")
+
+
+def test_lru_eviction_deallocates():
+    """Test that the least recently used statement is deallocated when the cache is full."""
+    print("Testing LRU eviction...")
+    cache = PreparedStatementCache(max_size=2)
+    cursor = FakeCursor()
+    cache.execute(cursor, "SELECT 1")
+    cache.execute(cursor, "SELECT 2")
+    cache.execute(cursor, "SELECT 1")
+    cache.execute(cursor, "SELECT 3")
+    deallocated = [s for s, _ in cursor.sent if s.startswith("DEALLOCATE")]
+    prepared_2 = next(s for s, _ in cursor.sent if s.startswith("PREPARE") and s.endswith("SELECT 2"))
+    assert deallocated == [f"DEALLOCATE {prepared_2.split()[1]}"]
+    assert len(cache) == 2
+    print("✅ Least recently used statement deallocated")
+
+
+def test_lost_statements_are_reprepared():
+    """Test recovery when the server session no longer has the statement."""
+    cache = PreparedStatementCache()
+    cursor = FakeCursor()
+    cache.execute(cursor, "SELECT 1")
+    cursor.fail_next_execute = True
+    cache.execute(cursor, "SELECT 1")
+    assert cursor.connection.rollbacks == 1
+    assert [s for s, _ in cursor.sent if s.startswith("PREPARE")] == [cursor.sent[0][0]] * 2
+
+
+def test_disabled_cache_runs_plain_sql():
+    cache = PreparedStatementCache(max_size=0)
+    cursor = FakeCursor()
+    cache.execute(cursor, "SELECT %s", (1,))
+    assert cursor.sent == [("SELECT %s", (1,))]
+
+
+if __name__ == "__main__":
+    test_placeholders_become_positional()
+    test_statements_are_prepared_once()
+    test_lru_eviction_deallocates()
+    test_lost_statements_are_reprepared()
+    test_disabled_cache_runs_plain_sql()
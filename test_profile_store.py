@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the local table-profile store used by postgres_analyze.
+
+This script uses a temporary SQLite file and does not require a database connection.
+"""
+
+import sys
+import os
+import tempfile
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from deepagents.profile_store import ProfileStore, database_identity, default_profile_store_path, staleness_signature
+
+
+SIGNATURE = {
+    "n_mod_since_analyze": 0,
+    "n_live_tup": 10,
+    "last_analyze": "2025-01-01T00:00:00+00:00",
+    "last_autoanalyze": None,
+}
+
+
+def test_fresh_profiles_are_served():
+    """Test that a profile is served while the staleness signature is unchanged."""
+    print("Testing profile store round trip...")
+    store = ProfileStore(os.path.join(tempfile.mkdtemp(), "nested", "profiles.sqlite3"))
+    profile = {"row_count": 10, "table_size": "8192 bytes", "columns": [["id", -1.0, 1.0]]}
+    store.put("cluster/1/db", 16384, "basic", profile, SIGNATURE)
+
+    stored = store.get_fresh("cluster/1/db", 16384, "basic", dict(SIGNATURE))
+    assert stored is not None
+    assert stored.profile == profile
+
+    assert store.get_fresh("cluster/1/db", 16384, "detailed", SIGNATURE) is None
+    assert store.get_fresh("cluster/2/db", 16384, "basic", SIGNATURE) is None
+    print("✅ Fresh profile served")
+
+
+def test_changed_tables_are_stale():
+    """Test that writes or a new ANALYZE invalidate the stored profile."""
+    print("Testing staleness detection...")
+    store = ProfileStore(os.path.join(tempfile.mkdtemp(), "profiles.sqlite3"))
+    store.put("cluster/1/db", 16384, "basic", {"row_count": 10}, SIGNATURE)
+
+    modified = {**SIGNATURE, "n_mod_since_analyze": 3}
+    assert store.get_fresh("cluster/1/db", 16384, "basic", modified) is None
+
+    reanalyzed = {**SIGNATURE, "last_autoanalyze": "2025-01-02T00:00:00+00:00"}
+    assert store.get_fresh("cluster/1/db", 16384, "basic", reanalyzed) is None
+
+    # Relations without statistics are never served from the store.
+    assert store.get_fresh("cluster/1/db", 16384, "basic", {}) is None
+    print("✅ Stale profiles detected")
+
+
+def test_standby_statistics_are_not_trusted():
+    """Test that a table's statistics on a hot standby give no signature, so the store is bypassed."""
+
+    class FakeCursor:
+        def __init__(self, in_recovery):
+            self.row = (0, 10, None, None, in_recovery)
+
+        def execute(self, sql, params=None):
+            assert "pg_is_in_recovery()" in sql
+
+        def fetchone(self):
+            return self.row
+
+    assert staleness_signature(FakeCursor(False), 16384) == {
+        "n_mod_since_analyze": 0, "n_live_tup": 10, "last_analyze": None, "last_autoanalyze": None,
+    }
+    assert staleness_signature(FakeCursor(True), 16384) == {}
+
+
+def test_roles_do_not_share_profiles():
+    """Test that two roles on the same database get different identities, so neither is served the other's samples."""
+    print("Testing per-role profile identities...")
+
+    class FakeConnection:
+        def __init__(self, role_oid):
+            self.role_oid = role_oid
+
+        def cursor(self):
+            return FakeCursor(self.role_oid)
+
+        def rollback(self):
+            pass
+
+    class FakeCursor:
+        def __init__(self, role_oid):
+            self.role_oid = role_oid
+            self.sql = None
+
+        def execute(self, sql, params=None):
+            self.sql = sql
+
+        def fetchone(self):
+            if "pg_control_system" in self.sql:
+                return (7000000000000000001,)
+            return ("shop", 16384, "10.0.0.5", 5432, self.role_oid)
+
+        def close(self):
+            pass
+
+    analyst = database_identity(FakeConnection(16401), "postgresql://analyst@primary/shop")
+    replica = database_identity(FakeConnection(16401), "postgresql://analyst@replica/shop")
+    restricted = database_identity(FakeConnection(16402), "postgresql://restricted@primary/shop")
+    assert analyst == replica
+    assert analyst != restricted
+
+    store = ProfileStore(os.path.join(tempfile.mkdtemp(), "profiles.sqlite3"))
+    store.put(analyst, 16384, "detailed", {"samples": ["secret"]}, SIGNATURE)
+    assert store.get_fresh(replica, 16384, "detailed", SIGNATURE) is not None
+    assert store.get_fresh(restricted, 16384, "detailed", SIGNATURE) is None
+    print("✅ Profiles kept per role")
+
+
+def test_disabled_store():
+    """Test that the store is off unless DEEPAGENTS_PROFILE_STORE is set, and a store without a path stores nothing."""
+    saved = os.environ.pop("DEEPAGENTS_PROFILE_STORE", None)
+    try:
+        assert default_profile_store_path() is None
+        os.environ["DEEPAGENTS_PROFILE_STORE"] = ""
+        assert default_profile_store_path() is None
+        os.environ["DEEPAGENTS_PROFILE_STORE"] = "/tmp/profiles.sqlite3"
+        assert default_profile_store_path() == "/tmp/profiles.sqlite3"
+    finally:
+        os.environ.pop("DEEPAGENTS_PROFILE_STORE", None)
+        if saved is not None:
+            os.environ["DEEPAGENTS_PROFILE_STORE"] = saved
+    store = ProfileStore(None)
+    assert not store.enabled
+    store.put("cluster/1/db", 1, "basic", {}, SIGNATURE)
+    assert store.get("cluster/1/db", 1, "basic") is None
+
+
+if __name__ == "__main__":
+    test_fresh_profiles_are_served()
+    test_changed_tables_are_stale()
+    test_standby_statistics_are_not_trusted()
+    test_roles_do_not_share_profiles()
+    test_disabled_store()
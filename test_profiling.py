@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that agent runs can be profiled, with time attributed to nodes and tools.
+
+A scripted chat model and a busy tool stand in for the model and the database, so this script does not require either.
+"""
+
+import sys
+import os
+import asyncio
+import json
+import tempfile
+import time
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+
+from deepagents import create_deep_agent
+from deepagents.profiling import profile_options, request_profile_options
+
+
+class ScriptedModel(BaseChatModel):
+    replies: list
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self.replies.pop(0))])
+
+
+@tool
+def busy_lookup(n: int) -> str:
+    """Look up a number slowly."""
+    deadline = time.perf_counter() + 0.2
+    while time.perf_counter() < deadline:
+        pass
+    return f"result {n}"
+
+
+def _model():
+    return ScriptedModel(replies=[
+        AIMessage(content="", tool_calls=[{"name": "busy_lookup", "args": {"n": 1}, "id": "call-1"}]),
+        AIMessage(content="Done."),
+    ])
+
+
+INPUT = {"messages": [{"role": "user", "content": "Look up a number"}]}
+
+
+def test_profile_written_per_run():
+    """Test that a profiled run writes a speedscope profile attributing time to the tool."""
+    print("Testing run profiles...")
+    with tempfile.TemporaryDirectory() as directory:
+        agent = create_deep_agent([busy_lookup], "Instructions.", model=_model(), profile={"dir": directory})
+        agent.invoke(INPUT)
+        files = os.listdir(directory)
+        assert len(files) == 1 and files[0].endswith(".speedscope.json"), files
+        with open(os.path.join(directory, files[0])) as f:
+            profile = json.load(f)
+        names = [frame["name"] for frame in profile["shared"]["frames"]]
+        assert "node:tools" in names and "tool:busy_lookup" in names, names
+        sampled = profile["profiles"][0]
+        assert len(sampled["samples"]) == len(sampled["weights"]) > 0
+        # Most of the run is spent in the tool.
+        tool_frame = names.index("tool:busy_lookup")
+        in_tool = sum(w for s, w in zip(sampled["samples"], sampled["weights"]) if tool_frame in s)
+        assert in_tool >= 0.1, in_tool
+        print("✅ Speedscope profile written with tool attribution")
+
+
+def test_profile_toggled_per_request():
+    """Test that the run config switches profiling on for one request only."""
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DEEPAGENTS_PROFILE_DIR"] = directory
+        try:
+            agent = create_deep_agent([busy_lookup], "Instructions.", model=_model())
+            agent.invoke(INPUT, {"configurable": {"profile": {"format": "collapsed"}}})
+        finally:
+            del os.environ["DEEPAGENTS_PROFILE_DIR"]
+        [name] = os.listdir(directory)
+        assert name.endswith(".collapsed.txt"), name
+        with open(os.path.join(directory, name)) as f:
+            lines = f.read().splitlines()
+        assert any(line.startswith("run;node:tools;tool:busy_lookup;") for line in lines), lines[:3]
+        assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines)
+
+        agent = create_deep_agent([busy_lookup], "Instructions.", model=_model(), profile={"dir": directory})
+        agent.invoke(INPUT, {"configurable": {"profile": False}})
+        assert os.listdir(directory) == [name]
+    print("✅ Profiling switched per request")
+
+
+def test_every_entry_point_profiled():
+    """Test that stream, ainvoke and astream runs are profiled like invoke, once each."""
+    with tempfile.TemporaryDirectory() as directory:
+        agent = create_deep_agent([busy_lookup], "Instructions.", model=_model(), profile={"dir": directory})
+        list(agent.stream(INPUT))
+        agent = create_deep_agent([busy_lookup], "Instructions.", model=_model(), profile={"dir": directory})
+        asyncio.run(agent.ainvoke(INPUT))
+
+        async def consume():
+            return [chunk async for chunk in agent.astream(INPUT)]
+
+        agent = create_deep_agent([busy_lookup], "Instructions.", model=_model(), profile={"dir": directory})
+        asyncio.run(consume())
+        assert len(os.listdir(directory)) == 3, os.listdir(directory)
+    print("✅ stream, ainvoke and astream profiled")
+
+
+def test_run_started_during_a_stream_is_set_up():
+    """Test that an invoke made while a stream is partly consumed gets its own setup."""
+    # The stream's first chunk is its input, so the inner run takes the first replies.
+    inner, outer = _model().replies, _model().replies
+    model = ScriptedModel(replies=[*inner[:1], AIMessage(content="Inner."), *outer[:1], AIMessage(content="Outer.")])
+    with tempfile.TemporaryDirectory() as directory:
+        agent = create_deep_agent([busy_lookup], "Instructions.", model=model, profile={"dir": directory})
+        stream = agent.stream(INPUT, stream_mode="values")
+        next(stream)
+        # A string input only works once the run is set up.
+        result = agent.invoke("Look up another number")
+        assert result["messages"][-1].content == "Inner."
+        assert len(os.listdir(directory)) == 1
+        chunks = list(stream)
+        assert chunks[-1]["messages"][-1].content == "Outer."
+        assert len(os.listdir(directory)) == 2
+    print("✅ Interleaved runs set up separately")
+
+
+def test_request_cannot_choose_profile_path():
+    """Test that a request can switch profiling and its format, but not where profiles are written."""
+    configured = profile_options({"dir": "/srv/profiles", "interval": 0.05})
+    options = request_profile_options("collapsed", configured)
+    assert options == {**configured, "format": "collapsed"}
+    assert request_profile_options({"format": "collapsed"}, None)["dir"] is None
+    assert request_profile_options(False, configured) is None
+    for value in ({"path": "/etc/cron.d/job"}, {"format": "collapsed", "dir": "/tmp"}):
+        agent = create_deep_agent([busy_lookup], "Instructions.", model=_model())
+        try:
+            agent.invoke(INPUT, {"configurable": {"profile": value}})
+            raise AssertionError("expected a ValueError")
+        except ValueError:
+            pass
+    print("✅ Per-request profile limited to on/off and format")
+
+
+def test_invalid_profile_rejected():
+    """Test that an unknown profile format is rejected."""
+    assert profile_options(False) is None
+    assert profile_options("collapsed")["format"] == "collapsed"
+    try:
+        create_deep_agent([], "Instructions.", model=ScriptedModel(replies=[]), profile="pprof")
+        raise AssertionError("expected a ValueError")
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    test_profile_written_per_run()
+    test_profile_toggled_per_request()
+    test_every_entry_point_profiled()
+    test_run_started_during_a_stream_is_set_up()
+    test_request_cannot_choose_profile_path()
+    test_invalid_profile_rejected()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that long sub-agent reports are condensed and kept retrievable.
+
+Fake chat models stand in for the agent and the summarizer, so this script does not require a model API.
+"""
+
+import sys
+import os
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from deepagents import create_deep_agent
+from deepagents.reports import condense_report, report_store, truncate_report
+from deepagents.tools import read_subagent_result
+
+REPORT = (
+    "# Order analysis\n\nOrders grew 12% in Q3.\nMost growth came from repeat customers.\n\n"
+    "## Data\n| month | orders |\n|---|---|\n"
+    + "\n".join(f"| 2024-{m:02d} | {1000 + m * 37} |" for m in range(1, 13)) * 20
+    + "\n\n## Conclusion\nGrowth is driven by the EU region.\nRecommend expanding EU stock."
+)
+
+
+class ToolCallingFake(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def test_truncation_keeps_outline():
+    """Test that truncation keeps headings, paragraph openings and the conclusion."""
+    print("Testing structure-preserving truncation...")
+    short = truncate_report(REPORT, 500)
+    assert len(short) <= 500
+    for kept in ("# Order analysis", "Orders grew 12% in Q3.", "## Data", "| month | orders |",
+                 "## Conclusion", "Recommend expanding EU stock."):
+        assert kept in short, kept
+    assert "[...]" in short
+    assert truncate_report("short", 500) == "short"
+    print(f"✅ {len(REPORT)} characters truncated to {len(short)}")
+
+
+def test_condensed_report_is_retrievable():
+    """Test that the full report is stored behind the handle in the footer."""
+    condensed = condense_report(REPORT, 800)
+    assert len(condensed) <= 800
+    handle = condensed.rsplit("handle='", 1)[1].split("'")[0]
+    first = read_subagent_result.invoke({"handle": handle, "length": 100})
+    assert first.startswith(REPORT[:100]) and "continue with offset=100" in first
+    rest = read_subagent_result.invoke({"handle": handle, "offset": 100, "length": len(REPORT)})
+    assert rest.startswith(REPORT[100:]) and rest.endswith(f"of {len(REPORT)}.]")
+    assert "Unknown or expired" in read_subagent_result.invoke({"handle": "rep_missing"})
+
+
+def test_summarizer_and_fallback():
+    """Test condensing with a summarizer model, and truncation when it fails."""
+    summarizer = GenericFakeChatModel(messages=iter([AIMessage(content="EU drove 12% Q3 order growth.")]))
+    condensed = condense_report(REPORT, 400, summarizer)
+    assert condensed.startswith("EU drove 12% Q3 order growth.\n\n[Condensed from")
+
+    class FailingModel:
+        def invoke(self, messages):
+            raise RuntimeError("model unavailable")
+
+    condensed = condense_report(REPORT, 600, FailingModel())
+    assert condensed.startswith("# Order analysis") and len(condensed) <= 600
+
+
+def test_task_tool_applies_per_subagent_budget():
+    """Test that the task tool condenses a sub-agent's oversized final message."""
+    print("Testing task tool output budget...")
+    model = ToolCallingFake(messages=iter([
+        AIMessage(content="", tool_calls=[{"name": "task", "args": {"description": "Analyze orders", "subagent_type": "analyst"}, "id": "call-1"}]),
+        AIMessage(content=REPORT),
+        AIMessage(content="Orders grew 12%."),
+    ]))
+    analyst = {"name": "analyst", "description": "Analyzes data", "prompt": "Analyze.", "max_output_chars": 1000}
+    agent = create_deep_agent([], "Instructions.", model=model, subagents=[analyst])
+    result = agent.invoke({"messages": [{"role": "user", "content": "How are orders doing?"}]})
+    tool_message = result["messages"][2]
+    assert len(tool_message.content) <= 1000
+    assert "read_subagent_result(handle='rep_" in tool_message.content
+    assert len(report_store._reports) >= 1
+    print(f"✅ Sub-agent report of {len(REPORT)} characters returned as {len(tool_message.content)}")
+
+
+if __name__ == "__main__":
+    test_truncation_keeps_outline()
+    test_condensed_report_is_retrievable()
+    test_summarizer_and_fallback()
+    test_task_tool_applies_per_subagent_budget()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test script to verify spilled query results can be paged through by handle.
+
+This script does not require a database connection.
+"""
+
+import sys
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from deepagents.formatting import column_formatters, format_table
+from deepagents.result_store import ResultStore
+from deepagents.tools import postgres_fetch_page, result_store
+
+
+def test_spill_and_fetch_pages():
+    """Test that pages are served from the spill file, including across blocks."""
+    print("Testing result spilling and paging...")
+
+    store = ResultStore(directory=tempfile.mkdtemp(), block_size=7)
+    rows = ((i, f"name-{i}", Decimal("1.5") * i, None) for i in range(100))
+    spilled = store.spill(["id", "name", "amount", "note"], rows)
+    assert spilled.row_count == 100
+
+    page = store.fetch_page(spilled.handle, 33, 4)
+    assert page.column_names == ["id", "name", "amount", "note"]
+    assert page.total_rows == 100
+    assert page.type_oids is None
+    assert page.rows == [[33, "name-33", "49.5", None], [34, "name-34", "51.0", None],
+                    [35, "name-35", "52.5", None], [36, "name-36", "54.0", None]]
+
+    page = store.fetch_page(spilled.handle, 98, 10)
+    assert [row[0] for row in page.rows] == [98, 99]
+
+    page = store.fetch_page(spilled.handle, 500, 10)
+    assert page.rows == []
+    print("✅ Pages read correctly")
+
+
+def test_handle_eviction():
+    """Test that the oldest handles are evicted and their files removed."""
+    print("Testing handle eviction...")
+
+    directory = tempfile.mkdtemp()
+    store = ResultStore(directory=directory, max_handles=2)
+    first = store.spill(["x"], [(1,)])
+    store.spill(["x"], [(2,)])
+    store.spill(["x"], [(3,)])
+
+    try:
+        store.fetch_page(first.handle, 0, 1)
+        assert False, "Evicted handle should be unknown"
+    except KeyError:
+        pass
+    assert len(os.listdir(directory)) == 2
+    print("✅ Oldest handle evicted")
+
+
+def test_fetch_page_tool():
+    """Test the postgres_fetch_page tool output."""
+    print("Testing postgres_fetch_page tool...")
+
+    spilled = result_store.spill(["id", "label"], [(i, f"row {i}") for i in range(10)])
+    result = postgres_fetch_page.invoke({"handle": spilled.handle, "offset": 8, "n": 5})
+    print(f"Result: {result}")
+    assert "8\trow 8" in result
+    assert "Rows 8-9 of 10." in result
+
+    result = postgres_fetch_page.invoke({"handle": "res_missing"})
+    assert "Unknown or expired result handle" in result
+    print("✅ postgres_fetch_page works")
+
+
+def test_pages_formatted_like_the_preview():
+    """Test that pages keep the column types, so they render as postgres_query's preview did."""
+    column_names = ["id", "doc", "tags", "data", "day", "price", "note"]
+    # int4, jsonb, text[], bytea, date, numeric, text
+    type_oids = [23, 3802, 1009, 17, 1082, 1700, 25]
+    rows = [
+        (1, {"a": [1, None], "ok": True}, ["x y", None], memoryview(b"\x00\xff"), date.max, Decimal("1.50"), "n" * 150),
+        (2, None, [], b"", date(2024, 1, 31), None, None),
+    ]
+    spilled = result_store.spill(column_names, rows, type_oids)
+    result = postgres_fetch_page.invoke({"handle": spilled.handle, "n": 2})
+    expected = format_table(column_names, rows, column_formatters([(name, oid) for name, oid in zip(column_names, type_oids)]))
+    assert result.splitlines()[:4] == expected, result
+    assert '{"a": [1, null], "ok": true}\t{"x y",NULL}\t\\x00ff\tinfinity\t1.50\t' in result, result
+    print("✅ Pages formatted by column type")
+
+
+if __name__ == "__main__":
+    test_spill_and_fetch_pages()
+    test_handle_eviction()
+    test_fetch_page_tool()
+    test_pages_formatted_like_the_preview()
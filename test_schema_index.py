@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the in-process schema search index.
+
+This script builds the index from a synthetic catalog, so it does not require
+a database connection.
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from deepagents import catalog as catalog_module
+from deepagents.catalog import Catalog, ColumnInfo, TableInfo, get_catalog
+from deepagents.schema_index import SchemaIndex, tokenize
+from deepagents.tools import postgres_search_schema
+from deepagents.state import DeepAgentState
+
+
+def _table(oid, name, columns, comment=None):
+    return TableInfo(
+        oid, "public", name, comment,
+        [ColumnInfo(col, "integer" if col.endswith("_id") else "text", True, None, i == 0)
+         for i, col in enumerate(columns)],
+    )
+
+
+CATALOG = Catalog([
+    _table(1, "customers", ["customer_id", "full_name", "email", "shipping_address"]),
+    _table(2, "orders", ["order_id", "customer_id", "status", "placed_at"]),
+    _table(3, "orderItems", ["order_item_id", "order_id", "product_id", "quantity"]),
+    _table(4, "products", ["product_id", "title", "price"]),
+    _table(5, "tickets", ["ticket_id", "body"], comment="Customer support requests and complaints"),
+], time.time())
+
+
+def test_tokenize():
+    """Test that identifiers are split on underscores and camel case."""
+    print("Testing tokenizer...")
+    assert tokenize("orderItems_v2") == ["order", "items", "v", "2"]
+    assert tokenize("HTTPServer") == ["http", "server"]
+    assert tokenize("Kundenstraße_Nr2") == ["kundenstraße", "nr", "2"]
+    assert tokenize("заказы.ДатаЗаказа") == ["заказы", "дата", "заказа"]
+    print("✅ Tokenizer works")
+
+
+def test_tables_without_tokens():
+    """Test that an index whose tables give no tokens at all is built and finds nothing."""
+    index = SchemaIndex(Catalog([_table(1, "_", ["__"]), _table(2, "$", [])], time.time()))
+    assert index.search("orders") == []
+    index = SchemaIndex(Catalog([_table(1, "bestellungen", ["straße"])], time.time()))
+    assert index.search("strasse straße")[0].matched_columns == ["straße"]
+
+
+def test_search_ranking():
+    """Test that table names, columns, comments and fuzzy matches rank sensibly."""
+    print("Testing schema search ranking...")
+    index = SchemaIndex(CATALOG)
+
+    hits = index.search("order items", k=2)
+    assert hits[0].table.name == "orderItems"
+
+    hits = index.search("customer", k=5)
+    assert hits[0].table.name == "customers"
+    assert "orders" in [hit.table.name for hit in hits]
+
+    hits = index.search("complaints", k=1)
+    assert hits[0].table.name == "tickets"
+
+    hits = index.search("shipping", k=1)
+    assert hits[0].table.name == "customers"
+    assert hits[0].matched_columns == ["shipping_address"]
+
+    assert index.search("zzzz", k=3) == []
+    print("✅ Search ranking works")
+
+
+def test_slow_catalog_load_blocks_only_its_database():
+    """Test that a catalog load in progress for one database does not hold up another's."""
+    loading, release = threading.Event(), threading.Event()
+
+    class FakePool:
+        def __init__(self, dsn):
+            self.dsn = dsn
+
+        def acquire(self):
+            return self
+
+        def close(self):
+            pass
+
+    def load(conn):
+        if conn.dsn == "slow":
+            loading.set()
+            release.wait(5)
+        return Catalog([], time.time())
+
+    saved = catalog_module.get_pool, catalog_module.load_catalog
+    catalog_module.get_pool, catalog_module.load_catalog = FakePool, load
+    try:
+        catalog_module.invalidate_catalog()
+        slow = threading.Thread(target=get_catalog, args=("slow",))
+        slow.start()
+        assert loading.wait(5)
+        started = time.monotonic()
+        get_catalog("fast")
+        assert time.monotonic() - started < 1.0
+        release.set()
+        slow.join()
+    finally:
+        release.set()
+        catalog_module.get_pool, catalog_module.load_catalog = saved
+        catalog_module.invalidate_catalog()
+
+
+def test_search_tool_without_db():
+    """Test that postgres_search_schema handles a missing connection."""
+    print("Testing postgres_search_schema without database connection...")
+    state = DeepAgentState(messages=[])
+    result = postgres_search_schema.invoke({"query": "orders", "state": state})
+    assert "No database connection available" in result
+    print("✅ Missing connection handled")
+
+
+if __name__ == "__main__":
+    test_tokenize()
+    test_tables_without_tokens()
+    test_search_ranking()
+    test_slow_catalog_load_blocks_only_its_database()
+    test_search_tool_without_db()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script to verify single-flight coalescing of identical concurrent calls.
+
+This script does not require a database connection.
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from deepagents.singleflight import SingleFlight, flight_key
+
+
+def test_flight_keys_are_normalized():
+    """Test that formatting differences do not split identical calls."""
+    print("Testing key normalization...")
+    dsn = "postgresql://localhost/db"
+    assert flight_key(dsn, "SELECT  *\n  FROM users", 1) == flight_key(dsn, "SELECT * FROM users", 1)
+    assert flight_key(dsn, "postgres_schema", "users") != flight_key(dsn, "postgres_schema", "orders")
+    assert flight_key(dsn, "postgres_schema", None) != flight_key("postgresql://other/db", "postgres_schema", None)
+    print("✅ Keys normalized")
+
+
+def test_threads_share_one_call():
+    """Test that concurrent threads with the same key run the function once."""
+    print("Testing threaded coalescing...")
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return "result"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", slow)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flight.do("key", slow))) for _ in range(8)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ["result"] * 9
+    assert flight.coalesced == 8
+
+    # Nothing is cached once the call has finished.
+    assert flight.do("key", lambda: "again") == "again"
+    print("✅ Threads coalesced onto one call")
+
+
+def test_errors_reach_every_waiter():
+    """Test that an exception from the shared call is raised in every caller."""
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("key", failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=call)
+    follower.start()
+    leader.join()
+    follower.join()
+    assert errors == ["boom", "boom"]
+
+
+if __name__ == "__main__":
+    test_flight_keys_are_normalized()
+    test_threads_share_one_call()
+    test_errors_reach_every_waiter()
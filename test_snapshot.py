@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that pooled connections read from an exported snapshot.
+
+Connections are fake objects that record the SQL they are sent, so this script does not require a database connection.
+"""
+
+import sys
+import os
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import psycopg2
+
+from deepagents import db
+from deepagents.db import ConnectionManager
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, sql, params=None):
+        if sql.startswith("SET TRANSACTION SNAPSHOT") and params[0] == "expired":
+            raise psycopg2.OperationalError("invalid snapshot identifier")
+        self.connection.sent.append(sql)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, dsn):
+        self.closed = 0
+        self.sent = []
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.sent.append("ROLLBACK")
+
+    def close(self):
+        self.closed = 1
+
+
+def _pool():
+    manager = ConnectionManager(max_open_connections=2)
+    pool = manager.pool("postgresql://db/shop")
+    pool.admission.probe = None
+    return pool
+
+
+def test_snapshot_survives_rollback():
+    """Test that a snapshot is set on checkout and again after every rollback, but not after checkin."""
+    print("Testing snapshot checkout...")
+    saved, db.psycopg2.connect = db.psycopg2.connect, FakeConnection
+    try:
+        pool = _pool()
+        with pool.connection(snapshot="00000003-0000001B-1") as conn:
+            raw = conn.conn
+            conn.cursor().execute("SELECT 1")
+            conn.rollback()
+        assert raw.sent == [
+            "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY",
+            "SET TRANSACTION SNAPSHOT %s",
+            "SELECT 1",
+            "ROLLBACK",
+            "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY",
+            "SET TRANSACTION SNAPSHOT %s",
+            "ROLLBACK",
+        ]
+
+        raw.sent.clear()
+        with pool.connection() as conn:
+            assert conn.conn is raw and conn.snapshot is None
+            conn.rollback()
+        assert raw.sent == ["ROLLBACK", "ROLLBACK"]
+        print("✅ Snapshot reapplied after rollback and cleared on checkin")
+    finally:
+        db.psycopg2.connect = saved
+
+
+def test_unknown_snapshot_releases_connection():
+    """Test that a connection is given back when its snapshot cannot be imported."""
+    saved, db.psycopg2.connect = db.psycopg2.connect, FakeConnection
+    try:
+        pool = _pool()
+        try:
+            pool.acquire(snapshot="expired")
+            raise AssertionError("expected the snapshot to be rejected")
+        except psycopg2.OperationalError:
+            pass
+        assert pool.in_use == 0 and len(pool._idle) == 1
+        assert pool.admission.metrics()["in_flight"] == 0
+    finally:
+        db.psycopg2.connect = saved
+
+
+def test_dedicated_connection_uses_budget():
+    """Test that a dedicated connection counts against the global budget until closed."""
+    saved, db.psycopg2.connect = db.psycopg2.connect, FakeConnection
+    try:
+        pool = _pool()
+        with pool.dedicated() as conn:
+            assert pool.manager.open_connections == 1
+            assert not pool._idle
+        assert conn.closed and pool.manager.open_connections == 0
+    finally:
+        db.psycopg2.connect = saved
+
+
+if __name__ == "__main__":
+    test_snapshot_survives_rollback()
+    test_unknown_snapshot_releases_connection()
+    test_dedicated_connection_uses_budget()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that state channel sizes are tracked per step and session, and that big histories are compacted.
+
+A scripted chat model and a tool returning a large result stand in for the model and the database, so this script does not require either.
+"""
+
+import sys
+import os
+import warnings
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+
+from deepagents import create_deep_agent
+from deepagents.state_size import StateSizeWarning, StateTracker, channel_sizes, message_compactor
+
+
+class ScriptedModel(BaseChatModel):
+    replies: list
+    seen: list = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.seen.append(len(messages))
+        return ChatResult(generations=[ChatGeneration(message=self.replies.pop(0))])
+
+
+@tool
+def big_lookup(n: int) -> str:
+    """Look up a large result."""
+    return f"row {n} " * 2000
+
+
+def _lookups(steps):
+    replies = [
+        AIMessage(content="", tool_calls=[{"name": "big_lookup", "args": {"n": i}, "id": f"call-{i}"}])
+        for i in range(steps)
+    ]
+    return replies + [AIMessage(content="Done.")]
+
+
+INPUT = {"messages": [{"role": "user", "content": "Look up some rows"}]}
+
+
+def test_sizes_tracked_per_step_and_session():
+    """Test that every model step records channel sizes and the session's high-water marks grow."""
+    print("Testing state size tracking...")
+    tracker = StateTracker(trace_allocations=True)
+    try:
+        agent = create_deep_agent([big_lookup], "Instructions.", model=ScriptedModel(replies=_lookups(3)))
+        agent.invoke(INPUT, {"callbacks": [tracker], "configurable": {"thread_id": "session-1"}})
+    finally:
+        tracker.close()
+    steps = [step for step in tracker.steps if step.node == "agent"]
+    assert len(steps) == 4, len(steps)
+    assert all(step.session == "session-1" for step in steps)
+    messages = [step.channels["messages"] for step in steps]
+    assert [size.items for size in messages] == [1, 3, 5, 7]
+    assert all(a.serialized < b.serialized for a, b in zip(messages, messages[1:]))
+    assert all(size.memory > size.serialized > 0 for size in messages)
+    marks = tracker.high_water["session-1"]
+    assert marks["messages"] == messages[-1].serialized and marks["total"] >= marks["messages"]
+    assert {allocation.node for allocation in tracker.allocations} >= {"agent", "tools"}
+    assert "messages" in tracker.report("session-1")
+    print("✅ Channel sizes and high-water marks recorded")
+
+
+def test_threshold_warns_once_per_session():
+    """Test that crossing a threshold warns once per session and channel, or calls on_threshold."""
+    tracker = StateTracker(thresholds={"messages": 10_000})
+    agent = create_deep_agent([big_lookup], "Instructions.", model=ScriptedModel(replies=_lookups(3)))
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        agent.invoke(INPUT, {"callbacks": [tracker], "configurable": {"thread_id": "session-2"}})
+    assert [w.category for w in caught if issubclass(w.category, StateSizeWarning)] == [StateSizeWarning]
+
+    events = []
+    tracker = StateTracker(thresholds={"total": 10_000, "todos": 10_000}, on_threshold=events.append)
+    agent = create_deep_agent([big_lookup], "Instructions.", model=ScriptedModel(replies=_lookups(3)))
+    agent.invoke(INPUT, {"callbacks": [tracker]})
+    assert [(event.channel, event.node) for event in events] == [("total", "agent")]
+    assert events[0].size > events[0].threshold
+    print("✅ Thresholds reported once")
+
+
+def test_sizes_of_unserializable_channels():
+    """Test that a channel a checkpointer cannot store is reported without a serialized size."""
+    sizes = channel_sizes({"messages": [HumanMessage("hi")], "handle": object()})
+    assert sizes["messages"].serialized > 0 and sizes["messages"].items == 1
+    assert sizes["handle"].serialized is None and sizes["handle"].memory > 0
+
+
+def test_history_compacted_over_limit():
+    """Test that max_message_bytes keeps the task and the latest messages once the history is too big."""
+    model = ScriptedModel(replies=_lookups(12), seen=[])
+    agent = create_deep_agent([big_lookup], "Instructions.", model=model, max_message_bytes=50_000)
+    result = agent.invoke(INPUT)
+    messages = result["messages"]
+    assert messages[0].content == "Look up some rows"
+    assert len(messages) < 26, len(messages)
+    assert not isinstance(messages[1], ToolMessage)
+    assert max(model.seen) <= 22, model.seen
+
+    compact = message_compactor(100, keep=2)
+    history = [
+        HumanMessage("task"),
+        AIMessage(content="", tool_calls=[{"name": "big_lookup", "args": {"n": i}, "id": f"c{i}"} for i in range(3)]),
+        *[ToolMessage(content="x" * 100, tool_call_id=f"c{i}") for i in range(3)],
+    ]
+    kept = compact({"messages": history})["messages"][1:]
+    assert [m.content for m in kept[1:]] == [m.content for m in history[1:]] and kept[0].content == "task"
+    assert compact({"messages": history[:2]}) == {}
+    print("✅ Message history compacted")
+
+
+if __name__ == "__main__":
+    test_sizes_tracked_per_step_and_session()
+    test_threshold_warns_once_per_session()
+    test_sizes_of_unserializable_channels()
+    test_history_compacted_over_limit()
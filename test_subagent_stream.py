@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that sub-agent progress is streamed through the task tool.
+
+A scripted chat model stands in for the agents, so this script does not require a model API.
+"""
+
+import sys
+import os
+import asyncio
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from deepagents import create_deep_agent, sub_agent
+
+
+class ScriptedModel(BaseChatModel):
+    replies: list
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self.replies.pop(0))])
+
+
+def _agent():
+    model = ScriptedModel(replies=[
+        AIMessage(content="", tool_calls=[{"name": "task", "args": {"description": "Plan the analysis", "subagent_type": "analyst"}, "id": "task-1"}]),
+        AIMessage(content="", tool_calls=[{"name": "write_todos", "args": {"todos": [{"content": "Profile orders", "status": "pending"}]}, "id": "todo-1"}]),
+        AIMessage(content="", tool_calls=[{"name": "write_todos", "args": {"ops": [{"op": "update", "id": "1", "status": "in_progress"}]}, "id": "todo-2"}]),
+        AIMessage(content="Planned one step."),
+        AIMessage(content="The analyst planned one step."),
+    ])
+    analyst = {"name": "analyst", "description": "Plans analyses", "prompt": "Plan."}
+    return create_deep_agent([], "Instructions.", model=model, subagents=[analyst])
+
+
+INPUT = {"messages": [{"role": "user", "content": "Plan an analysis"}]}
+EXPECTED_EVENTS = ["tool_call", "tool_result", "todos", "tool_call", "tool_result", "todos", "token"]
+
+
+def test_subagent_events_are_streamed():
+    """Test that the sub-agent's tool calls, todos and output reach the custom stream, tagged by name."""
+    print("Testing streamed sub-agent events...")
+    events, final = [], None
+    for mode, chunk in _agent().stream(INPUT, stream_mode=["custom", "values"]):
+        if mode == "custom":
+            events.append(chunk)
+        else:
+            final = chunk
+
+    assert [event["event"] for event in events] == EXPECTED_EVENTS
+    assert all(event["subagent"] == "analyst" and event["task_id"] == "task-1" for event in events)
+    assert events[0]["name"] == "write_todos"
+    assert events[2]["todos"] == [{"id": "1", "content": "Profile orders", "status": "pending"}]
+    # An ops call is reported as the resulting list, not as the ops.
+    assert events[5]["todos"] == [{"id": "1", "content": "Profile orders", "status": "in_progress"}]
+    assert events[6]["content"] == "Planned one step."
+
+    # The main agent only receives the report; the sub-agent's todos stay its own.
+    assert [m.type for m in final["messages"]] == ["human", "ai", "tool", "ai"]
+    assert final["messages"][2].content == "Planned one step."
+    assert not final.get("todos") and "subagent" not in final
+    print(f"✅ {len(events)} sub-agent events streamed")
+
+
+def test_subagent_events_are_streamed_async():
+    """Test the same events from an async run."""
+    async def run():
+        events = []
+        async for chunk in _agent().astream(INPUT, stream_mode="custom"):
+            events.append(chunk)
+        return events
+
+    events = asyncio.run(run())
+    assert [event["event"] for event in events] == EXPECTED_EVENTS
+
+
+def test_invoke_runs_without_stream():
+    """Test that sub-agents only stream when the caller reads the custom stream."""
+    started = []
+
+    class RecordingEvents(sub_agent._SubagentEvents):
+        def __init__(self, *args):
+            started.append(args)
+            super().__init__(*args)
+
+    saved = sub_agent._SubagentEvents
+    sub_agent._SubagentEvents = RecordingEvents
+    try:
+        result = _agent().invoke(INPUT)
+        assert result["messages"][-1].content == "The analyst planned one step."
+        list(_agent().stream(INPUT, stream_mode="values"))
+        assert started == []
+        list(_agent().stream(INPUT, stream_mode="custom"))
+        assert started == [("analyst", "task-1")]
+    finally:
+        sub_agent._SubagentEvents = saved
+
+
+if __name__ == "__main__":
+    test_subagent_events_are_streamed()
+    test_subagent_events_are_streamed_async()
+    test_invoke_runs_without_stream()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the column summaries behind postgres_query's summary mode.
+
+This script summarizes in-memory values and does not require a database connection.
+"""
+
+import sys
+import os
+from datetime import date
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from deepagents import summary
+from deepagents.summary import EXACT_LIMIT, HyperLogLog, format_summary, summarize_chunks, summarize_column
+
+
+def test_exact_summaries():
+    """Test exact statistics, NULL counts and top values for small columns."""
+    print("Testing exact summaries...")
+    numbers = summarize_column("n", [1, 2, 3, 4, None])
+    assert numbers.kind == "numeric"
+    assert (numbers.count, numbers.nulls, numbers.distinct) == (5, 1, 4)
+    assert not numbers.distinct_is_estimate
+    assert numbers.stats["min"] == 1 and numbers.stats["max"] == 4
+    assert numbers.stats["p50"] == 2.5
+
+    cities = summarize_column("city", ["Oslo", "Lima", "Oslo", None], nulls=[False, False, False, True])
+    assert cities.kind == "text"
+    assert cities.nulls == 1
+    assert cities.top_values == [("Oslo", 2)]
+
+    days = summarize_column("day", [date(2024, 1, 2), date(2024, 1, 1)])
+    assert days.kind == "temporal"
+    assert days.stats == {"min": date(2024, 1, 1), "max": date(2024, 1, 2)}
+
+    documents = summarize_column("doc", [{"a": 1}, {"a": 1}, [1, 2]])
+    assert documents.distinct == 2
+
+    rendered = format_summary([numbers, cities, days], 5)
+    assert rendered.splitlines()[0] == "Summary of 5 rows x 3 columns:"
+    assert "- city (text): nulls 1, distinct 2, top: Oslo (2)" in rendered
+    print("✅ Exact summaries computed")
+
+
+def test_large_columns_are_estimated():
+    """Test that large columns use a HyperLogLog distinct count within a few percent."""
+    print("Testing approximate summaries...")
+    values = [i % 60_000 for i in range(EXACT_LIMIT + 30_000)]
+    column = summarize_column("id", values)
+    assert column.distinct_is_estimate
+    assert abs(column.distinct - 60_000) / 60_000 < 0.05
+    assert "distinct ~" in format_summary([column], len(values))
+    print(f"✅ Estimated {column.distinct:,} distinct values (exact 60,000)")
+
+
+def test_hyperloglog_small_cardinalities():
+    """Test that the sketch is close to exact for small cardinalities."""
+    sketch = HyperLogLog()
+    sketch.add_hashes(list(range(1000)) * 3)
+    assert abs(sketch.estimate() - 1000) <= 20
+
+
+def test_chunked_summaries():
+    """Test summarizing a result chunk by chunk without keeping its rows."""
+    print("Testing chunked summaries...")
+    total = EXACT_LIMIT * 3
+    rows = [(i, i % 4 or None, "hot" if i % 2 else f"user{i}", f"tag{i % 3}") for i in range(total)]
+    chunks = (rows[start:start + 7_000] for start in range(0, total, 7_000))
+    (ids, buckets, users, tags), row_count = summarize_chunks(["id", "bucket", "user", "tag"], chunks)
+    assert row_count == total
+
+    assert ids.count == total and ids.distinct_is_estimate
+    assert abs(ids.distinct - total) / total < 0.05
+    # Min, max, mean and std stay exact; quantiles come from the sample.
+    assert (ids.stats["min"], ids.stats["max"]) == (0, total - 1)
+    assert abs(ids.stats["mean"] - (total - 1) / 2) < 1e-6
+    assert abs(ids.stats["std"] - summarize_column("id", list(range(total))).stats["std"]) < 1e-6
+    assert abs(ids.stats["p50"] - total / 2) / total < 0.02
+    assert buckets.nulls == total // 4 and buckets.distinct == 3
+
+    # Few different values are counted exactly; many are estimated from the sample.
+    assert not tags.top_is_estimate
+    assert sorted(count for _, count in tags.top_values) == [total // 3] * 3
+    assert users.top_is_estimate
+    [(value, count)] = users.top_values
+    assert value == "hot" and abs(count - total / 2) / total < 0.02
+    assert "hot (~" in format_summary([users], total)
+    print("✅ Chunked summaries computed")
+
+
+def test_mixed_json_kinds():
+    """Test that a JSON column mixing objects, arrays and scalars is summarized as mixed, with counts per kind."""
+    print("Testing mixed JSON columns...")
+    values = [1, {"a": 1}, [1, 2], "x", True, None, {"a": 1}]
+    mixed = summarize_column("doc", values)
+    assert mixed.kind == "mixed"
+    assert mixed.stats["kinds"] == {"object": 2, "numeric": 1, "array": 1, "text": 1, "boolean": 1}
+    # true and 1 are different JSON values, though equal in Python.
+    assert mixed.nulls == 1 and mixed.distinct == 5
+    assert mixed.top_values == [('{"a": 1}', 2)]
+    line = format_summary([mixed], len(values))
+    assert "doc (mixed)" in line and "kinds object 2, numeric 1" in line, line
+
+    # A later chunk of another kind turns a numeric column mixed, also past the exact limit.
+    chunks = [[(i,) for i in range(EXACT_LIMIT + 10)], [({"id": 1},)] * 3, [(["a"],)] * 2]
+    (late,), row_count = summarize_chunks(["doc"], chunks)
+    assert late.kind == "mixed" and row_count == EXACT_LIMIT + 15
+    assert late.stats == {"kinds": {"numeric": EXACT_LIMIT + 10, "object": 3, "array": 2}}
+    assert "mean" not in format_summary([late], row_count)
+    print("✅ Mixed JSON columns summarized")
+
+
+def test_without_numpy():
+    """Test that summaries work without NumPy."""
+    print("Testing summaries without NumPy...")
+    saved = summary.np
+    summary.np = None
+    try:
+        test_exact_summaries()
+        test_large_columns_are_estimated()
+        test_hyperloglog_small_cardinalities()
+        test_chunked_summaries()
+        test_mixed_json_kinds()
+    finally:
+        summary.np = saved
+    print("✅ Pure-Python fallback works")
+
+
+if __name__ == "__main__":
+    test_exact_summaries()
+    test_large_columns_are_estimated()
+    test_hyperloglog_small_cardinalities()
+    test_chunked_summaries()
+    test_mixed_json_kinds()
+    test_without_numpy()
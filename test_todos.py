@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script to verify incremental todo list operations.
+
+This script does not require a database connection or a model.
+"""
+
+import sys
+import os
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from langgraph.graph import StateGraph
+
+from deepagents.state import DeepAgentState, apply_todo_ops, todos_reducer
+from deepagents.tools import write_todos
+
+
+def _call(args, todos=None):
+    return write_todos.invoke({
+        "type": "tool_call",
+        "id": "call-1",
+        "name": "write_todos",
+        "args": {**args, "state": {"messages": [], "todos": todos or []}},
+    })
+
+
+def test_ops_keep_ids_stable():
+    """Test add, update and remove by id."""
+    print("Testing todo ops...")
+    todos, _ = apply_todo_ops([], [
+        {"op": "add", "content": "Profile orders"},
+        {"op": "add", "content": "Check indexes"},
+        {"op": "add", "content": "Write report"},
+    ])
+    assert [t["id"] for t in todos] == ["1", "2", "3"]
+
+    todos, applied = apply_todo_ops(todos, [
+        {"op": "remove", "id": "2"},
+        {"op": "update", "id": "1", "status": "completed"},
+        {"op": "add", "content": "Verify totals", "status": "in_progress"},
+    ])
+    assert [(t["id"], t["status"]) for t in todos] == [("1", "completed"), ("3", "pending"), ("4", "in_progress")]
+    assert applied[2] == {"op": "add", "id": "4", "content": "Verify totals", "status": "in_progress"}
+
+    try:
+        apply_todo_ops(todos, [{"op": "update", "id": "9", "status": "completed"}])
+        raise AssertionError("expected an unknown id to be rejected")
+    except ValueError:
+        pass
+    print("✅ Todo ids stay stable across ops")
+
+
+def test_reducer_patches_or_replaces():
+    """Test that the todos channel applies ops and replaces on a plain list."""
+    graph = StateGraph(DeepAgentState)
+    graph.add_node("plan", lambda state: {"todos": [{"op": "update", "id": "1", "status": "in_progress"}]})
+    graph.set_entry_point("plan")
+    graph.set_finish_point("plan")
+    result = graph.compile().invoke({"messages": [], "todos": [{"content": "Profile orders", "status": "pending"}]})
+    assert result["todos"] == [{"id": "1", "content": "Profile orders", "status": "in_progress"}]
+
+    assert todos_reducer(result["todos"], [{"content": "New plan", "status": "pending"}]) == [
+        {"id": "1", "content": "New plan", "status": "pending"}
+    ]
+
+
+def test_tool_acknowledges_compactly():
+    """Test that the tool sends ops through the channel and acknowledges only the changes."""
+    print("Testing write_todos acknowledgement...")
+    todos = [{"id": str(i), "content": f"Step {i}", "status": "pending"} for i in range(1, 31)]
+    command = _call({"ops": [{"op": "update", "id": "7", "status": "completed"}]}, todos)
+    assert command.update["todos"] == [{"op": "update", "id": "7", "status": "completed"}]
+    message = command.update["messages"][0].content
+    assert message == "Todos updated: #7 -> completed. Now 29 pending, 0 in_progress, 1 completed."
+
+    command = _call({"todos": [{"content": "Step A", "status": "pending"}, {"content": "Step B", "status": "pending"}]})
+    assert command.update["messages"][0].content.startswith("Todo list set: #1, #2.")
+
+    error = _call({"ops": [{"op": "remove", "id": "99"}]}, todos)
+    assert "todos" not in error.update
+    assert "no todo with id '99'" in error.update["messages"][0].content
+
+    # Neither an empty list of ops nor a call without arguments clears the list.
+    command = _call({"ops": []}, todos)
+    assert "todos" not in command.update
+    assert command.update["messages"][0].content == "Todos updated: no changes. Now 30 pending, 0 in_progress, 0 completed."
+    error = _call({}, todos)
+    assert "todos" not in error.update and error.update["messages"][0].status == "error"
+    assert _call({"todos": []}, todos).update["todos"] == []
+    print(f"✅ Acknowledged in {len(message)} characters")
+
+
+if __name__ == "__main__":
+    test_ops_keep_ids_stable()
+    test_reducer_patches_or_replaces()
+    test_tool_acknowledges_compactly()
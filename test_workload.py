@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the workload log, its pg_stat_statements correlation and the replay harness.
+
+Connections are fake objects, so this script does not require a database connection.
+"""
+
+import sys
+import os
+import tempfile
+
+# Add the src directory to the path so we can import deepagents
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from deepagents import workload
+from deepagents.workload import WorkloadLog, correlate, fingerprint, normalize_sql, read_workload, replay_workload
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.description = None
+
+    def execute(self, sql, params=None):
+        if sql is workload.PG_STAT_STATEMENTS_QUERY:
+            self.description = [("queryid",), ("query",), ("calls",), ("mean",)]
+        elif "missing" in sql:
+            raise workload.psycopg2.ProgrammingError("relation \"missing\" does not exist")
+        else:
+            self.description = [("n",)]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    statements = [
+        (101, "SELECT * FROM orders WHERE customer_id = $1 AND status IN ($2, $3) LIMIT $4", 7, 1.5),
+    ]
+
+    def __init__(self, dsn):
+        self.closed = False
+
+    def set_session(self, **kwargs):
+        pass
+
+    def cursor(self):
+        return FakeCursor(self.statements)
+
+    def close(self):
+        self.closed = True
+
+
+def test_fingerprint_matches_pg_stat_statements():
+    """Test that statements differing in constants share the fingerprint of pg_stat_statements' text."""
+    print("Testing fingerprints...")
+    sent = "select *  from orders where customer_id = 42 and status in ('paid', 'it''s') limit 1000"
+    assert normalize_sql(sent) == "select * from orders where customer_id = ? and status in (?) limit ?"
+    assert fingerprint(sent) == fingerprint(FakeConnection.statements[0][1])
+    assert fingerprint("SELECT t1.a FROM t1") != fingerprint("SELECT t2.a FROM t2")
+    print("✅ Constants, IN lists and case normalized")
+
+
+def test_log_is_appended_and_correlated():
+    """Test that recorded statements are appended as JSON lines and matched to pg_stat_statements ids."""
+    saved = workload.psycopg2.connect
+    workload.psycopg2.connect = FakeConnection
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            log = WorkloadLog(os.path.join(directory, "agents", "workload.jsonl"))
+            log.record("SELECT * FROM orders WHERE customer_id = 7 AND status IN ('paid') LIMIT 10", 0.0123, 3,
+                       db_connection="postgresql://user:secret@db/shop", session="thread-1", subagent="analyst")
+            log.record("SELECT * FROM missing", 0.001, error="relation \"missing\" does not exist\nDETAIL: row (7, 'x')")
+            entries = list(read_workload(log.path))
+        assert [e.rows for e in entries] == [3, None]
+        # Literal values are not logged by default.
+        assert entries[0].sql == "SELECT * FROM orders WHERE customer_id = ? AND status IN (?) LIMIT ?"
+        assert not entries[0].raw and entries[1].error == "relation \"missing\" does not exist"
+        assert entries[0].latency_ms == 12.3 and entries[0].database == "shop"
+        assert entries[0].session == "thread-1" and entries[0].subagent == "analyst"
+        assert [e.queryid for e in correlate(entries, "postgresql://db/shop")] == [101, None]
+        assert not WorkloadLog(None).enabled
+    finally:
+        workload.psycopg2.connect = saved
+
+
+def test_replay_groups_by_fingerprint():
+    """Test that a replay skips statements that failed when captured and reports per fingerprint."""
+    saved = workload.psycopg2.connect
+    workload.psycopg2.connect = FakeConnection
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            normalized = WorkloadLog(os.path.join(directory, "normalized.jsonl"))
+            normalized.record("SELECT 1 FROM users WHERE id = 5", 0.001, 1)
+            try:
+                replay_workload(read_workload(normalized.path), "postgresql://db/shop")
+                raise AssertionError("expected a normalized log to be rejected")
+            except ValueError as e:
+                assert "DEEPAGENTS_WORKLOAD_LOG_RAW=1" in str(e)
+
+            log = WorkloadLog(os.path.join(directory, "workload.jsonl"), raw=True)
+            for customer in (1, 2, 3):
+                log.record(f"SELECT count(*) FROM orders WHERE customer_id = {customer}", 0.002, 1)
+            log.record("SELECT 1 FROM users", 0.001, 1)
+            log.record("SELECT * FROM missing", 0.001, error="relation does not exist")
+            report = replay_workload(read_workload(log.path), "postgresql://db/shop", concurrency=2, repeat=2)
+        assert report.statements == 8 and report.errors == 0
+        by_table = {stats.sql.split(" FROM ")[1].split()[0]: stats for stats in report.by_fingerprint}
+        assert {table: stats.calls for table, stats in by_table.items()} == {"orders": 6, "users": 2}
+        assert by_table["orders"].recorded_ms == 2.0
+        assert by_table["orders"].sql == "SELECT count(*) FROM orders WHERE customer_id = 1"
+        assert "Replayed 8 statements" in report.format()
+    finally:
+        workload.psycopg2.connect = saved
+
+
+if __name__ == "__main__":
+    test_fingerprint_matches_pg_stat_statements()
+    test_log_is_appended_and_correlated()
+    test_replay_groups_by_fingerprint()